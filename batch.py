@@ -0,0 +1,174 @@
+import logging
+
+logging.getLogger('ifcopenshell').setLevel(logging.ERROR)
+
+import argparse
+import contextlib
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import time
+from multiprocessing.connection import wait
+from typing import Any, Dict, List, Tuple
+
+from main import run_generation_pipeline
+from src.cache.service import ResultCache
+from src.core.logs import configure_logging
+
+SUMMARY_FIELDS = ['project_file', 'status', 'objective', 'solve_time_sec', 'collisions', 'output_file', 'wall_time_sec', 'log_file', 'error']
+
+# Time allowed on top of the solver budget for loading, validation and IFC writing.
+BUDGET_GRACE_SEC = 30.0
+
+def collect_project_files(inputs: List[str]) -> List[str]:
+    project_files = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            project_files.extend(sorted(glob.glob(os.path.join(pattern, "*.json"))))
+        else:
+            project_files.extend(sorted(glob.glob(pattern)))
+    return list(dict.fromkeys(project_files))
+
+def run_job(project_file: str, output_dir: str, time_budget: float, solver_workers: int, cache_dir: str,
+            level_of_detail: str = None) -> Dict[str, Any]:
+    base_name = os.path.splitext(os.path.basename(project_file))[0]
+    output_file = os.path.join(output_dir, f"{base_name}_model.ifc")
+    log_file = os.path.join(output_dir, f"{base_name}.log")
+    cache = ResultCache(cache_dir) if cache_dir else None
+
+    row = {field: None for field in SUMMARY_FIELDS}
+    row.update(project_file=project_file, log_file=log_file)
+    configure_logging()
+    start = time.perf_counter()
+    with open(log_file, 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        try:
+            row.update(run_generation_pipeline(project_file, output_file, cache=cache,
+                                               time_limit_sec=time_budget, num_workers=solver_workers,
+                                               level_of_detail=level_of_detail))
+        except Exception as e:
+            # PipelineError and anything unexpected: record it and let the rest of the batch continue.
+            row.update(status='ERROR', error=str(e).splitlines()[0])
+            print(f"CRITICAL ERROR: {e}")
+    row['wall_time_sec'] = time.perf_counter() - start
+    return row
+
+def job_process(connection, *job_args):
+    # Runs one job in its own process, so that a job over its budget can be killed.
+    try:
+        connection.send(run_job(*job_args))
+    finally:
+        connection.close()
+
+def failed_row(project_file: str, status: str, error: str) -> Dict[str, Any]:
+    row = {field: None for field in SUMMARY_FIELDS}
+    row.update(project_file=project_file, status=status, error=error)
+    return row
+
+def run_batch(project_files: List[str], output_dir: str, jobs: int, time_budget: float,
+              solver_workers: int, cache_dir: str, level_of_detail: str = None) -> List[Dict[str, Any]]:
+    """
+    Runs up to `jobs` projects at a time, each in its own process, and returns one summary
+    row per project in the order of `project_files`. With a time budget, every job is killed
+    once it has run for the budget plus BUDGET_GRACE_SEC, counted from its own start, and is
+    reported as TIMEOUT.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    limit = time_budget + BUDGET_GRACE_SEC if time_budget else None
+    pending = list(enumerate(project_files))
+    # Receiving end of each running job's pipe -> (index, process, start time).
+    running: Dict[Any, Tuple[int, multiprocessing.Process, float]] = {}
+    rows: Dict[int, Dict[str, Any]] = {}
+
+    def finish(index: int, row: Dict[str, Any]):
+        rows[index] = row
+        print(f"  [{len(rows)}/{len(project_files)}] {row['status']:<12} {project_files[index]}")
+
+    while pending or running:
+        while pending and len(running) < jobs:
+            index, project_file = pending.pop(0)
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=job_process, args=(sender, project_file, output_dir, time_budget,
+                                                                        solver_workers, cache_dir, level_of_detail))
+            process.start()
+            sender.close()
+            running[receiver] = (index, process, time.perf_counter())
+
+        timeout = None
+        if limit is not None:
+            timeout = max(0.0, min(started + limit for _, _, started in running.values()) - time.perf_counter())
+        for receiver in wait(list(running), timeout=timeout):
+            index, process, _ = running.pop(receiver)
+            try:
+                row = receiver.recv()
+            except EOFError:
+                process.join()
+                row = failed_row(project_files[index], 'ERROR', f"The job process exited with code {process.exitcode}")
+            receiver.close()
+            process.join()
+            finish(index, row)
+
+        if limit is not None:
+            now = time.perf_counter()
+            for receiver, (index, process, started) in list(running.items()):
+                if now - started >= limit:
+                    process.kill()
+                    process.join()
+                    receiver.close()
+                    del running[receiver]
+                    finish(index, failed_row(project_files[index], 'TIMEOUT', f"No result within {limit:.0f}s"))
+    return [rows[index] for index in range(len(project_files))]
+
+def write_summary(rows: List[Dict[str, Any]], summary_path: str, fields: List[str] = SUMMARY_FIELDS):
+    if summary_path.endswith(".csv"):
+        with open(summary_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+def print_summary(rows: List[Dict[str, Any]]):
+    print(f"\n{'status':<12} {'objective':>14} {'solve s':>8} {'collisions':>10}  output")
+    for row in rows:
+        objective = f"{row['objective']:.0f}" if row['objective'] is not None else "-"
+        solve_time = f"{row['solve_time_sec']:.2f}" if row['solve_time_sec'] is not None else "-"
+        collisions = row['collisions'] if row['collisions'] is not None else "-"
+        output = row['output_file'] or row['error'] or row['project_file']
+        print(f"{row['status']:<12} {objective:>14} {solve_time:>8} {collisions:>10}  {output}")
+
+if __name__ == "__main__":
+    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="Run the generation pipeline for many project files in parallel.")
+    parser.add_argument("inputs", nargs="+", help="Project JSON files, directories or glob patterns.")
+    parser.add_argument("--output-dir", default=os.path.join(SCRIPT_DIR, "output", "batch"),
+                        help="Directory for IFC models, placements, per-job logs and the summary.")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Number of projects solved in parallel.")
+    parser.add_argument("--time-budget", type=float, default=None,
+                        help="Per-job solver time limit in seconds (caps each project's time_limit_sec).")
+    parser.add_argument("--solver-workers", type=int, default=None,
+                        help="CP-SAT workers per job; keep jobs x solver workers close to the core count.")
+    parser.add_argument("--summary", default=None,
+                        help="Summary file (.json or .csv). Defaults to batch_summary.json in the output directory.")
+    parser.add_argument("--lod", choices=["BOX", "SWEPT", "BREP"], default=None,
+                        help="IFC level of detail for every job, e.g. BOX for quick-look sweeps.")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the result cache.")
+    parser.add_argument("--cache-dir", default=os.path.join(SCRIPT_DIR, ".layout_cache"),
+                        help="Directory of the content-addressed result cache.")
+    args = parser.parse_args()
+
+    project_files = collect_project_files(args.inputs)
+    if not project_files:
+        parser.error("No project files matched the given inputs.")
+
+    print(f"--- Running {len(project_files)} projects with {args.jobs} parallel jobs ---")
+    rows = run_batch(project_files, args.output_dir, args.jobs, args.time_budget, args.solver_workers,
+                     None if args.no_cache else args.cache_dir, args.lod)
+    print_summary(rows)
+
+    summary_path = args.summary or os.path.join(args.output_dir, "batch_summary.json")
+    write_summary(rows, summary_path)
+    print(f"\n--- Batch finished. Summary saved to: {summary_path} ---")
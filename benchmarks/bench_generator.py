@@ -0,0 +1,82 @@
+"""
+Measures IFC generation time, peak memory, entity count and output size on a synthetic plant
+with repeated equipment types, for each level of detail: without shared geometry, with shared
+representation maps and product shapes, and shared with zip-compressed (.ifczip) output. Every
+case runs in a fresh process so that its peak memory is its own.
+
+Usage: python -m benchmarks.bench_generator [--items 500] [--catalogue 20] [--silo-share 0.3] [--lods BOX SWEPT BREP]
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.synthetic import make_synthetic_project
+from src.core.models import ExportOptions
+from src.core.tracing import Tracer, peak_memory_mb, tracing
+from src.generator.service import create_3d_model
+
+# (label, share_geometry, output extension)
+VARIANTS = (("unshared", False, ".ifc"), ("shared", True, ".ifc"), ("ifczip", True, ".ifczip"))
+
+def grid_placements(project) -> dict:
+    # The generator does not care whether the layout is optimal, so skip the solver.
+    room = project.architecture.room_dimensions
+    wall = project.architecture.wall_thickness
+    placements, x, y, row_depth = {}, wall, wall, 0.0
+    for item in project.equipment:
+        if x + item.footprint.width > room.width - wall:
+            x, y, row_depth = wall, y + row_depth, 0.0
+        placements[item.id] = {'x': x, 'y': y, 'rotation_deg': 0}
+        x += item.footprint.width
+        row_depth = max(row_depth, item.footprint.depth)
+    return placements
+
+def run_case(project, placements, label: str, share_geometry: bool, extension: str, output_dir: str) -> dict:
+    # Runs in a fresh worker process; the peak is reported on top of the memory after the imports.
+    lod = project.export_options.level_of_detail
+    output_file = os.path.join(output_dir, f"bench_{lod}_{label}{extension}")
+    baseline_mb = peak_memory_mb()
+    tracer = Tracer()
+    with contextlib.redirect_stdout(io.StringIO()), tracing(tracer):
+        start = time.perf_counter()
+        create_3d_model(project, placements, output_file, share_geometry=share_geometry)
+        elapsed = time.perf_counter() - start
+    peak_mb = peak_memory_mb()
+    return {
+        'seconds': elapsed,
+        'bytes': os.path.getsize(output_file),
+        'entities': tracer.counters.get('ifc.entities', 0),
+        'peak_mb': peak_mb - baseline_mb if peak_mb is not None else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--catalogue", type=int, default=20, help="Number of distinct equipment types.")
+    parser.add_argument("--silo-share", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lods", nargs="+", default=["BOX", "SWEPT", "BREP"], choices=["BOX", "SWEPT", "BREP"])
+    args = parser.parse_args()
+
+    project = make_synthetic_project(args.items, seed=args.seed, silo_share=args.silo_share, catalogue_size=args.catalogue)
+    placements = grid_placements(project)
+
+    print(f"{args.items} items from {args.catalogue} equipment types, silo share {args.silo_share:.0%}")
+    print(f"{'lod':<6} {'geometry':<10} {'time s':>8} {'peak +MB':>9} {'entities':>9} {'size KB':>10}")
+    spawn = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as output_dir:
+        for lod in args.lods:
+            project.export_options = ExportOptions(level_of_detail=lod)
+            for label, share_geometry, extension in VARIANTS:
+                with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+                    row = executor.submit(run_case, project, placements, label, share_geometry, extension, output_dir).result()
+                peak = f"{row['peak_mb']:.1f}" if row['peak_mb'] is not None else "-"
+                print(f"{lod:<6} {label:<10} {row['seconds']:>8.2f} {peak:>9} {row['entities']:>9.0f} {row['bytes'] / 1024:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Compares the plain CP-SAT solve with the large neighbourhood search on synthetic plants, for
+the same wall-clock budget: the objective reached at a few points of the time limit and at
+the end, and the layout cost of the final layouts.
+
+Usage: python -m benchmarks.bench_lns [--sizes 100 200 400] [--time-limit 60] [--lns-workers 4] [--neighbourhood 20]
+"""
+import argparse
+import contextlib
+import io
+import logging
+from typing import List, Optional, Tuple
+
+from benchmarks.synthetic import make_synthetic_project
+from src.placer.objective import evaluate_layout_cost
+from src.placer.service import calculate_placements
+
+CHECKPOINTS = (0.25, 0.5, 0.75)
+
+def objective_at(history: List[Tuple[float, float]], seconds: float) -> Optional[float]:
+    # The best objective found by `seconds` into the solve, from the stats' objective history.
+    values = [objective for at, objective in history if at <= seconds]
+    return min(values) if values else None
+
+def run_case(n_items: int, lns: bool, args) -> dict:
+    project = make_synthetic_project(n_items, seed=args.seed, time_limit_sec=args.time_limit, objective_mode=args.mode,
+                                     wall_share=args.wall_share, zone_share=args.zone_share)
+    options = project.solver_options
+    options.num_workers = args.workers
+    options.lns = lns
+    options.lns_workers = args.lns_workers
+    options.lns_neighborhood_size = args.neighbourhood
+    options.lns_subsolve_sec = args.subsolve
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = calculate_placements(project)
+    history = result.stats.objective_history
+    return {
+        "items": n_items,
+        "mode": "lns" if lns else "plain",
+        "checkpoints": [objective_at(history, share * args.time_limit) for share in CHECKPOINTS],
+        "objective": result.stats.objective_value,
+        "solutions": result.stats.num_solutions,
+        "cost": evaluate_layout_cost(project, result.placements) if result.placements and not result.is_fallback else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 200, 400])
+    parser.add_argument("--wall-share", type=float, default=0.1)
+    parser.add_argument("--zone-share", type=float, default=0.1)
+    parser.add_argument("--mode", default="KNN", choices=["ALL_PAIRS", "PLACE_AFTER", "KNN", "FLOW"])
+    parser.add_argument("--time-limit", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--lns-workers", type=int, default=None)
+    parser.add_argument("--neighbourhood", type=int, default=20)
+    parser.add_argument("--subsolve", type=float, default=2.0)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    format_value = lambda value: f"{value:.0f}" if value is not None else "-"
+    header = (f"{'items':>6} {'mode':<6} " + " ".join(f"{f'obj@{share:.0%}':>12}" for share in CHECKPOINTS)
+              + f" {'objective':>12} {'solutions':>9} {'layout cost':>14}")
+    print(header)
+    print("-" * len(header))
+    for n_items in args.sizes:
+        for lns in (False, True):
+            row = run_case(n_items, lns, args)
+            checkpoints = " ".join(f"{format_value(value):>12}" for value in row['checkpoints'])
+            cost = f"{row['cost']:.1f}" if row['cost'] is not None else "-"
+            print(f"{row['items']:>6} {row['mode']:<6} {checkpoints} {format_value(row['objective']):>12} "
+                  f"{row['solutions']:>9} {cost:>14}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Measures the stages that run before the solver on large project files: reading and parsing the
+JSON (json.loads + parse_obj against the single-pass parse_project), the project hash, the
+pre-solve validation, the rule presolve, the warm-start item signatures and, optionally, the
+CP model build. Times are the best of --repeat runs.
+
+Usage: python -m benchmarks.bench_loading [--items 10000] [--wall-share 0.2] [--zone-share 0.3] [--build]
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import time
+
+from benchmarks.synthetic import make_synthetic_project
+from src.core.hashing import project_hash
+from src.core.loader import parse_project
+from src.core.models import Project
+from src.placer.presolve import presolve_rules
+from src.placer.warmstart import item_signatures
+from src.validator.rules import validate_project
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--chain-share", type=float, default=0.3)
+    parser.add_argument("--wall-share", type=float, default=0.2)
+    parser.add_argument("--zone-share", type=float, default=0.3)
+    parser.add_argument("--align-share", type=float, default=0.1)
+    parser.add_argument("--avoid-zones", type=int, default=4)
+    parser.add_argument("--mode", default="KNN", choices=["ALL_PAIRS", "PLACE_AFTER", "KNN", "FLOW"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--build", action="store_true", help="Also time the CP model build (once).")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    generated = make_synthetic_project(args.items, seed=args.seed, objective_mode=args.mode, chain_share=args.chain_share,
+                                       avoid_zones=args.avoid_zones, wall_share=args.wall_share,
+                                       zone_share=args.zone_share, align_share=args.align_share)
+    raw = json.dumps(generated.dict(), ensure_ascii=False).encode("utf-8")
+    project = parse_project(raw)
+    print(f"{len(project.equipment)} items, {len(project.rules)} rules, {len(project.flows)} flows, {len(raw) / 1e6:.1f} MB of JSON")
+
+    stages = [
+        ("json.loads + parse_obj", lambda: Project.parse_obj(json.loads(raw))),
+        ("parse_project", lambda: parse_project(raw)),
+        ("project_hash", lambda: project_hash(project)),
+        ("validate_project", lambda: validate_project(project)),
+        ("presolve", lambda: presolve_rules(project)),
+        ("item_signatures", lambda: item_signatures(project)),
+    ]
+    print(f"{'stage':<24} {'best s':>8}")
+    print("-" * 33)
+    for name, fn in stages:
+        print(f"{name:<24} {best_of(args.repeat, fn):>8.3f}")
+
+    if args.build:
+        from src.placer.service import build_placement_model
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_sec = best_of(1, lambda: build_placement_model(project))
+        print(f"{'build_placement_model':<24} {build_sec:>8.3f}")
+
+if __name__ == "__main__":
+    main()
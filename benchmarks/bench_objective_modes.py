@@ -0,0 +1,63 @@
+"""
+Compares the placer objective modes on synthetic projects: model build time, model size,
+solve time and layout quality (the ALL_PAIRS cost of the resulting layout).
+
+Usage: python -m benchmarks.bench_objective_modes [--sizes 10 50 100 200 500] [--time-limit 10] [--workers 8]
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from benchmarks.synthetic import make_synthetic_project
+from src.placer.objective import evaluate_layout_cost
+from src.placer.service import build_placement_model, calculate_placements
+
+MODES = ["ALL_PAIRS", "PLACE_AFTER", "KNN", "FLOW"]
+
+def run_case(n_items: int, mode: str, time_limit: float, seed: int, workers: int) -> dict:
+    project = make_synthetic_project(n_items, seed=seed, time_limit_sec=time_limit, objective_mode=mode)
+    project.solver_options.num_workers = workers
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        placement_model = build_placement_model(project)
+        build_sec = time.perf_counter() - start
+        proto = placement_model.model.Proto()
+
+        start = time.perf_counter()
+        placements = calculate_placements(project).placements
+        total_sec = time.perf_counter() - start
+
+    return {
+        "items": n_items,
+        "mode": mode,
+        "build_sec": build_sec,
+        "variables": len(proto.variables),
+        "constraints": len(proto.constraints),
+        "pairs": placement_model.objective_pairs,
+        "total_sec": total_sec,
+        "cost": evaluate_layout_cost(project, placements) if placements else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100, 200, 500])
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--time-limit", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    header = f"{'items':>6} {'mode':<12} {'build s':>8} {'vars':>8} {'cons':>8} {'pairs':>8} {'total s':>8} {'layout cost':>14}"
+    print(header)
+    print("-" * len(header))
+    for n_items in args.sizes:
+        for mode in args.modes:
+            row = run_case(n_items, mode, args.time_limit, args.seed, args.workers)
+            cost = f"{row['cost']:.1f}" if row['cost'] is not None else "no solution"
+            print(f"{row['items']:>6} {row['mode']:<12} {row['build_sec']:>8.3f} {row['variables']:>8} "
+                  f"{row['constraints']:>8} {row['pairs']:>8} {row['total_sec']:>8.2f} {cost:>14}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Compares the layout previews with the quickest IFC export (BOX level of detail) on a synthetic
+plant: the time to write an SVG plan, an OBJ and a glTF/GLB box view, and the output sizes.
+Times are the best of --repeat runs.
+
+Usage: python -m benchmarks.bench_preview [--sizes 100 1000 5000] [--repeat 3] [--no-ifc]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks.bench_generator import grid_placements
+from benchmarks.synthetic import make_synthetic_project
+from src.core.models import ExportOptions
+from src.generator.preview import PREVIEW_FORMATS, write_preview
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-ifc", action="store_true", help="Skip the IFC export, which dominates the run time.")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print(f"{'items':>6} {'output':<6} {'best ms':>10} {'size KB':>10}")
+    print("-" * 35)
+    with tempfile.TemporaryDirectory() as output_dir:
+        for n_items in args.sizes:
+            project = make_synthetic_project(n_items, seed=args.seed, avoid_zones=2, zone_share=0.1)
+            project.export_options = ExportOptions(level_of_detail="BOX")
+            placements = grid_placements(project)
+            outputs = [(preview_format, lambda path: write_preview(project, placements, path)) for preview_format in PREVIEW_FORMATS]
+            if not args.no_ifc:
+                from src.generator.service import create_3d_model
+                outputs.append(("ifc", lambda path: create_3d_model(project, placements, path)))
+            for name, write in outputs:
+                path = os.path.join(output_dir, f"bench_{n_items}.{name}")
+                with contextlib.redirect_stdout(io.StringIO()):
+                    seconds = best_of(1 if name == "ifc" else args.repeat, lambda: write(path))
+                print(f"{n_items:>6} {name:<6} {seconds * 1000:>10.1f} {os.path.getsize(path) / 1024:>10.1f}")
+
+if __name__ == "__main__":
+    main()
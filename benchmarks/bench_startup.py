@@ -0,0 +1,72 @@
+"""
+Measures the start-up cost of the CLI commands: wall time of a full `main.py` run per command
+(median of several runs in fresh interpreters) and which heavy libraries each command imports,
+with their cumulative import time. `validate` is expected to stay well under a second and to
+import neither OR-Tools nor ifcopenshell.
+
+Usage: python -m benchmarks.bench_startup [--items 20] [--repeat 5] [--time-limit 1]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import make_synthetic_project
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("ortools.sat.python.cp_model", "pandas", "ifcopenshell", "ifcopenshell.api", "ifcopenshell.geom", "OCC")
+
+def heavy_imports(command: list) -> dict:
+    # -X importtime reports "self | cumulative | module" per imported module on stderr.
+    result = subprocess.run([sys.executable, "-X", "importtime", "main.py"] + command,
+                            cwd=REPO_DIR, capture_output=True, text=True)
+    imported = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = (part.strip() for part in line[len("import time:"):].split("|"))
+        if module in HEAVY_MODULES and cumulative.isdigit():
+            imported[module] = int(cumulative) / 1e6
+    return imported
+
+def time_command(command: list, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "main.py"] + command, cwd=REPO_DIR, capture_output=True, check=False)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--time-limit", type=float, default=1.0, help="Solver time limit for solve and generate.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project = make_synthetic_project(args.items, time_limit_sec=args.time_limit)
+        project_file = os.path.join(tmp, "startup_project.json")
+        with open(project_file, 'w', encoding='utf-8') as f:
+            json.dump(project.dict(), f, ensure_ascii=False)
+
+        commands = {
+            "validate": ["validate", project_file],
+            "solve": ["solve", project_file, "--no-cache"],
+            "generate": ["generate", project_file, "--no-cache", "--lod", "BOX"],
+        }
+        header = f"{'command':<10} {'median s':>9}  heavy imports (cumulative s)"
+        print(header)
+        print("-" * len(header))
+        for name, command in commands.items():
+            wall = time_command(command, args.repeat)
+            imported = heavy_imports(command)
+            modules = ", ".join(f"{module} {sec:.2f}" for module, sec in imported.items()) or "none"
+            print(f"{name:<10} {wall:>9.2f}  {modules}")
+
+if __name__ == "__main__":
+    main()
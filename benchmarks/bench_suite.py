@@ -0,0 +1,213 @@
+"""
+Benchmark suite: runs the whole pipeline on synthetic plants and times each stage (parse, presolve,
+greedy hint, model build, solve, collision check, rule validation, IFC build and write), along
+with peak memory, model size and IFC output size. Results can be saved as a baseline and later
+runs compared against it; regressions in runtime, peak memory or output size are flagged and
+make the command exit with status 1.
+
+Each scenario runs in a fresh interpreter, so its peak RSS is its own and import caches do not
+leak between scenarios. Stage times are the best of --repeat runs.
+
+Usage:
+    python -m benchmarks.bench_suite [--scenarios small medium] [--set n_items=500 silo_share=0.5]
+    python -m benchmarks.bench_suite --save baseline.json
+    python -m benchmarks.bench_suite --compare baseline.json [--time-tolerance 0.2]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+BASELINE_VERSION = 1
+
+# Synthetic plant parameters (see benchmarks/synthetic.py) per scenario.
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "small": {"n_items": 20, "chain_share": 0.3, "maintenance_share": 0.5, "silo_share": 0.2, "catalogue_size": 8},
+    "medium": {"n_items": 100, "chain_share": 0.3, "maintenance_share": 0.5, "silo_share": 0.2, "catalogue_size": 20,
+               "objective_mode": "KNN"},
+    "rule_heavy": {"n_items": 100, "chain_share": 0.3, "maintenance_share": 0.5, "catalogue_size": 20, "objective_mode": "KNN",
+                   "avoid_zones": 4, "wall_share": 0.2, "zone_share": 0.3, "align_share": 0.1},
+    "large": {"n_items": 400, "chain_share": 0.3, "maintenance_share": 0.5, "silo_share": 0.3, "catalogue_size": 30,
+              "aspect": 2.0, "objective_mode": "KNN"},
+}
+DEFAULT_SCENARIOS = ["small", "medium", "rule_heavy"]
+
+# Stage durations below this are too noisy to flag.
+MIN_TIME_DELTA_SEC = 0.05
+
+def run_scenario(params: Dict[str, Any], time_limit_sec: float, workers: int, lod: str) -> Dict[str, Any]:
+    from benchmarks.synthetic import make_synthetic_project
+    from src.core.models import ExportOptions, Project
+    from src.core.tracing import Tracer, span, tracing
+    from src.generator.service import create_3d_model
+    from src.placer.service import calculate_placements
+    from src.validator.rules import validate_layout
+    from src.validator.service import validate_collisions
+
+    generated = make_synthetic_project(time_limit_sec=time_limit_sec, **params)
+    generated.solver_options.num_workers = workers
+    generated.export_options = ExportOptions(level_of_detail=lod)
+    project_data = json.loads(json.dumps(generated.dict()))
+
+    tracer = Tracer()
+    with tracing(tracer), tempfile.TemporaryDirectory() as output_dir:
+        with span("parse"):
+            project = Project.parse_obj(project_data)
+        result = calculate_placements(project)
+        placements = result.placements
+        if placements:
+            with span("validate_collisions"):
+                validate_collisions(project, placements)
+            validate_layout(project, placements)
+            create_3d_model(project, placements, os.path.join(output_dir, "bench.ifc"))
+
+    summary = tracer.summary()
+    return {
+        "stages": {name: stage['total_sec'] for name, stage in summary['stages'].items()},
+        "counters": summary['counters'],
+        # ru_maxrss is in KiB on Linux.
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "status": result.stats.status,
+        "objective": result.stats.objective_value,
+        "fallback": result.is_fallback,
+    }
+
+def run_isolated(params: Dict[str, Any], args) -> Dict[str, Any]:
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_scenario, params, args.time_limit, args.workers, args.lod).result()
+
+def best_of(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    best = dict(runs[-1])
+    stage_names = dict.fromkeys(name for run in runs for name in run['stages'])
+    best['stages'] = {name: min(run['stages'].get(name, float('inf')) for run in runs) for name in stage_names}
+    best['peak_rss_bytes'] = min(run['peak_rss_bytes'] for run in runs)
+    return best
+
+def environment() -> Dict[str, Any]:
+    from ortools import __version__ as ortools_version
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "ortools": ortools_version,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+def parse_overrides(overrides: List[str]) -> Dict[str, Any]:
+    values = {}
+    for override in overrides:
+        key, _, value = override.partition("=")
+        try:
+            values[key] = json.loads(value)
+        except json.JSONDecodeError:
+            values[key] = value
+    return values
+
+def compare_metrics(base: Dict[str, Any], new: Dict[str, Any], args) -> List[Dict[str, Any]]:
+    rows = []
+
+    def add(metric: str, old, value, tolerance: float, min_delta: float = 0.0):
+        if old is None or value is None:
+            return
+        change = (value - old) / old if old else 0.0
+        flag = ""
+        if value - old > min_delta and change > tolerance:
+            flag = "REGRESSION"
+        elif old - value > min_delta and -change > tolerance:
+            flag = "improved"
+        rows.append({"metric": metric, "base": old, "new": value, "change": change, "flag": flag})
+
+    for name in dict.fromkeys(list(base['stages']) + list(new['stages'])):
+        add(f"{name} s", base['stages'].get(name), new['stages'].get(name), args.time_tolerance, MIN_TIME_DELTA_SEC)
+    add("peak RSS MB", base['peak_rss_bytes'] / 2 ** 20, new['peak_rss_bytes'] / 2 ** 20, args.memory_tolerance)
+    add("IFC KB", base['counters'].get('ifc.output_bytes', 0) / 1024 or None,
+        new['counters'].get('ifc.output_bytes', 0) / 1024 or None, args.size_tolerance)
+    for counter in ("model.variables", "model.constraints", "ifc.entities"):
+        add(counter, base['counters'].get(counter), new['counters'].get(counter), args.size_tolerance)
+    return rows
+
+def print_result(name: str, result: Dict[str, Any]):
+    stages = ", ".join(f"{stage} {sec:.3f}" for stage, sec in result['stages'].items())
+    counters = result['counters']
+    print(f"{name}: {result['status']}{' (greedy fallback)' if result['fallback'] else ''}, objective {result['objective']}")
+    print(f"  stages (s): {stages}")
+    print(f"  peak RSS {result['peak_rss_bytes'] / 2 ** 20:.0f} MB, model {counters.get('model.variables', 0):.0f} vars / "
+          f"{counters.get('model.constraints', 0):.0f} constraints, IFC {counters.get('ifc.entities', 0):.0f} entities / "
+          f"{counters.get('ifc.output_bytes', 0) / 1024:.0f} KB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=DEFAULT_SCENARIOS, choices=list(SCENARIOS))
+    parser.add_argument("--set", nargs="+", default=[], metavar="KEY=VALUE",
+                        help="Override generator parameters for every scenario, e.g. n_items=500 aspect=2.0 silo_share=0.5.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-limit", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--lod", default="SWEPT", choices=["BOX", "SWEPT", "BREP"])
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scenario; the best time of each stage is kept.")
+    parser.add_argument("--save", metavar="BASELINE_FILE", help="Save the results as a baseline.")
+    parser.add_argument("--compare", metavar="BASELINE_FILE", help="Compare the results with a saved baseline.")
+    parser.add_argument("--time-tolerance", type=float, default=0.2, help="Allowed relative slowdown per stage.")
+    parser.add_argument("--memory-tolerance", type=float, default=0.1, help="Allowed relative growth of peak RSS.")
+    parser.add_argument("--size-tolerance", type=float, default=0.05, help="Allowed relative growth of output and model size.")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('version') != BASELINE_VERSION:
+            parser.error(f"Baseline '{args.compare}' has format version {baseline.get('version')}, expected {BASELINE_VERSION}.")
+
+    overrides = parse_overrides(args.set)
+    settings = {"seed": args.seed, "time_limit": args.time_limit, "workers": args.workers, "lod": args.lod}
+    results = {}
+    regressions = 0
+    for name in args.scenarios:
+        params = {**SCENARIOS[name], **overrides, "seed": args.seed}
+        result = best_of([run_isolated(params, args) for _ in range(args.repeat)])
+        results[name] = {"params": params, "result": result}
+        print_result(name, result)
+
+        if baseline is None:
+            continue
+        base = baseline['scenarios'].get(name)
+        if base is None:
+            print("  (not in the baseline)")
+            continue
+        if base['params'] != params or baseline['settings'] != settings:
+            print("  WARNING: scenario parameters or settings differ from the baseline; the comparison is indicative only.")
+        print(f"  {'metric':<22} {'base':>10} {'new':>10} {'change':>8}")
+        for row in compare_metrics(base['result'], result, args):
+            regressions += row['flag'] == "REGRESSION"
+            print(f"  {row['metric']:<22} {row['base']:>10.3f} {row['new']:>10.3f} {row['change']:>+8.1%}  {row['flag']}")
+        print()
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({"version": BASELINE_VERSION, "environment": environment(), "settings": settings, "scenarios": results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"Baseline saved to: {args.save}")
+
+    if baseline is not None:
+        print(f"{regressions} regression(s) against {args.compare} (recorded {baseline['environment'].get('date')}, "
+              f"commit {baseline['environment'].get('commit')}).")
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
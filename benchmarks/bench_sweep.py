@@ -0,0 +1,80 @@
+"""
+Measures the per-variant cost of a parameter sweep before the solver runs: building the CP
+model for every variant against copying the model compiled once for the largest room and
+fixing its parameters. Variants grow the room and shift the first AVOID_ZONE area.
+
+Usage: python -m benchmarks.bench_sweep [--sizes 200 1000 4000] [--variants 8] [--avoid-zones 4]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import time
+
+from benchmarks.synthetic import make_synthetic_project
+from src.core.models import LayoutVariant
+from src.placer.service import build_placement_model
+from src.placer.sweep import CompiledPlacementModel, variant_project
+
+def make_variants(project, n_variants: int):
+    dims = project.architecture.room_dimensions
+    zones = [index for index, rule in enumerate(project.rules) if rule.type == 'AVOID_ZONE']
+    variants = []
+    for k in range(n_variants):
+        avoid_zones = {}
+        if zones:
+            x1, y1, x2, y2 = project.rules[zones[0]].params.area
+            shift = 0.25 * k
+            avoid_zones[zones[0]] = (x1 + shift, y1, x2 + shift, y2)
+        variants.append(LayoutVariant(name=f"v{k}", room_width=dims.width * (1 + 0.05 * k),
+                                      room_depth=dims.depth * (1 + 0.05 * k), avoid_zones=avoid_zones))
+    return variants
+
+def run_case(n_items: int, args) -> dict:
+    project = make_synthetic_project(n_items, seed=args.seed, objective_mode=args.mode, avoid_zones=args.avoid_zones,
+                                     wall_share=args.wall_share, zone_share=args.zone_share)
+    variants = make_variants(project, args.variants)
+    projects = [variant_project(project, variant) for variant in variants]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for variant in projects:
+            build_placement_model(variant)
+        rebuild = time.perf_counter() - start
+
+        start = time.perf_counter()
+        compiled = CompiledPlacementModel(project, max(v.room_width for v in variants), max(v.room_depth for v in variants))
+        compile_sec = time.perf_counter() - start
+        start = time.perf_counter()
+        for variant in projects:
+            compiled.variant_model(variant)
+        per_variant = time.perf_counter() - start
+    return {
+        "items": n_items,
+        "rebuild": rebuild / len(variants),
+        "compile": compile_sec,
+        "variant": per_variant / len(variants),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 1000, 4000])
+    parser.add_argument("--variants", type=int, default=8)
+    parser.add_argument("--avoid-zones", type=int, default=4)
+    parser.add_argument("--wall-share", type=float, default=0.1)
+    parser.add_argument("--zone-share", type=float, default=0.2)
+    parser.add_argument("--mode", default="KNN", choices=["ALL_PAIRS", "PLACE_AFTER", "KNN", "FLOW"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    header = f"{'items':>6} {'rebuild s/variant':>18} {'compile s':>10} {'compiled s/variant':>19} {'speedup':>8}"
+    print(header)
+    print("-" * len(header))
+    for n_items in args.sizes:
+        row = run_case(n_items, args)
+        print(f"{row['items']:>6} {row['rebuild']:>18.3f} {row['compile']:>10.3f} {row['variant']:>19.3f} "
+              f"{row['rebuild'] / max(row['variant'], 1e-9):>7.1f}x")
+
+if __name__ == "__main__":
+    main()
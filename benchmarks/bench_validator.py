@@ -0,0 +1,60 @@
+"""
+Compares the sweep-and-prune collision validator with the reference all-pairs implementation
+on random (deliberately colliding) layouts, and checks that both report the same footprint
+collisions.
+
+Usage: python -m benchmarks.bench_validator [--sizes 500 1000 2000 5000] [--reference-max 2000]
+"""
+import argparse
+import random
+import time
+
+from benchmarks.synthetic import make_synthetic_project
+from src.validator.service import find_collisions, validate_collisions
+
+def random_placements(project, density: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    room = project.architecture.room_dimensions
+    # Shrink the usable area so that a fair share of items overlap.
+    span_x, span_y = room.width * density, room.depth * density
+    return {
+        item.id: {'x': rng.uniform(0.0, span_x), 'y': rng.uniform(0.0, span_y), 'rotation_deg': 0}
+        for item in project.equipment
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000, 5000])
+    parser.add_argument("--reference-max", type=int, default=2000,
+                        help="Largest size for which the quadratic reference implementation is run.")
+    parser.add_argument("--density", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    header = f"{'items':>6} {'sweep s':>9} {'footprint':>10} {'m-zone':>8} {'reference s':>12} {'match':>6}"
+    print(header)
+    print("-" * len(header))
+    for n_items in args.sizes:
+        project = make_synthetic_project(n_items, seed=args.seed)
+        placements = random_placements(project, args.density, args.seed)
+        names = {item.id: item.name for item in project.equipment}
+
+        start = time.perf_counter()
+        collisions = find_collisions(project, placements)
+        sweep_sec = time.perf_counter() - start
+        footprint = [c for c in collisions if c.kind == "FOOTPRINT"]
+        zone_count = len(collisions) - len(footprint)
+
+        reference_sec, match = "-", "-"
+        if n_items <= args.reference_max:
+            start = time.perf_counter()
+            reference = validate_collisions(project, placements)
+            reference_sec = f"{time.perf_counter() - start:.3f}"
+            expected = sorted(reference)
+            actual = sorted(f"Collision detected between: '{names[c.item_a]}' and '{names[c.item_b]}'" for c in footprint)
+            match = "yes" if expected == actual else "NO"
+
+        print(f"{n_items:>6} {sweep_sec:>9.3f} {len(footprint):>10} {zone_count:>8} {reference_sec:>12} {match:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import copy
+import math
+import random
+from typing import Dict, List, Optional
+
+from src.core.models import Project
+
+def make_equipment_type(rng: random.Random, maintenance_share: float, silo_share: float) -> Dict:
+    if rng.random() < silo_share:
+        diameter = round(rng.uniform(2.0, 6.0), 1)
+        return {"name": "Силос", "footprint": {"width": diameter, "depth": diameter}, "height": round(rng.uniform(6.0, 10.0), 1)}
+
+    equipment_type = {
+        "name": "Оборудование",
+        "footprint": {"width": round(rng.uniform(1.0, 4.0), 1), "depth": round(rng.uniform(1.0, 4.0), 1)},
+        "height": round(rng.uniform(1.5, 6.0), 1),
+    }
+    if rng.random() < maintenance_share:
+        equipment_type["maintenance_zone"] = {side: round(rng.uniform(0.0, 1.0), 1) for side in ("front", "back", "left", "right")}
+    return equipment_type
+
+def make_synthetic_project(n_items: int, seed: int = 0, chain_share: float = 0.3, maintenance_share: float = 0.5,
+                           fill_factor: float = 0.4, aspect: float = 1.5, time_limit_sec: float = 10.0,
+                           objective_mode: str = "ALL_PAIRS", silo_share: float = 0.0,
+                           catalogue_size: Optional[int] = None, avoid_zones: int = 0, wall_share: float = 0.0,
+                           zone_share: float = 0.0, align_share: float = 0.0) -> Project:
+    # With a catalogue, items are drawn from `catalogue_size` equipment types, as in real plants
+    # with many identical silos and dryers; without one, every item gets its own random size.
+    rng = random.Random(seed)
+    catalogue = [make_equipment_type(rng, maintenance_share, silo_share) for _ in range(catalogue_size or 0)]
+
+    equipment: List[Dict] = []
+    virtual_area = 0.0
+    for i in range(n_items):
+        equipment_type = rng.choice(catalogue) if catalogue else make_equipment_type(rng, maintenance_share, silo_share)
+        item = {"id": f"eq_{i:04d}", **copy.deepcopy(equipment_type)}
+        item["name"] = f"{equipment_type['name']} {i}"
+        width, depth = item["footprint"]["width"], item["footprint"]["depth"]
+        m_zone = item.get("maintenance_zone", {})
+        virtual_area += (width + m_zone.get("left", 0.0) + m_zone.get("right", 0.0)) * (depth + m_zone.get("back", 0.0) + m_zone.get("front", 0.0))
+        equipment.append(item)
+
+    # Short production lines: each chained item is placed after the previous one along Y.
+    # The distance leaves room for both maintenance zones so the chain itself is feasible.
+    rules: List[Dict] = []
+    flows: List[Dict] = []
+    chained = rng.sample(range(n_items), int(n_items * chain_share))
+    for start in range(0, len(chained) - 1, 3):
+        line = chained[start:start + 3]
+        for anchor_idx, target_idx in zip(line, line[1:]):
+            anchor, target = equipment[anchor_idx], equipment[target_idx]
+            gap = anchor.get("maintenance_zone", {}).get("front", 0.0) + target.get("maintenance_zone", {}).get("back", 0.0)
+            rules.append({
+                "type": "PLACE_AFTER",
+                "params": {"target": target["id"], "anchor": anchor["id"], "direction": "Y", "distance": round(gap + 0.5, 1)},
+            })
+            flows.append({"source": anchor["id"], "target": target["id"], "weight": 5.0})
+
+    for _ in range(n_items // 2):
+        source, target = rng.sample(equipment, 2)
+        flows.append({"source": source["id"], "target": target["id"], "weight": round(rng.uniform(0.5, 3.0), 1)})
+
+    wall_thickness = 0.3
+    corridor_width = 2.0
+    room_area = virtual_area / fill_factor
+    room_width = math.sqrt(room_area * aspect) + 2 * wall_thickness + 6.0 + avoid_zones * corridor_width
+    room_depth = math.sqrt(room_area / aspect) + 2 * wall_thickness + 6.0
+
+    # Rule-heavy variants: cross aisles kept free (in the front part of the room, so chains can
+    # pass behind them), items pinned to a wall and items kept in one half of the room.
+    for k in range(avoid_zones):
+        x1 = round(room_width * (k + 1) / (avoid_zones + 1), 1)
+        rules.append({"type": "AVOID_ZONE", "params": {"area": [x1, 0.0, x1 + corridor_width, round(room_depth / 3, 1)]}})
+    free = [i for i in range(n_items) if i not in set(chained)]
+    rng.shuffle(free)
+    n_wall, n_zone = int(len(free) * wall_share), int(len(free) * zone_share)
+    for i in free[:n_wall]:
+        rules.append({"type": "ATTACH_TO_WALL", "params": {"target": equipment[i]["id"], "side": rng.choice(["Xmin", "Xmax", "Ymax"])}})
+    for i in free[n_wall:n_wall + n_zone]:
+        half = rng.choice([[0.0, 0.0, room_width / 2, room_depth], [room_width / 2, 0.0, room_width, room_depth]])
+        rules.append({"type": "PLACE_IN_ZONE", "params": {"target": equipment[i]["id"], "area": [round(v, 1) for v in half]}})
+    # Pairs of the remaining free items centred on the same X line (hard ALIGN rules).
+    aligned = free[n_wall + n_zone:][:2 * int(len(free) * align_share / 2)]
+    for i, j in zip(aligned[::2], aligned[1::2]):
+        rules.append({"type": "ALIGN", "params": {"target1": equipment[i]["id"], "target2": equipment[j]["id"], "axis": "X"}})
+
+    return Project.parse_obj({
+        "meta": {"project_name": f"Synthetic plant ({n_items} items, seed {seed})", "schema_version": "1.3"},
+        "architecture": {
+            "room_dimensions": {"width": round(room_width, 1), "depth": round(room_depth, 1), "height": 12.0},
+            "wall_thickness": wall_thickness,
+        },
+        "equipment": equipment,
+        "rules": rules,
+        "flows": flows,
+        "solver_options": {"time_limit_sec": time_limit_sec, "objective_mode": objective_mode},
+    })
@@ -2,82 +2,372 @@ import logging
 
 logging.getLogger('ifcopenshell').setLevel(logging.ERROR)
 
-import json
+import argparse
 import os
+import shutil
 import sys
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
 from pydantic import ValidationError
 
-from src.core.models import Project
-from src.placer.service import calculate_placements
-from src.generator.service import create_3d_model
-from src.validator.service import validate_collisions
+from src.cache.service import ResultCache, DEFAULT_MAX_BYTES
+from src.core.hashing import library_fingerprint
+from src.core.loader import ProjectJSONError, parse_project
+from src.core.logs import configure_logging
+from src.core.models import Project, SolverOptions, ExportOptions, ValidationReport
+from src.core.tracing import Tracer, count, span, tracing
+from src.generator.preview import PREVIEW_FORMATS, write_preview
+from src.placer.presolve import InfeasibleRulesError
+from src.placer.warmstart import load_placements, save_placements, select_frozen_items
+from src.validator.rules import room_issues, rule_issues, validate_layout, validate_project
 
-def run_generation_pipeline(project_file: str, output_file: str):
-    print(f"--- Starting pipeline for file: {project_file} ---")
+# OR-Tools (with pandas) and ifcopenshell take most of the start-up time, so they are imported
+# by the commands that need them: `validate` uses neither, `solve` skips the IFC stack.
+if TYPE_CHECKING:
+    from src.placer.service import SolutionHandler
 
+COMMANDS = ("validate", "solve", "generate", "preview")
+
+logger = logging.getLogger("main")
+
+def placements_file_for(output_file: str) -> str:
+    return os.path.splitext(output_file)[0] + "_placements.json"
+
+def preview_file_for(output_file: str, preview_format: str) -> str:
+    suffix = "_plan" if preview_format == "svg" else "_preview"
+    return f"{os.path.splitext(output_file)[0]}{suffix}.{preview_format}"
+
+def write_previews(project: Project, placements: Dict[str, Dict[str, float]], output_file: str, preview_formats: Sequence[str]):
+    for preview_format in dict.fromkeys(preview_formats):
+        preview_file = preview_file_for(output_file, preview_format)
+        write_preview(project, placements, preview_file)
+        logger.info(f"  > Preview saved to: {preview_file}")
+
+def print_validation_results(report: ValidationReport):
+    logger.info("\n--- Validation Results ---")
+    if not report.issues:
+        logger.info(f"6. Validation passed: {report.checked_items} items and {report.checked_rules} rules checked, no issues found.")
+    else:
+        status = "passed with warnings" if report.ok else "found errors"
+        logger.info(f"6. Validation {status}:")
+        for issue in report.issues:
+            logger.info(f"  - [{issue.severity}] {issue.check}: {issue.message}")
+
+def count_collisions(report: ValidationReport) -> int:
+    return sum(1 for issue in report.issues if issue.check == "COLLISION")
+
+class PipelineError(Exception):
+    pass
+
+def load_project(project_file: str) -> Project:
     try:
-        with open(project_file, 'r', encoding='utf-8') as f:
-            project_data = json.load(f)
-        print("1. Project data file successfully loaded.")
-        
-        project = Project.parse_obj(project_data)
-        print("1.5. Project data successfully validated against the model.")
-    except FileNotFoundError:
-        print(f"CRITICAL ERROR: Project file '{project_file}' not found.")
-        sys.exit(1)
-    except json.JSONDecodeError as e:
-        print(f"CRITICAL ERROR: Could not parse JSON file. Error: {e}")
-        sys.exit(1)
+        with span("load"), open(project_file, 'rb') as f:
+            raw = f.read()
+        count("project.file_bytes", len(raw))
+        logger.info("1. Project data file successfully loaded.")
+
+        with span("parse"):
+            project = parse_project(raw)
+        count("project.items", len(project.equipment))
+        count("project.rules", len(project.rules))
+        logger.info("1.5. Project data successfully validated against the model.")
+    except FileNotFoundError as e:
+        raise PipelineError(f"Project file '{project_file}' not found.") from e
+    except ProjectJSONError as e:
+        raise PipelineError(f"Could not parse JSON file. Error: {e}") from e
     except ValidationError as e:
-        print(f"CRITICAL ERROR: The project file '{project_file}' has an invalid data structure.")
-        print("Validation Details:")
-        print(e)
-        sys.exit(1)
+        raise PipelineError(f"The project file '{project_file}' has an invalid data structure.\nValidation Details:\n{e}") from e
     except Exception as e:
-        print(f"CRITICAL ERROR: An unexpected error occurred: {e}")
-        sys.exit(1)
+        raise PipelineError(f"An unexpected error occurred: {e}") from e
+    return project
 
-    print(f"\n2. Processing project: '{project.meta.project_name}'")
-    
-    final_placements = calculate_placements(project)
+def check_project(project_file: str, placements_file: Optional[str] = None) -> ValidationReport:
+    logger.info(f"--- Checking project: {project_file} ---")
+    project = load_project(project_file)
+    report = validate_project(project)
+    if placements_file and report.ok:
+        logger.info(f"  - Checking placements '{placements_file}'")
+        previous = load_placements(placements_file)
+        if previous is None:
+            raise PipelineError(f"Placements file '{placements_file}' not found.")
+        report = validate_layout(project, previous.get('placements', {}))
+    print_validation_results(report)
+    return report
+
+def check_rules(project: Project):
+    # Rules the model cannot even be built from are reported before solving.
+    invalid = [issue.message for issue in rule_issues(project) + room_issues(project)
+               if issue.check in ("INVALID_RULE", "UNKNOWN_TARGET", "ROOM") and issue.severity == "ERROR"]
+    if invalid:
+        raise PipelineError("The project has malformed rules or rooms:\n" + "\n".join(f"  - {message}" for message in invalid))
+
+def preview_layout(project_file: str, placements_file: str, output_file: str, preview_formats: Sequence[str]):
+    logger.info(f"--- Drawing preview: {project_file} ---")
+    project = load_project(project_file)
+    previous = load_placements(placements_file)
+    if previous is None:
+        raise PipelineError(f"Placements file '{placements_file}' not found. Run 'solve' first or pass --placements.")
+    write_previews(project, previous.get('placements', {}), output_file, preview_formats)
+
+def run_generation_pipeline(project_file: str, output_file: str, warm_start_file: str = None,
+                            freeze_unchanged: bool = False, freeze_radius: float = 5.0,
+                            cache: ResultCache = None, time_limit_sec: float = None,
+                            num_workers: int = None, level_of_detail: str = None,
+                            on_solution: "SolutionHandler" = None, stop_event: threading.Event = None,
+                            write_model: bool = True, preview_formats: Sequence[str] = (),
+                            library_dir: Optional[str] = None) -> Dict[str, Any]:
+    logger.info(f"--- Starting pipeline for file: {project_file} ---")
+
+    project = load_project(project_file)
+    check_rules(project)
+
+    if time_limit_sec is not None or num_workers is not None:
+        options = project.solver_options or SolverOptions()
+        if time_limit_sec is not None:
+            options.time_limit_sec = min(options.time_limit_sec or time_limit_sec, time_limit_sec)
+        if num_workers is not None:
+            options.num_workers = num_workers
+        project.solver_options = options
+
+    if level_of_detail is not None:
+        export_options = project.export_options or ExportOptions()
+        export_options.level_of_detail = level_of_detail
+        project.export_options = export_options
+
+    summary = {
+        'project_file': project_file,
+        'status': None,
+        'objective': None,
+        'solve_time_sec': None,
+        'collisions': None,
+        'output_file': None,
+    }
+
+    logger.info(f"\n2. Processing project: '{project.meta.project_name}'")
     
+    # A frozen re-layout depends on the previous layout as well as on the project, so it is not cached.
+    # Relative model_file paths are resolved against library_dir, by default the project file's directory.
+    library_dir = library_dir or os.path.dirname(os.path.abspath(project_file))
+    result_file = output_file if write_model else placements_file_for(output_file)
+    cache_key = None
+    if cache and not freeze_unchanged:
+        cache_key = cache.key_for(project, variant={'model_files': library_fingerprint(project, library_dir),
+                                                    'format': os.path.splitext(output_file)[1].lower()})
+        cached = cache.get(cache_key)
+        if cached:
+            if write_model:
+                logger.info(f"  - Cache hit ({cache_key[:12]}). Reusing placements, validation results and IFC model.")
+                shutil.copyfile(cached['model_file'], output_file)
+            else:
+                logger.info(f"  - Cache hit ({cache_key[:12]}). Reusing placements and validation results.")
+            save_placements(placements_file_for(output_file), project, cached['placements'])
+            write_previews(project, cached['placements'], output_file, preview_formats)
+            logger.info(f"\n--- Pipeline finished. {'Model' if write_model else 'Placements'} saved to: {result_file} ---")
+            # Re-checking is cheap, so cached layouts are validated again rather than trusted.
+            report = validate_layout(project, cached['placements'])
+            print_validation_results(report)
+            cached_stats = cached['stats'] or {}
+            summary.update(status='CACHED', objective=cached_stats.get('objective_value'),
+                           solve_time_sec=cached_stats.get('wall_time_sec'),
+                           collisions=count_collisions(report), output_file=result_file)
+            return summary
+
+    hint_placements, frozen_ids = None, None
+    if warm_start_file:
+        previous = load_placements(warm_start_file)
+        if previous:
+            logger.info(f"  - Warm start from previous placements: {warm_start_file}")
+            hint_placements = previous.get('placements', {})
+            if freeze_unchanged:
+                frozen_ids = select_frozen_items(project, previous, freeze_radius)
+        else:
+            logger.info(f"  - Warm start file '{warm_start_file}' not found. Solving from scratch.")
+
+    from src.placer.service import calculate_placements
+    try:
+        placement_result = calculate_placements(project, hint_placements=hint_placements, frozen_ids=frozen_ids,
+                                                on_solution=on_solution, stop_event=stop_event)
+    except InfeasibleRulesError as e:
+        raise PipelineError(f"The project rules cannot be satisfied: {e}") from e
+    final_placements = placement_result.placements
+    stats = placement_result.stats
+    gap = f"{stats.relative_gap:.2%}" if stats.relative_gap is not None else "n/a"
+    logger.info(f"  > Solver status: {stats.status}, wall time: {stats.wall_time_sec:.2f}s, "
+                f"conflicts: {stats.num_conflicts}, branches: {stats.num_branches}, "
+                f"objective: {stats.objective_value}, best bound: {stats.best_objective_bound}, gap: {gap}")
+
+    summary.update(status=stats.status, objective=stats.objective_value, solve_time_sec=stats.wall_time_sec)
+    if placement_result.is_fallback:
+        logger.warning("  > WARNING: Using the greedy fallback layout. Check the validation results before relying on it.")
+        summary['status'] = 'HEURISTIC_FALLBACK'
+
     if not final_placements:
-        print("ERROR: Could not calculate placements. Halting generation.")
-        return
+        logger.error("ERROR: Could not calculate placements. Halting generation.")
+        return summary
 
-    print("\n3. Final Coordinates:")
+    logger.debug("\n3. Final Coordinates:")
     for eq_id, placement in final_placements.items():
-        print(f"  - Item '{eq_id}': X={placement['x']:.2f}, Y={placement['y']:.2f}")
+        logger.debug(f"  - Item '{eq_id}': X={placement['x']:.2f}, Y={placement['y']:.2f}")
 
-    print("\n4. Performing collision validation...")
-    validation_errors = validate_collisions(project, final_placements)
+    placements_file = placements_file_for(output_file)
+    save_placements(placements_file, project, final_placements)
+    logger.info(f"  > Placements saved to: {placements_file}")
+    # Previews come before the IFC model so they can be looked at while it is being written.
+    write_previews(project, final_placements, output_file, preview_formats)
 
-    create_3d_model(project, final_placements, output_file)
+    logger.info("\n4. Validating the layout against all project rules...")
+    report = validate_layout(project, final_placements)
 
-    print(f"\n--- Pipeline finished. Model saved to: {output_file} ---")
-    print("\n--- Validation Results ---")
-    if not validation_errors:
-        print("6. Валидация пройдена успешно. Коллизий не обнаружено.")
-    else:
-        print("6. Валидация выявила ошибки:")
-        for error in validation_errors:
-            print(f"  - {error}")
+    if write_model:
+        from src.generator.service import create_3d_model
+        create_3d_model(project, final_placements, output_file, library_dir=library_dir)
 
-if __name__ == "__main__":
-    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-    
-    input_json_path = os.path.join(SCRIPT_DIR, "project.json")
-    
-    if len(sys.argv) > 1:
-        input_json_path = sys.argv[1]
-        print(f"Using project file from command-line argument: {input_json_path}")
+        # A fallback layout or a search stopped early is not worth keeping: a later run may well
+        # find a better solution. Cache entries hold the IFC model, so only full runs store one.
+        if cache_key and not placement_result.is_fallback and not placement_result.stopped:
+            cache.put(cache_key, final_placements, [issue.dict() for issue in report.issues], output_file, stats=stats.dict())
+
+    logger.info(f"\n--- Pipeline finished. {'Model' if write_model else 'Placements'} saved to: {result_file} ---")
+    print_validation_results(report)
+
+    summary.update(collisions=count_collisions(report), output_file=result_file)
+    return summary
+
+def build_parser(script_dir: str) -> argparse.ArgumentParser:
+    default_project = os.path.join(script_dir, "project.json")
+    parser = argparse.ArgumentParser(description="Generate a factory layout and IFC model from a project file. "
+                                                 "Without a command, 'generate' is run.")
+    commands = parser.add_subparsers(dest="command", metavar="{validate,solve,generate,preview}")
+
+    # Logging and instrumentation options shared by every command.
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument("-v", "--verbose", action="store_true", help="Also log every rule, item coordinate and IFC object.")
+    output.add_argument("-q", "--quiet", action="store_true", help="Only log warnings and errors.")
+    output.add_argument("--trace", metavar="TRACE_FILE",
+                        help="Write per-stage spans and counters as a Chrome trace (open in chrome://tracing or Perfetto).")
+    output.add_argument("--metrics", metavar="METRICS_FILE",
+                        help="Write per-stage durations and counters (variables, constraints, IFC entities, bytes) as JSON.")
+
+    validate = commands.add_parser("validate", parents=[output], help="Check the project file and its rules without solving (fast).")
+    validate.add_argument("project_file", nargs="?", default=default_project,
+                          help="Path to the project JSON file (default: project.json next to main.py).")
+    validate.add_argument("--placements", metavar="PLACEMENTS_FILE",
+                          help="Also validate an existing placements file (e.g. edited by hand) against the project.")
+
+    pipeline = argparse.ArgumentParser(add_help=False, parents=[output])
+    pipeline.add_argument("project_file", nargs="?", default=default_project,
+                          help="Path to the project JSON file (default: project.json next to main.py).")
+    pipeline.add_argument("--warm-start", metavar="PLACEMENTS_FILE",
+                          help="Previous placements file to use as solver hints, or 'auto' for the last run's output.")
+    pipeline.add_argument("--freeze-unchanged", action="store_true",
+                          help="Keep unchanged items at their previous positions and only re-optimise around edits.")
+    pipeline.add_argument("--freeze-radius", type=float, default=5.0,
+                          help="Unchanged items within this distance (m) of an edited item are re-optimised too.")
+    pipeline.add_argument("--no-cache", action="store_true",
+                          help="Always re-solve, re-validate and re-write the IFC, bypassing the result cache.")
+    pipeline.add_argument("--cache-dir", default=os.path.join(script_dir, ".layout_cache"),
+                          help="Directory of the content-addressed result cache.")
+    pipeline.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+                          help="Size limit of the result cache; least recently used entries are evicted first.")
+    pipeline.add_argument("--progress-file", metavar="JSONL_FILE",
+                          help="Write every improving solution (objective, bound, time, placements) as a JSON line while solving.")
+    pipeline.add_argument("--preview", metavar="FORMAT", action="append", choices=PREVIEW_FORMATS, default=[],
+                          help="Also draw the layout as an SVG plan (svg) or a box-level 3D view (obj, gltf, glb); may be repeated.")
+
+    commands.add_parser("solve", parents=[pipeline], help="Compute and validate the placements only; no IFC model is written.")
+    generate = commands.add_parser("generate", parents=[pipeline], help="Solve, validate and write the IFC model.")
+    generate.add_argument("--lod", choices=["BOX", "SWEPT", "BREP"], default=None,
+                          help="IFC level of detail; overrides export_options.level_of_detail from the project.")
+    generate.add_argument("--ifczip", action="store_true",
+                          help="Write the IFC model zip-compressed (.ifczip), typically 5-10 times smaller.")
+    # Former spelling of `validate --placements`.
+    generate.add_argument("--check-placements", metavar="PLACEMENTS_FILE", help=argparse.SUPPRESS)
+
+    preview = commands.add_parser("preview", parents=[output],
+                                  help="Draw placements as an SVG plan or a box-level 3D view without solving or IFC (fast).")
+    preview.add_argument("project_file", nargs="?", default=default_project,
+                         help="Path to the project JSON file (default: project.json next to main.py).")
+    preview.add_argument("--placements", metavar="PLACEMENTS_FILE",
+                         help="Placements file to draw (default: the last solve or generate output of the project).")
+    preview.add_argument("--format", dest="preview", metavar="FORMAT", action="append", choices=PREVIEW_FORMATS,
+                         help="svg, obj, gltf or glb; may be repeated (default: svg).")
+    return parser
+
+def format_timings(summary: Dict[str, Any]) -> str:
+    stages = ", ".join(f"{name} {stage['total_sec']:.2f}s" for name, stage in summary['stages'].items())
+    return f"Stage timings: {stages or 'none'}; total {summary['wall_time_sec']:.2f}s"
 
-    output_dir = os.path.join(SCRIPT_DIR, "output")
+def main(argv: Optional[List[str]] = None) -> int:
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in COMMANDS + ("-h", "--help"):
+        argv.insert(0, "generate")
+    args = build_parser(script_dir).parse_args(argv)
+    configure_logging(logging.DEBUG if args.verbose else logging.WARNING if args.quiet else logging.INFO)
+
+    tracer = Tracer()
+    try:
+        with tracing(tracer):
+            return run_command(args, script_dir)
+    finally:
+        summary = tracer.summary()
+        logger.info(f"\n{format_timings(summary)}")
+        if summary['counters']:
+            logger.debug("Counters: " + ", ".join(f"{name} {value:g}" for name, value in summary['counters'].items()))
+        if args.trace:
+            tracer.write_chrome_trace(args.trace)
+            logger.info(f"Trace saved to: {args.trace}")
+        if args.metrics:
+            tracer.write_json(args.metrics)
+            logger.info(f"Metrics saved to: {args.metrics}")
+
+def run_command(args: argparse.Namespace, script_dir: str) -> int:
+    if args.command == "validate" or getattr(args, "check_placements", None):
+        try:
+            report = check_project(args.project_file, getattr(args, "placements", None) or getattr(args, "check_placements", None))
+        except PipelineError as e:
+            logger.error(f"CRITICAL ERROR: {e}")
+            return 1
+        return 0 if report.ok else 2
+
+    output_dir = os.path.join(script_dir, "output")
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
-        print(f"Created output directory: {output_dir}")
+        logger.info(f"Created output directory: {output_dir}")
 
-    base_name = os.path.splitext(os.path.basename(input_json_path))[0]
-    output_ifc_path = os.path.join(output_dir, f"{base_name}_model.ifc")
-    
-    run_generation_pipeline(input_json_path, output_ifc_path)
+    base_name = os.path.splitext(os.path.basename(args.project_file))[0]
+    output_ifc_path = os.path.join(output_dir, f"{base_name}_model{'.ifczip' if getattr(args, 'ifczip', False) else '.ifc'}")
+
+    if args.command == "preview":
+        try:
+            preview_layout(args.project_file, args.placements or placements_file_for(output_ifc_path), output_ifc_path,
+                           args.preview or ["svg"])
+        except PipelineError as e:
+            logger.error(f"CRITICAL ERROR: {e}")
+            return 1
+        return 0
+
+    warm_start_file = args.warm_start
+    if warm_start_file == "auto":
+        warm_start_file = placements_file_for(output_ifc_path)
+
+    cache = None if args.no_cache else ResultCache(args.cache_dir, int(args.cache_max_mb * 1024 * 1024))
+
+    progress_writer = None
+    if args.progress_file:
+        from src.placer.progress import JsonLinesWriter
+        progress_writer = JsonLinesWriter(args.progress_file)
+    try:
+        run_generation_pipeline(args.project_file, output_ifc_path, warm_start_file, args.freeze_unchanged, args.freeze_radius, cache,
+                                level_of_detail=getattr(args, "lod", None), on_solution=progress_writer,
+                                write_model=args.command == "generate", preview_formats=args.preview)
+    except PipelineError as e:
+        logger.error(f"CRITICAL ERROR: {e}")
+        return 1
+    finally:
+        if progress_writer:
+            progress_writer.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
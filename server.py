@@ -0,0 +1,416 @@
+"""
+Long-lived local layout service. Jobs are submitted over HTTP on the loopback interface and run
+the generation pipeline (placement, validation, IFC) in a pool of pre-warmed worker processes,
+so the interpreter start-up, the ifcopenshell / OR-Tools imports and the pydantic model setup
+are paid once per worker instead of once per project. Everything stays on this machine.
+
+Endpoints:
+    POST   /jobs                  Submit a project (the project JSON itself, or {"project_file": path}
+                                  with a path inside --project-root). Relative model_file paths of a
+                                  posted project are resolved against --project-root.
+                                  Optional query parameters: time_limit, solver_workers, lod.
+    GET    /jobs                  List jobs.
+    GET    /jobs/<id>             Job status, solver progress and, once done, the pipeline summary.
+    POST   /jobs/<id>/cancel      Cancel a queued job, or stop the search of a running one (its best
+    DELETE /jobs/<id>             layout so far is still validated and written to IFC).
+    GET    /jobs/<id>/model.ifc   Stream the generated IFC model.
+    GET    /jobs/<id>/placements  The placements file of the job.
+    GET    /jobs/<id>/log         The pipeline log of the job.
+    GET    /health                Pool size, queued and running jobs.
+
+Usage: python server.py [--port 8765] [--workers 2] [--max-queued 16] [--solver-workers 8] [--project-root DIR]
+"""
+import logging
+
+logging.getLogger('ifcopenshell').setLevel(logging.ERROR)
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from pydantic import ValidationError
+
+from src.cache.service import ResultCache
+from src.core.logs import configure_logging
+from src.core.models import Project, SolutionUpdate
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+FINISHED_STATES = ('DONE', 'FAILED', 'CANCELLED')
+
+def warm_up_worker():
+    # Runs once in every worker process: pays for the heavy imports and the first CP-SAT solve
+    # (which loads the native library) before the first job arrives.
+    configure_logging()
+    import main  # noqa: F401
+    import src.generator.service  # noqa: F401
+    import src.placer.service  # noqa: F401
+    from ortools.sat.python import cp_model
+
+    model = cp_model.CpModel()
+    model.NewIntVar(0, 1, "warm_up")
+    cp_model.CpSolver().Solve(model)
+
+def ping() -> int:
+    return os.getpid()
+
+class ProgressRecorder:
+    """Solution handler that publishes the latest solver progress to the job's shared dict."""
+
+    def __init__(self, progress):
+        self.progress = progress
+
+    def __call__(self, update: SolutionUpdate) -> bool:
+        self.progress.update(num_solutions=update.solution_index, objective=update.objective_value,
+                             best_bound=update.best_objective_bound, relative_gap=update.relative_gap,
+                             solve_time_sec=update.wall_time_sec)
+        return False
+
+def run_service_job(project_file: str, job_dir: str, stop_event, progress, time_limit_sec: Optional[float],
+                    solver_workers: Optional[int], level_of_detail: Optional[str], cache_dir: Optional[str],
+                    library_dir: Optional[str] = None) -> Dict[str, Any]:
+    from main import PipelineError, run_generation_pipeline
+
+    progress.update(state='RUNNING', started=time.time())
+    output_file = os.path.join(job_dir, "model.ifc")
+    cache = ResultCache(cache_dir) if cache_dir else None
+    with open(os.path.join(job_dir, "job.log"), 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        try:
+            return run_generation_pipeline(project_file, output_file, cache=cache, time_limit_sec=time_limit_sec,
+                                           num_workers=solver_workers, level_of_detail=level_of_detail,
+                                           on_solution=ProgressRecorder(progress), stop_event=stop_event,
+                                           library_dir=library_dir)
+        except PipelineError as e:
+            print(f"CRITICAL ERROR: {e}")
+            raise
+
+class QueueFullError(Exception):
+    pass
+
+@dataclass
+class Job:
+    id: str
+    job_dir: str
+    project_file: str
+    stop_event: Any
+    progress: Any
+    future: Optional[Future] = None
+    state: str = 'QUEUED'
+    created: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+    stop_requested: bool = False
+    summary: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    # Copy of the shared progress dict, taken when the job finishes.
+    final_progress: Dict[str, Any] = field(default_factory=dict)
+
+    def status(self) -> Dict[str, Any]:
+        progress = dict(self.final_progress if self.state in FINISHED_STATES else self.progress)
+        # The pool accepts more jobs than it has workers, so a submitted job only runs once the worker reports it.
+        running = progress.pop('state', None) == 'RUNNING'
+        return {
+            'id': self.id,
+            'state': 'RUNNING' if self.state == 'QUEUED' and running else self.state,
+            'created': self.created,
+            'started': progress.pop('started', None),
+            'finished': self.finished,
+            'stop_requested': self.stop_requested,
+            'progress': progress,
+            'summary': self.summary,
+            'error': self.error,
+        }
+
+class JobQueue:
+    """
+    Bookkeeping for the service: submits jobs to the warm process pool, enforces the queue limit,
+    tracks job states and evicts the oldest finished jobs (and their files) beyond `keep_jobs`.
+    """
+
+    def __init__(self, jobs_dir: str, workers: int, max_queued: int, keep_jobs: int,
+                 solver_workers: Optional[int], cache_dir: Optional[str], project_root: str):
+        self.jobs_dir = jobs_dir
+        self.project_root = os.path.realpath(project_root)
+        self.workers = workers
+        self.max_queued = max_queued
+        self.keep_jobs = keep_jobs
+        self.solver_workers = solver_workers
+        self.cache_dir = cache_dir
+        self.jobs: Dict[str, Job] = {}
+        self.lock = threading.Lock()
+        os.makedirs(jobs_dir, exist_ok=True)
+
+        # Spawned workers do not inherit the HTTP server's threads or sockets.
+        context = multiprocessing.get_context('spawn')
+        self.manager = context.Manager()
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=warm_up_worker)
+
+    def warm_up(self) -> int:
+        # The pool starts its processes lazily; one task per worker starts (and warms) all of them.
+        pids = {future.result() for future in [self.executor.submit(ping) for _ in range(self.workers)]}
+        return len(pids)
+
+    def counts(self) -> Dict[str, int]:
+        with self.lock:
+            states = [job.status()['state'] for job in self.jobs.values()]
+        return {state: states.count(state) for state in ('QUEUED', 'RUNNING', 'DONE', 'FAILED', 'CANCELLED')}
+
+    def submit(self, project_data: Optional[Dict], project_file: Optional[str], time_limit_sec: Optional[float],
+               solver_workers: Optional[int], level_of_detail: Optional[str]) -> Job:
+        with self.lock:
+            pending = sum(1 for job in self.jobs.values() if job.state not in FINISHED_STATES)
+            if pending >= self.workers + self.max_queued:
+                raise QueueFullError(f"{pending} jobs are already queued or running.")
+
+            job_id = uuid.uuid4().hex[:12]
+            job_dir = os.path.join(self.jobs_dir, job_id)
+            os.makedirs(job_dir)
+            # A posted project is written into the job directory, but its vendor models live under
+            # the project root, not there.
+            library_dir = None
+            if project_data is not None:
+                library_dir = self.project_root
+                project_file = os.path.join(job_dir, "project.json")
+                with open(project_file, 'w', encoding='utf-8') as f:
+                    json.dump(project_data, f, ensure_ascii=False)
+
+            job = Job(id=job_id, job_dir=job_dir, project_file=project_file,
+                      stop_event=self.manager.Event(), progress=self.manager.dict())
+            self.jobs[job_id] = job
+            job.future = self.executor.submit(
+                run_service_job, project_file, job_dir, job.stop_event, job.progress, time_limit_sec,
+                solver_workers if solver_workers is not None else self.solver_workers, level_of_detail, self.cache_dir,
+                library_dir)
+        job.future.add_done_callback(lambda future: self.finish(job, future))
+        return job
+
+    def finish(self, job: Job, future: Future):
+        with self.lock:
+            try:
+                job.final_progress = dict(job.progress)
+            except Exception:
+                # The manager is already gone when the service shuts down.
+                job.final_progress = {}
+            job.finished = time.time()
+            try:
+                job.summary = future.result()
+                job.state = 'DONE'
+            except CancelledError:
+                job.state = 'CANCELLED'
+            except Exception as e:
+                job.state = 'FAILED'
+                job.error = str(e).splitlines()[0] if str(e) else type(e).__name__
+            self.evict()
+
+    def evict(self):
+        finished = sorted((job for job in self.jobs.values() if job.state in FINISHED_STATES), key=lambda job: job.finished)
+        for job in finished[:max(0, len(finished) - self.keep_jobs)]:
+            del self.jobs[job.id]
+            shutil.rmtree(job.job_dir, ignore_errors=True)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [job.status() for job in sorted(self.jobs.values(), key=lambda job: job.created)]
+
+    def cancel(self, job: Job) -> Dict[str, Any]:
+        # A queued job never starts; a running one stops searching and finishes with its best layout.
+        if not job.future.cancel() and job.state not in FINISHED_STATES:
+            job.stop_requested = True
+            job.stop_event.set()
+        return job.status()
+
+    def shutdown(self):
+        with self.lock:
+            for job in self.jobs.values():
+                if job.state not in FINISHED_STATES:
+                    job.stop_requested = True
+                    job.stop_event.set()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.manager.shutdown()
+
+class LayoutRequestHandler(BaseHTTPRequestHandler):
+    server_version = "LayoutService/1.0"
+    queue: JobQueue = None
+
+    def log_message(self, format, *args):
+        print(f"  [{self.log_date_time_string()}] {format % args}")
+
+    def send_json(self, status: int, data: Any):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status: int, message: str):
+        self.send_json(status, {'error': message})
+
+    def send_file(self, path: str, content_type: str, download_name: Optional[str] = None):
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            self.send_error_json(404, "The job has not produced this file.")
+            return
+        with f:
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+            if download_name:
+                self.send_header("Content-Disposition", f'attachment; filename="{download_name}"')
+            self.end_headers()
+            # IFC models can be large; stream them instead of reading them into memory.
+            shutil.copyfileobj(f, self.wfile, STREAM_CHUNK_SIZE)
+
+    def route(self) -> Tuple[List[str], Dict[str, List[str]]]:
+        url = urlparse(self.path)
+        return [part for part in url.path.split("/") if part], parse_qs(url.query)
+
+    def find_job(self, job_id: str) -> Optional[Job]:
+        job = self.queue.get(job_id)
+        if job is None:
+            self.send_error_json(404, f"Unknown job '{job_id}'.")
+        return job
+
+    def do_GET(self):
+        parts, _ = self.route()
+        if parts == ["health"]:
+            self.send_json(200, {'workers': self.queue.workers, 'max_queued': self.queue.max_queued, 'jobs': self.queue.counts()})
+        elif parts == ["jobs"]:
+            self.send_json(200, self.queue.list())
+        elif len(parts) in (2, 3) and parts[0] == "jobs":
+            job = self.find_job(parts[1])
+            if job is None:
+                return
+            if len(parts) == 2:
+                self.send_json(200, job.status())
+            elif parts[2] == "model.ifc":
+                self.send_file(os.path.join(job.job_dir, "model.ifc"), "application/x-step", f"{job.id}.ifc")
+            elif parts[2] == "placements":
+                self.send_file(os.path.join(job.job_dir, "model_placements.json"), "application/json; charset=utf-8")
+            elif parts[2] == "log":
+                self.send_file(os.path.join(job.job_dir, "job.log"), "text/plain; charset=utf-8")
+            else:
+                self.send_error_json(404, f"Unknown resource '{self.path}'.")
+        else:
+            self.send_error_json(404, f"Unknown resource '{self.path}'.")
+
+    def do_POST(self):
+        parts, query = self.route()
+        if parts == ["jobs"]:
+            self.submit_job(query)
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+            job = self.find_job(parts[1])
+            if job:
+                self.send_json(202, self.queue.cancel(job))
+        else:
+            self.send_error_json(404, f"Unknown resource '{self.path}'.")
+
+    def do_DELETE(self):
+        parts, _ = self.route()
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = self.find_job(parts[1])
+            if job:
+                self.send_json(202, self.queue.cancel(job))
+        else:
+            self.send_error_json(404, f"Unknown resource '{self.path}'.")
+
+    def submit_job(self, query: Dict[str, List[str]]):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            data = json.loads(self.rfile.read(length) or b"null")
+        except (ValueError, json.JSONDecodeError) as e:
+            self.send_error_json(400, f"Could not parse the request body as JSON: {e}")
+            return
+        if not isinstance(data, dict):
+            self.send_error_json(400, "Expected a project JSON object or {\"project_file\": path}.")
+            return
+
+        project_data, project_file = data, None
+        if set(data) == {"project_file"}:
+            # Only project files under the project root can be opened; relative paths start there.
+            root = self.queue.project_root
+            project_data, project_file = None, os.path.realpath(os.path.join(root, str(data["project_file"])))
+            if os.path.commonpath([root, project_file]) != root:
+                self.send_error_json(403, f"Project file '{data['project_file']}' is outside the project root.")
+                return
+            if not os.path.isfile(project_file):
+                self.send_error_json(400, f"Project file '{data['project_file']}' not found.")
+                return
+        else:
+            # Structural errors are reported right away instead of through a failed job.
+            try:
+                Project.parse_obj(data)
+            except ValidationError as e:
+                self.send_error_json(400, f"The project has an invalid data structure:\n{e}")
+                return
+
+        try:
+            time_limit = float(query["time_limit"][0]) if "time_limit" in query else None
+            solver_workers = int(query["solver_workers"][0]) if "solver_workers" in query else None
+        except ValueError as e:
+            self.send_error_json(400, f"Invalid query parameter: {e}")
+            return
+        level_of_detail = query.get("lod", [None])[0]
+        if level_of_detail not in (None, "BOX", "SWEPT", "BREP"):
+            self.send_error_json(400, f"Invalid level of detail '{level_of_detail}'; expected BOX, SWEPT or BREP.")
+            return
+
+        try:
+            job = self.queue.submit(project_data, project_file, time_limit, solver_workers, level_of_detail)
+        except QueueFullError as e:
+            self.send_error_json(503, f"The job queue is full: {e} Try again later.")
+            return
+        self.send_json(202, job.status())
+
+if __name__ == "__main__":
+    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default: loopback only).")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 4),
+                        help="Warm worker processes, i.e. jobs solved at the same time.")
+    parser.add_argument("--max-queued", type=int, default=16, help="Jobs waiting for a worker before new ones are refused.")
+    parser.add_argument("--solver-workers", type=int, default=None,
+                        help="Default CP-SAT workers per job; keep workers x solver workers close to the core count.")
+    parser.add_argument("--keep-jobs", type=int, default=100, help="Finished jobs (and their files) kept for download.")
+    parser.add_argument("--jobs-dir", default=os.path.join(SCRIPT_DIR, "output", "service"),
+                        help="Directory for each job's project, IFC model, placements and log.")
+    parser.add_argument("--project-root", default=SCRIPT_DIR,
+                        help="Directory that {\"project_file\": path} jobs must be in, and against which relative "
+                             "model_file paths of posted projects are resolved.")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the result cache.")
+    parser.add_argument("--cache-dir", default=os.path.join(SCRIPT_DIR, ".layout_cache"),
+                        help="Directory of the content-addressed result cache.")
+    args = parser.parse_args()
+
+    queue = JobQueue(args.jobs_dir, args.workers, args.max_queued, args.keep_jobs, args.solver_workers,
+                     None if args.no_cache else args.cache_dir, args.project_root)
+    start = time.perf_counter()
+    warmed = queue.warm_up()
+    print(f"--- {warmed} worker processes warmed up in {time.perf_counter() - start:.1f}s ---")
+
+    LayoutRequestHandler.queue = queue
+    server = ThreadingHTTPServer((args.host, args.port), LayoutRequestHandler)
+    print(f"--- Layout service listening on http://{args.host}:{args.port} ---")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n--- Shutting down: stopping running jobs ---")
+    finally:
+        server.server_close()
+        queue.shutdown()
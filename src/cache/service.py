@@ -0,0 +1,105 @@
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Optional
+
+from src.core.hashing import content_hash
+from src.core.models import Project
+
+CACHE_FORMAT_VERSION = 2
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+PLACEMENTS_FILE = "placements.json"
+VALIDATION_FILE = "validation.json"
+MODEL_FILE = "model.ifc"
+STATS_FILE = "stats.json"
+
+class ResultCache:
+    """
+    On-disk cache of pipeline results (placements, validation results and the IFC model),
+    keyed by a canonical hash of the parsed project, its solver options and the pipeline variant.
+    Entries are evicted least-recently-used first once the cache grows beyond `max_bytes`.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key_for(self, project: Project, variant: Optional[Dict] = None) -> str:
+        return content_hash({
+            'version': CACHE_FORMAT_VERSION,
+            'project': project.dict(),
+            'variant': variant or {},
+        })
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry_dir = self._entry_dir(key)
+        paths = {name: os.path.join(entry_dir, name) for name in (PLACEMENTS_FILE, VALIDATION_FILE, MODEL_FILE)}
+        if not all(os.path.exists(path) for path in paths.values()):
+            return None
+
+        with open(paths[PLACEMENTS_FILE], 'r', encoding='utf-8') as f:
+            placements = json.load(f)
+        with open(paths[VALIDATION_FILE], 'r', encoding='utf-8') as f:
+            validation = json.load(f)
+
+        stats = None
+        stats_path = os.path.join(entry_dir, STATS_FILE)
+        if os.path.exists(stats_path):
+            with open(stats_path, 'r', encoding='utf-8') as f:
+                stats = json.load(f)
+
+        os.utime(entry_dir)
+        return {'placements': placements, 'validation': validation, 'model_file': paths[MODEL_FILE], 'stats': stats}
+
+    def put(self, key: str, placements: Dict[str, Dict[str, float]], validation: List, model_file: str,
+            stats: Optional[Dict] = None):
+        entry_dir = self._entry_dir(key)
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+
+        # Build the entry next to its final location and rename it into place, so that a
+        # concurrent reader never sees a half-written entry.
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=os.path.dirname(entry_dir))
+        try:
+            with open(os.path.join(tmp_dir, PLACEMENTS_FILE), 'w', encoding='utf-8') as f:
+                json.dump(placements, f, ensure_ascii=False)
+            with open(os.path.join(tmp_dir, VALIDATION_FILE), 'w', encoding='utf-8') as f:
+                json.dump(validation, f, ensure_ascii=False)
+            if stats is not None:
+                with open(os.path.join(tmp_dir, STATS_FILE), 'w', encoding='utf-8') as f:
+                    json.dump(stats, f, ensure_ascii=False)
+            shutil.copyfile(model_file, os.path.join(tmp_dir, MODEL_FILE))
+            if os.path.exists(entry_dir):
+                shutil.rmtree(entry_dir)
+            os.replace(tmp_dir, entry_dir)
+        finally:
+            if os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir)
+
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                entry_dir = os.path.join(prefix_dir, name)
+                if name.startswith(".tmp-") or not os.path.isdir(entry_dir):
+                    continue
+                size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+                entries.append((os.stat(entry_dir).st_mtime, size, entry_dir))
+                total += size
+
+        for _, size, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
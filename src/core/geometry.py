@@ -0,0 +1,61 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+from src.core.models import Architecture, EquipmentItem, SolverOptions
+
+# Orientations the placer chooses from, in degrees counter-clockwise about Z.
+ORIENTATIONS = (0, 90)
+
+def quarter_turns(rotation_deg: float) -> int:
+    return int(round(rotation_deg / 90.0)) % 4
+
+def can_rotate(item: EquipmentItem, options: Optional[SolverOptions]) -> bool:
+    if item.allow_rotation is not None:
+        return item.allow_rotation
+    return bool(options and options.allow_rotation)
+
+def item_orientations(item: EquipmentItem, options: Optional[SolverOptions]) -> Tuple[int, ...]:
+    return ORIENTATIONS if can_rotate(item, options) else (0,)
+
+def oriented_footprint(item: EquipmentItem, rotation_deg: float = 0) -> Tuple[float, float]:
+    # Extent of the turned footprint along X and Y.
+    if quarter_turns(rotation_deg) % 2:
+        return item.footprint.depth, item.footprint.width
+    return item.footprint.width, item.footprint.depth
+
+def oriented_maintenance(item: EquipmentItem, rotation_deg: float = 0) -> Tuple[float, float, float, float]:
+    # Clearances towards -X, -Y, +X and +Y of the turned item. The item's left side faces -X and
+    # its front +Y when unturned; each quarter turn counter-clockwise moves every side one step
+    # on (front to -X, left to -Y, back to +X, right to +Y).
+    m_zone = item.maintenance_zone
+    sides = (m_zone.left, m_zone.back, m_zone.right, m_zone.front) if m_zone else (0.0, 0.0, 0.0, 0.0)
+    turns = quarter_turns(rotation_deg)
+    return sides[4 - turns:] + sides[:4 - turns]
+
+def roof_clearance(arch: Architecture, x1: np.ndarray, x2: np.ndarray) -> np.ndarray:
+    # Free height above the floor over each footprint's X range. A gable roof (also the
+    # generator's fallback when no roof is configured) starts at wall height at the side
+    # walls and rises to the ridge in the middle, so the lowest point is the end of the
+    # footprint farthest from the ridge.
+    room = arch.room_dimensions
+    roof = arch.roof
+    if roof is not None and roof.type == 'FLAT':
+        return np.full(len(x1), room.height)
+
+    gable_height = roof.height if roof is not None and roof.height is not None else room.width / 4.0
+    half_width = room.width / 2.0
+    far = np.maximum(np.abs(x1 - half_width), np.abs(x2 - half_width))
+    return room.height + gable_height * np.clip(1.0 - far / half_width, 0.0, 1.0)
+
+def roof_band(arch: Architecture, height: float) -> Optional[Tuple[float, float]]:
+    # The X range in which a footprint has at least `height` of clearance under a gable roof,
+    # or None where the roof does not limit it (a flat roof, or an item no taller than the walls).
+    room = arch.room_dimensions
+    roof = arch.roof
+    if height <= room.height or (roof is not None and roof.type == 'FLAT'):
+        return None
+    gable_height = roof.height if roof is not None and roof.height is not None else room.width / 4.0
+    half_width = room.width / 2.0
+    far = max(0.0, half_width * (1.0 - (height - room.height) / gable_height))
+    return half_width - far, half_width + far
@@ -0,0 +1,30 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional
+
+from src.core.models import Project
+
+def canonical_json(data: Any) -> str:
+    return json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+
+def content_hash(data: Any) -> str:
+    return hashlib.sha256(canonical_json(data).encode('utf-8')).hexdigest()
+
+def project_hash(project: Project) -> str:
+    return content_hash(project.dict())
+
+def resolve_model_path(model_file: str, library_dir: Optional[str]) -> str:
+    if os.path.isabs(model_file) or not library_dir:
+        return os.path.normpath(model_file)
+    return os.path.normpath(os.path.join(library_dir, model_file))
+
+def library_fingerprint(project: Project, library_dir: Optional[str]) -> Dict[str, Optional[int]]:
+    # Modification times of every referenced model file, so that cached IFC models are
+    # invalidated when a vendor file is replaced.
+    fingerprint = {}
+    for item in project.equipment:
+        if item.model_file:
+            path = resolve_model_path(item.model_file, library_dir)
+            fingerprint[path] = os.stat(path).st_mtime_ns if os.path.exists(path) else None
+    return fingerprint
@@ -0,0 +1,38 @@
+import json
+from typing import Any
+
+from pydantic import ValidationError
+
+from src.core.models import Project
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class ProjectJSONError(ValueError):
+    pass
+
+def loads(raw: bytes) -> Any:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+def parse_project(raw: bytes) -> Project:
+    """
+    Parses a project file's bytes into a Project. With pydantic 2 the compiled validator reads
+    the JSON itself in a single pass, without building the intermediate dicts of json.load;
+    older pydantic gets the dicts from orjson when it is installed. Malformed JSON raises
+    ProjectJSONError either way, schema violations a ValidationError.
+    """
+    if hasattr(Project, 'model_validate_json'):
+        try:
+            return Project.model_validate_json(raw)
+        except ValidationError as e:
+            errors = e.errors()
+            if errors and errors[0]['type'] == 'json_invalid':
+                raise ProjectJSONError(errors[0]['msg']) from e
+            raise
+    try:
+        data = loads(raw)
+    except ValueError as e:
+        raise ProjectJSONError(str(e)) from e
+    return Project.parse_obj(data)
@@ -0,0 +1,30 @@
+import logging
+import sys
+
+class StdoutHandler(logging.StreamHandler):
+    """
+    Writes to whatever sys.stdout is at the time of the call, so contextlib.redirect_stdout
+    still captures the pipeline output (per-job logs in batch.py and server.py).
+    """
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+def configure_logging(level: int = logging.INFO):
+    root = logging.getLogger()
+    for handler in [handler for handler in root.handlers if isinstance(handler, StdoutHandler)]:
+        root.removeHandler(handler)
+    handler = StdoutHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    root.addHandler(handler)
+    root.setLevel(level)
+    # ifcopenshell reports every unsupported attribute it meets while reading vendor models.
+    logging.getLogger('ifcopenshell').setLevel(logging.ERROR)
@@ -1,4 +1,4 @@
-from typing import List, Optional, Dict, Any, Literal
+from typing import Annotated, List, Optional, Dict, Any, Literal, Tuple, Union
 from pydantic import BaseModel, Field
 
 class Meta(BaseModel):
@@ -27,13 +27,40 @@ class RoofConfig(BaseModel):
     thickness: Optional[float] = Field(default=None, gt=0, description="The thickness of the roof slab, used for FLAT type.")
 
 
+class Storey(BaseModel):
+    """
+    A level of the building (ground floor, mezzanine, ...). Rooms on a storey stand at its elevation.
+    """
+    id: str = Field(..., description="A unique identifier for the storey (e.g., 'mezzanine').")
+    name: str = Field(..., description="A human-readable name for the storey.")
+    elevation: float = Field(default=0.0, description="Height of the storey's floor above the ground floor.")
+
+
+class Room(BaseModel):
+    """
+    One hall of a plant with several rooms. Every room is laid out separately, in its own
+    coordinates: the origin is the outer corner of its walls, as for a single-room project.
+    """
+    id: str = Field(..., description="A unique identifier for the room (e.g., 'hall_a').")
+    name: str = Field(..., description="A human-readable name for the room.")
+    storey: Optional[str] = Field(default=None, description="The ID of the storey the room is on. None means the first storey.")
+    origin_x: float = Field(default=0.0, description="X position of the room's outer corner in the building.")
+    origin_y: float = Field(default=0.0, description="Y position of the room's outer corner in the building.")
+    room_dimensions: RoomDimensions = Field(..., description="The internal dimensions of the room.")
+    wall_thickness: Optional[float] = Field(default=None, ge=0, description="The thickness of the room's walls. None uses the architecture's wall_thickness.")
+    roof: Optional[RoofConfig] = Field(default=None, description="Optional roof of the room. None uses the architecture's roof.")
+
+
 class Architecture(BaseModel):
     """
     Architectural parameters of the factory space, including room size, wall thickness, and roof configuration.
+    A plant with several halls or storeys lists them in `rooms` and `storeys` instead of giving one room_dimensions.
     """
-    room_dimensions: RoomDimensions = Field(..., description="The internal dimensions of the room.")
+    room_dimensions: Optional[RoomDimensions] = Field(default=None, description="The internal dimensions of the room. Required unless rooms are given.")
     wall_thickness: float = Field(..., ge=0, description="The thickness of the surrounding walls.")
     roof: Optional[RoofConfig] = Field(default=None, description="Optional configuration for the building's roof.")
+    storeys: List[Storey] = Field(default_factory=list, description="The storeys of a multi-storey building, referenced by the rooms.")
+    rooms: List[Room] = Field(default_factory=list, description="The rooms of a plant with several halls. Each room is solved as its own subproblem.")
 
 
 class Footprint(BaseModel):
@@ -65,23 +92,133 @@ class EquipmentItem(BaseModel):
     footprint: Footprint = Field(..., description="The physical footprint of the equipment.")
     height: float = Field(..., gt=0, description="The total height of the equipment.")
     maintenance_zone: Optional[MaintenanceZone] = Field(default=None, description="Optional maintenance zones around the equipment.")
+    group: Optional[str] = Field(default=None, description="Optional production-line group; the decomposed solver keeps items of one group together as a block.")
+    model_file: Optional[str] = Field(default=None, description="Optional vendor IFC model for the equipment, relative to the project file (e.g., 'models/cooler.ifc'). Empty means built-in geometry.")
+    room: Optional[str] = Field(default=None, description="The ID of the room the item must stand in. In projects with several rooms, items without one are assigned to a room by the solver.")
+    allow_rotation: Optional[bool] = Field(default=None, description="Whether the solver may turn the item by 90° (footprint and maintenance zones turn with it). None uses solver_options.allow_rotation.")
+
+
+# Rule params that name equipment items.
+RULE_TARGET_KEYS = ('target', 'anchor', 'target1', 'target2')
+
+# An area of the room as [x1, y1, x2, y2].
+Area = Tuple[float, float, float, float]
+
+
+class AvoidZoneParams(BaseModel):
+    area: Area = Field(..., description="The area to keep free of equipment and maintenance zones, as [x1, y1, x2, y2].")
+    room: Optional[str] = Field(default=None, description="In projects with several rooms, the room the area is in. None applies it to every room.")
+
+
+class PlaceInZoneParams(BaseModel):
+    target: str = Field(..., description="The ID of the item to keep inside the area.")
+    area: Area = Field(..., description="The area the item (with its maintenance zone) must stay in, as [x1, y1, x2, y2].")
+
 
+class AttachToWallParams(BaseModel):
+    target: str = Field(..., description="The ID of the item to attach.")
+    side: Literal["Xmin", "Xmax", "Ymin", "Ymax"] = Field(..., description="The wall the item's maintenance zone must touch.")
+    distance: float = Field(default=0.0, ge=0, description="Gap left between the wall and the item's maintenance zone.")
 
-class Rule(BaseModel):
+
+class PlaceAfterParams(BaseModel):
+    target: str = Field(..., description="The ID of the item placed after the anchor.")
+    anchor: str = Field(..., description="The ID of the item the target follows.")
+    direction: Literal["X", "Y"] = Field(default="Y", description="The axis along which the target follows the anchor.")
+    distance: float = Field(default=0.0, description="Gap between the anchor's footprint and the target's footprint.")
+    alignment: Literal["center", "none"] = Field(default="center", description="'center' asks (softly) for the two items to be centred across the direction.")
+
+
+class AlignParams(BaseModel):
+    target1: str = Field(..., description="The ID of the first item.")
+    target2: str = Field(..., description="The ID of the second item.")
+    axis: Literal["X", "Y"] = Field(..., description="The axis on which the footprint centres must coincide.")
+
+
+class RuleBase(BaseModel):
     """
-    A placement rule or constraint for the solver. The structure of 'params'
-    is dependent on the 'type' of the rule.
+    A placement rule or constraint for the solver. Each rule type has its own params model;
+    the rule type selects it when a project is parsed, so malformed params are reported on load.
     """
-    type: str = Field(..., description="The type of the rule (e.g., 'PLACE_AFTER', 'ALIGN').")
-    params: Dict[str, Any] = Field(..., description="A dictionary of parameters specific to the rule type.")
     comment: Optional[str] = Field(default=None, description="An optional human-readable comment about the rule's purpose.")
 
+    @property
+    def targets(self) -> List[str]:
+        # IDs of the equipment items the rule refers to.
+        return [getattr(self.params, key) for key in RULE_TARGET_KEYS if getattr(self.params, key, None) is not None]
+
+
+class AvoidZoneRule(RuleBase):
+    type: Literal["AVOID_ZONE"] = Field(..., description="Keeps every item out of an area, e.g. an aisle.")
+    params: AvoidZoneParams
+
+
+class PlaceInZoneRule(RuleBase):
+    type: Literal["PLACE_IN_ZONE"] = Field(..., description="Keeps one item inside an area.")
+    params: PlaceInZoneParams
+
+
+class AttachToWallRule(RuleBase):
+    type: Literal["ATTACH_TO_WALL"] = Field(..., description="Places one item against a wall.")
+    params: AttachToWallParams
+
+
+class PlaceAfterRule(RuleBase):
+    type: Literal["PLACE_AFTER"] = Field(..., description="Places one item right after another along an axis.")
+    params: PlaceAfterParams
+
+
+class AlignRule(RuleBase):
+    type: Literal["ALIGN"] = Field(..., description="Centres two items on the same line.")
+    params: AlignParams
+
+
+Rule = Annotated[Union[AvoidZoneRule, PlaceInZoneRule, AttachToWallRule, PlaceAfterRule, AlignRule], Field(discriminator="type")]
+
+
+class FlowLink(BaseModel):
+    """
+    A material or personnel flow between two equipment items. Flow links form an explicit
+    graph that the solver can use instead of all-pairs distances in its objective.
+    """
+    source: str = Field(..., description="The ID of the equipment item where the flow starts.")
+    target: str = Field(..., description="The ID of the equipment item where the flow ends.")
+    weight: float = Field(default=1.0, gt=0, description="The relative intensity of the flow, used as the distance weight.")
+
 
 class SolverOptions(BaseModel):
     """
     Optional configuration for the placement optimization solver.
     """
     time_limit_sec: Optional[float] = Field(default=30.0, gt=0, description="Time limit in seconds for the solver to find a solution.")
+    objective_mode: Literal["ALL_PAIRS", "PLACE_AFTER", "KNN", "FLOW"] = Field(default="ALL_PAIRS", description="Which item pairs get distance terms in the objective. ALL_PAIRS grows quadratically and is meant for small projects.")
+    knn_neighbors: int = Field(default=4, ge=1, description="Number of nearest neighbours (from a cheap initial layout) per item, used by the KNN objective mode.")
+    num_workers: Optional[int] = Field(default=None, ge=0, description="Number of parallel search workers. None or 0 lets the solver use all available cores.")
+    random_seed: Optional[int] = Field(default=None, ge=0, description="Random seed for the solver; set it together with a fixed worker count for reproducible runs.")
+    relative_gap_limit: Optional[float] = Field(default=None, ge=0, description="Stop as soon as the relative gap between the objective and the best bound is below this value.")
+    absolute_gap_limit: Optional[float] = Field(default=None, ge=0, description="Stop as soon as the absolute gap between the objective and the best bound is below this value.")
+    search_branching: Optional[Literal[
+        "AUTOMATIC_SEARCH", "FIXED_SEARCH", "PORTFOLIO_SEARCH", "LP_SEARCH", "PSEUDO_COST_SEARCH",
+        "PORTFOLIO_WITH_QUICK_RESTART_SEARCH", "HINT_SEARCH", "PARTIAL_FIXED_SEARCH", "RANDOMIZED_SEARCH",
+    ]] = Field(default=None, description="Optional search branching strategy passed to the CP-SAT solver.")
+    log_search_progress: bool = Field(default=False, description="Whether the solver should log its search progress.")
+    presolve: bool = Field(default=True, description="Propagate zone, wall, PLACE_AFTER and ALIGN rules into variable bounds before building the model, and report contradictory rules up front.")
+    use_heuristic: bool = Field(default=True, description="Seed the solver with a fast greedy layout and fall back to that layout (flagged in the result) when the solver finds no solution in time.")
+    decompose: bool = Field(default=False, description="Solve clusters of related equipment (PLACE_AFTER chains, ALIGN pairs, shared PLACE_IN_ZONE areas, groups) separately and then place them as rigid blocks. Meant for large plants.")
+    allow_rotation: bool = Field(default=False, description="Let the solver turn equipment by 90° where that helps; items can override it with their own allow_rotation.")
+    decompose_workers: Optional[int] = Field(default=None, ge=1, description="Number of worker processes for solving clusters in the decomposed mode. None uses all cores.")
+    room_workers: Optional[int] = Field(default=None, ge=1, description="Number of rooms solved at the same time in projects with several rooms. None solves all rooms at once.")
+    lns: bool = Field(default=False, description="Large neighbourhood search: after a first layout, spend the rest of the time limit re-optimising small groups of nearby or related items while every other item stays fixed. Meant for large plants.")
+    lns_neighborhood_size: int = Field(default=20, ge=2, description="Number of items re-optimised together at the start of the LNS; it grows while neighbourhoods are solved to optimality and shrinks when they time out.")
+    lns_subsolve_sec: float = Field(default=2.0, gt=0, description="Time limit of each LNS neighbourhood solve.")
+    lns_workers: Optional[int] = Field(default=None, ge=1, description="Number of worker processes solving LNS neighbourhoods in parallel. None uses all cores.")
+
+
+class ExportOptions(BaseModel):
+    """
+    Optional configuration for the IFC export.
+    """
+    level_of_detail: Literal["BOX", "SWEPT", "BREP"] = Field(default="BREP", description="Geometry detail: BOX exports bounding boxes only, SWEPT uses extruded/revolved primitives, BREP builds exact B-reps for silos (needs pythonOCC).")
 
 
 class Project(BaseModel):
@@ -93,4 +230,93 @@ class Project(BaseModel):
     architecture: Architecture = Field(..., description="Architectural details of the building.")
     equipment: List[EquipmentItem] = Field(..., description="A list of all equipment items to be placed.")
     rules: List[Rule] = Field(..., description="A list of placement rules and constraints for the solver.")
+    flows: List[FlowLink] = Field(default_factory=list, description="An optional explicit flow graph between equipment items, used by the FLOW objective mode.")
     solver_options: Optional[SolverOptions] = Field(default=None, description="Optional settings for the solver.")
+    export_options: Optional[ExportOptions] = Field(default=None, description="Optional settings for the IFC export.")
+
+
+class SolveStats(BaseModel):
+    """
+    Statistics of a single placement solve, reported by the placer instead of being printed.
+    """
+    status: str = Field(..., description="The final solver status (e.g., 'OPTIMAL', 'FEASIBLE', 'INFEASIBLE').")
+    wall_time_sec: float = Field(..., ge=0, description="Wall-clock time spent in the solver.")
+    num_conflicts: int = Field(default=0, ge=0, description="Number of conflicts encountered during the search.")
+    num_branches: int = Field(default=0, ge=0, description="Number of search branches explored.")
+    objective_value: Optional[float] = Field(default=None, description="Objective value of the returned solution, if any.")
+    best_objective_bound: Optional[float] = Field(default=None, description="Best proven lower bound on the objective.")
+    relative_gap: Optional[float] = Field(default=None, ge=0, description="Relative gap between the objective value and the best bound.")
+    num_workers: Optional[int] = Field(default=None, description="Number of search workers requested from the solver.")
+    num_solutions: int = Field(default=0, ge=0, description="Number of improving solutions reported during the search.")
+    objective_history: List[Tuple[float, float]] = Field(default_factory=list, description="(seconds since the start of the search, objective value) of every improving solution.")
+
+
+class SolutionUpdate(BaseModel):
+    """
+    An improving solution reported by the solver while the search is still running.
+    """
+    solution_index: int = Field(..., ge=1, description="1 for the first solution found, then counting up with every improvement.")
+    objective_value: float = Field(..., description="Objective value of this solution.")
+    best_objective_bound: float = Field(..., description="Best proven lower bound on the objective at this point.")
+    relative_gap: float = Field(..., ge=0, description="Relative gap between the objective value and the bound.")
+    wall_time_sec: float = Field(..., ge=0, description="Time since the start of the search.")
+    placements: Dict[str, Dict[str, Any]] = Field(..., description="The placements of this solution per equipment ID.")
+
+
+class PlacementResult(BaseModel):
+    """
+    The outcome of a placement calculation: the solved placements (if any) and solve statistics.
+    """
+    placements: Optional[Dict[str, Dict[str, Any]]] = Field(default=None, description="Solved placements per equipment ID (x, y and rotation_deg, plus the room ID in projects with several rooms), or None if no solution was found.")
+    stats: SolveStats = Field(..., description="Statistics of the solve.")
+    is_fallback: bool = Field(default=False, description="True if the solver found no solution and the placements come from the greedy heuristic; rules may be violated.")
+    stopped: bool = Field(default=False, description="True if the search was ended early by a stop event or a solution handler rather than by its time limit; the placements may be far from the best.")
+
+
+class LayoutVariant(BaseModel):
+    """
+    One what-if variant of a project in a parameter sweep: another room size, other AVOID_ZONE
+    areas or another time limit, over the same equipment and the other rules.
+    """
+    name: str = Field(..., description="The variant's name in the results table.")
+    room_width: Optional[float] = Field(default=None, gt=0, description="Room width (X) of the variant. None keeps the project's.")
+    room_depth: Optional[float] = Field(default=None, gt=0, description="Room depth (Y) of the variant. None keeps the project's.")
+    avoid_zones: Dict[int, Area] = Field(default_factory=dict, description="New areas of AVOID_ZONE rules, keyed by the rule's index in the project's rules.")
+    time_limit_sec: Optional[float] = Field(default=None, gt=0, description="Solver time limit of the variant. None keeps the project's.")
+
+
+class Collision(BaseModel):
+    """
+    A single overlap found by the collision validator.
+    """
+    item_a: str = Field(..., description="The ID of the first item. For MAINTENANCE_ZONE collisions, the item whose maintenance zone overlaps.")
+    item_b: str = Field(..., description="The ID of the second item, whose footprint is overlapped.")
+    kind: Literal["FOOTPRINT", "MAINTENANCE_ZONE"] = Field(..., description="FOOTPRINT for footprint-vs-footprint overlaps, MAINTENANCE_ZONE for a maintenance zone overlapping another item's footprint.")
+    overlap_area: float = Field(..., ge=0, description="The overlapping floor area in square metres.")
+    message: str = Field(..., description="A human-readable description of the collision.")
+
+
+class ValidationIssue(BaseModel):
+    """
+    A single problem found when re-checking a solved layout (or the project itself) against its rules.
+    """
+    check: Literal[
+        "MISSING_PLACEMENT", "UNKNOWN_TARGET", "COLLISION", "ROOM_BOUNDS", "HEIGHT_CLEARANCE",
+        "AVOID_ZONE", "PLACE_IN_ZONE", "ATTACH_TO_WALL", "ALIGN", "PLACE_AFTER",
+        "INVALID_RULE", "INFEASIBLE_RULES", "ROOM",
+    ] = Field(..., description="The check or rule type that failed.")
+    severity: Literal["ERROR", "WARNING"] = Field(default="ERROR", description="WARNING is used for soft rules the solver may trade off.")
+    items: List[str] = Field(default_factory=list, description="IDs of the equipment items involved.")
+    rule_index: Optional[int] = Field(default=None, description="Index of the violated rule in project.rules, if any.")
+    amount: Optional[float] = Field(default=None, description="Size of the violation (overlap area in m², or distance/height in m).")
+    message: str = Field(..., description="A human-readable description of the issue.")
+
+
+class ValidationReport(BaseModel):
+    """
+    Machine-readable result of validating a layout against every rule of the project.
+    """
+    ok: bool = Field(..., description="True if no ERROR-level issues were found.")
+    checked_items: int = Field(..., ge=0, description="Number of placed items that were checked.")
+    checked_rules: int = Field(..., ge=0, description="Number of project rules that were checked.")
+    issues: List[ValidationIssue] = Field(default_factory=list, description="All issues found, errors and warnings.")
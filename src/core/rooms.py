@@ -0,0 +1,65 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from src.core.models import Architecture, EquipmentItem, Project, Room, Storey
+
+@dataclass
+class RoomPart:
+    room: Room
+    # A single-room project with the room's items, the rules among them and their flows.
+    project: Project
+    # Index in the full project's rules of each rule of the part.
+    rule_indices: List[int] = field(default_factory=list)
+
+def room_architecture(room: Room, arch: Architecture) -> Architecture:
+    # The room as the architecture of a single-room project; walls and roof default to the building's.
+    return Architecture(
+        room_dimensions=room.room_dimensions,
+        wall_thickness=arch.wall_thickness if room.wall_thickness is None else room.wall_thickness,
+        roof=room.roof or arch.roof,
+    )
+
+def room_storey(room: Room, arch: Architecture) -> Optional[Storey]:
+    storeys = {storey.id: storey for storey in arch.storeys}
+    if room.storey is not None:
+        return storeys.get(room.storey)
+    return arch.storeys[0] if arch.storeys else None
+
+def room_elevation(room: Room, arch: Architecture) -> float:
+    storey = room_storey(room, arch)
+    return storey.elevation if storey else 0.0
+
+def placement_room(item: EquipmentItem, placement: Optional[Dict]) -> Optional[str]:
+    # The room a placement was solved in; hand-written placements may leave it to the item.
+    if placement and placement.get('room'):
+        return placement['room']
+    return item.room
+
+def split_rooms(project: Project, assignment: Dict[str, str]) -> List[RoomPart]:
+    """
+    Splits a project with several rooms into one single-room project per room, given the room
+    of every item. A rule goes to the room of its targets; AVOID_ZONE areas are in the
+    coordinates of the room named by their `room` param, or of every room without one. Flows
+    between rooms have no place in either part and are left out.
+    """
+    arch = project.architecture
+    parts = []
+    for room in arch.rooms:
+        ids = {item.id for item in project.equipment if assignment.get(item.id) == room.id}
+        rule_indices = []
+        for i, rule in enumerate(project.rules):
+            targets = rule.targets
+            if targets:
+                keep = all(target in ids for target in targets)
+            else:
+                keep = rule.params.room in (None, room.id)
+            if keep:
+                rule_indices.append(i)
+        sub_project = project.copy(update={
+            'architecture': room_architecture(room, arch),
+            'equipment': [item for item in project.equipment if item.id in ids],
+            'rules': [project.rules[i] for i in rule_indices],
+            'flows': [flow for flow in project.flows if flow.source in ids and flow.target in ids],
+        })
+        parts.append(RoomPart(room=room, project=sub_project, rule_indices=rule_indices))
+    return parts
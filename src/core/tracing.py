@@ -0,0 +1,114 @@
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+class Tracer:
+    """
+    Records timed spans (nested per thread) and numeric counters for one pipeline run. The
+    result is available as a per-stage summary (`summary`) or as a Chrome trace that opens in
+    chrome://tracing or Perfetto (`write_chrome_trace`).
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.counters: Dict[str, float] = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @contextmanager
+    def span(self, name: str, **args):
+        stack = self.local.__dict__.setdefault('stack', [])
+        stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            with self.lock:
+                self.spans.append({
+                    'name': name,
+                    'start': start - self.origin,
+                    'duration': end - start,
+                    'depth': len(stack),
+                    'thread': threading.get_ident(),
+                    'args': args,
+                })
+
+    def count(self, name: str, value: float = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self) -> Dict[str, Any]:
+        stages: Dict[str, Dict[str, float]] = {}
+        for span in sorted(self.spans, key=lambda span: span['start']):
+            stage = stages.setdefault(span['name'], {'calls': 0, 'total_sec': 0.0, 'max_sec': 0.0})
+            stage['calls'] += 1
+            stage['total_sec'] += span['duration']
+            stage['max_sec'] = max(stage['max_sec'], span['duration'])
+        return {
+            'wall_time_sec': time.perf_counter() - self.origin,
+            'stages': stages,
+            'counters': dict(self.counters),
+        }
+
+    def write_json(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+
+    def write_chrome_trace(self, path: str):
+        # Complete ("X") events in microseconds; counters are shown as one final sample each.
+        end_us = (time.perf_counter() - self.origin) * 1e6
+        events = [
+            {'name': span['name'], 'ph': 'X', 'ts': span['start'] * 1e6, 'dur': span['duration'] * 1e6,
+             'pid': 1, 'tid': span['thread'], 'args': span['args']}
+            for span in self.spans
+        ]
+        events.extend({'name': name, 'ph': 'C', 'ts': end_us, 'pid': 1, 'args': {'value': value}}
+                      for name, value in self.counters.items())
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+
+_active: Optional[Tracer] = None
+
+@contextmanager
+def tracing(tracer: Tracer):
+    """Makes `tracer` receive the spans and counters of the pipeline code run inside the block."""
+    global _active
+    previous, _active = _active, tracer
+    try:
+        yield tracer
+    finally:
+        _active = previous
+
+def span(name: str, **args):
+    return _active.span(name, **args) if _active is not None else nullcontext()
+
+def count(name: str, value: float = 1):
+    if _active is not None:
+        _active.count(name, value)
+
+def peak_memory_mb() -> Optional[float]:
+    """Peak resident memory of the process so far, or None where the platform does not report it."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def traced(name: str):
+    """Decorator form of `span` for functions that are one pipeline stage."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,99 @@
+import logging
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import ifcopenshell
+import ifcopenshell.util.unit
+
+from src.core.hashing import resolve_model_path
+
+logger = logging.getLogger(__name__)
+
+LIBRARY_CACHE_SIZE = 64
+OUTPUT_UNIT_SCALE = 1.0
+
+@dataclass
+class LibraryModel:
+    path: str
+    file: ifcopenshell.file
+    representations: List
+    unit_scale: float
+
+def body_representations(lib_file: ifcopenshell.file) -> List:
+    # Prefer the type's representation maps, which is how vendors usually ship reusable
+    # equipment; otherwise take the body of the first product that has geometry.
+    for element_type in lib_file.by_type("IfcTypeProduct"):
+        if element_type.RepresentationMaps:
+            return [rep_map.MappedRepresentation for rep_map in element_type.RepresentationMaps]
+    for product in lib_file.by_type("IfcProduct"):
+        if product.Representation and not product.is_a("IfcSpatialElement"):
+            reps = product.Representation.Representations
+            body = [rep for rep in reps if rep.RepresentationIdentifier == "Body"]
+            return body or list(reps)
+    return []
+
+@lru_cache(maxsize=LIBRARY_CACHE_SIZE)
+def _load_library_model(path: str, mtime_ns: int) -> LibraryModel:
+    lib_file = ifcopenshell.open(path)
+    return LibraryModel(
+        path=path,
+        file=lib_file,
+        representations=body_representations(lib_file),
+        unit_scale=ifcopenshell.util.unit.calculate_unit_scale(lib_file),
+    )
+
+def load_library_model(path: str) -> LibraryModel:
+    # The modification time is part of the cache key, so an edited library file is re-read.
+    return _load_library_model(path, os.stat(path).st_mtime_ns)
+
+class ModelLibrary:
+    """
+    Vendor equipment geometry for one output IFC file. Each library file is parsed once per
+    process (see load_library_model) and copied into the output once, as representation maps
+    that every instance references through IfcMappedItem.
+    """
+
+    def __init__(self, f: ifcopenshell.file, context, library_dir: Optional[str]):
+        self.f = f
+        self.context = context
+        self.library_dir = library_dir
+        self.maps: Dict[str, Tuple[List, object]] = {}
+        self.origin = f.createIfcAxis2Placement3D(f.createIfcCartesianPoint((0.0, 0.0, 0.0)))
+
+    def representation_maps(self, model_file: str) -> Optional[Tuple[List, object]]:
+        path = resolve_model_path(model_file, self.library_dir)
+        if path in self.maps:
+            return self.maps[path]
+
+        self.maps[path] = None
+        if not os.path.exists(path):
+            logger.warning(f"Equipment model file '{path}' not found. Using built-in geometry.")
+            return None
+
+        library_model = load_library_model(path)
+        if not library_model.representations:
+            logger.warning(f"Equipment model file '{path}' contains no geometry. Using built-in geometry.")
+            return None
+
+        rep_maps = []
+        for source_rep in library_model.representations:
+            items = [self.f.add(item) for item in source_rep.Items]
+            for item in source_rep.Items:
+                for styled_item in library_model.file.get_inverse(item):
+                    if styled_item.is_a("IfcStyledItem"):
+                        self.f.add(styled_item)
+            rep = self.f.createIfcShapeRepresentation(
+                self.context, source_rep.RepresentationIdentifier, source_rep.RepresentationType, items
+            )
+            rep_maps.append(self.f.createIfcRepresentationMap(self.origin, rep))
+
+        # The generator writes all coordinates in metres; vendor files in other length units are
+        # rescaled by the mapping operator.
+        scale = library_model.unit_scale / OUTPUT_UNIT_SCALE
+        mapping_target = self.f.createIfcCartesianTransformationOperator3D(
+            None, None, self.f.createIfcCartesianPoint((0.0, 0.0, 0.0)), scale if scale != 1.0 else None, None
+        )
+        self.maps[path] = (rep_maps, mapping_target)
+        return self.maps[path]
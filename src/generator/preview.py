@@ -0,0 +1,360 @@
+import base64
+import json
+import os
+import struct
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+from xml.sax.saxutils import escape
+
+from src.core.geometry import oriented_footprint, oriented_maintenance
+from src.core.models import Architecture, EquipmentItem, Project
+from src.core.rooms import placement_room, room_architecture, room_elevation, split_rooms
+from src.core.tracing import count, traced
+from src.validator.service import find_collisions
+
+PREVIEW_FORMATS = ("svg", "obj", "gltf", "glb")
+
+# Colours (RGB, 0-1) of the preview, the same as the IFC surface styles of the generator.
+COLOURS = {
+    "floor": (0.4, 0.4, 0.45),
+    "wall": (0.75, 0.75, 0.75),
+    "silo": (0.8, 0.82, 0.84),
+    "mixer": (0.9, 0.9, 0.6),
+    "press": (0.6, 0.9, 0.6),
+    "equipment": (0.9, 0.5, 0.5),
+    "collision": (0.9, 0.15, 0.15),
+}
+SLAB_THICKNESS = 0.2
+# Pixels per metre of the SVG plan and the gap between the plans of two storeys, in metres.
+SVG_SCALE = 20.0
+SVG_MARGIN = 1.0
+
+Box = Tuple[float, float, float, float]
+
+def equipment_kind(item: EquipmentItem) -> str:
+    # The generator styles equipment by its name in the same way.
+    name = item.name.lower()
+    if "силос" in name:
+        return "silo"
+    if "смеситель" in name:
+        return "mixer"
+    if "пресс" in name:
+        return "press"
+    return "equipment"
+
+@dataclass
+class PlacedItem:
+    item: EquipmentItem
+    storey: str
+    elevation: float
+    rotation_deg: float
+    footprint: Box
+    maintenance: Optional[Box]
+
+@dataclass
+class PreviewScene:
+    """
+    Everything a preview shows, in building coordinates: rooms are moved to their origin and
+    stand at their storey's elevation. Boxes are (x1, y1, x2, y2) on the floor.
+    """
+    project_name: str
+    storeys: List[Tuple[str, str]] = field(default_factory=list)
+    # (storey, elevation, architecture of the room, origin x, origin y) per room.
+    rooms: List[Tuple[str, float, Architecture, float, float]] = field(default_factory=list)
+    items: Dict[str, PlacedItem] = field(default_factory=dict)
+    # (storey, box, label) per AVOID_ZONE and PLACE_IN_ZONE area.
+    avoid_zones: List[Tuple[str, Box, str]] = field(default_factory=list)
+    place_zones: List[Tuple[str, Box, str]] = field(default_factory=list)
+    # (storey, overlap box) per collision, and the items involved in one.
+    collisions: List[Tuple[str, Box]] = field(default_factory=list)
+    colliding: Set[str] = field(default_factory=set)
+
+def overlap(a: Box, b: Box) -> Optional[Box]:
+    box = (max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3]))
+    return box if box[0] < box[2] and box[1] < box[3] else None
+
+def build_scene(project: Project, placements: Dict[str, Dict[str, float]]) -> PreviewScene:
+    arch = project.architecture
+    scene = PreviewScene(project_name=project.meta.project_name)
+    # Each room as (room id, storey, elevation, architecture, origin); a single-room project is one room at 0, 0.
+    if arch.rooms:
+        storey_ids = [storey.id for storey in arch.storeys] or ["ground"]
+        scene.storeys = [(storey.id, storey.name) for storey in arch.storeys] or [("ground", "Ground Floor")]
+        rooms = [(room.id, room.storey if room.storey in storey_ids else storey_ids[0], room_elevation(room, arch),
+                  room_architecture(room, arch), room.origin_x, room.origin_y) for room in arch.rooms]
+    else:
+        scene.storeys = [("ground", "Ground Floor")]
+        rooms = [(None, "ground", 0.0, arch, 0.0, 0.0)]
+    scene.rooms = [(storey, elevation, room_arch, x, y) for _, storey, elevation, room_arch, x, y in rooms]
+    room_of = {room_id: (storey, elevation, x, y) for room_id, storey, elevation, _, x, y in rooms}
+
+    assignment = {}
+    for item in project.equipment:
+        placement = placements.get(item.id)
+        room_id = placement_room(item, placement) if arch.rooms else None
+        if not placement or room_id not in room_of:
+            continue
+        assignment[item.id] = room_id
+        storey, elevation, origin_x, origin_y = room_of[room_id]
+        rotation = placement.get('rotation_deg', 0)
+        width, depth = oriented_footprint(item, rotation)
+        x1, y1 = origin_x + placement['x'], origin_y + placement['y']
+        left, back, right, front = oriented_maintenance(item, rotation)
+        scene.items[item.id] = PlacedItem(
+            item=item, storey=storey, elevation=elevation, rotation_deg=rotation, footprint=(x1, y1, x1 + width, y1 + depth),
+            maintenance=(x1 - left, y1 - back, x1 + width + right, y1 + depth + front) if left or back or right or front else None,
+        )
+
+    for index, rule in enumerate(project.rules):
+        if rule.type == 'AVOID_ZONE':
+            for room_id, (storey, _, origin_x, origin_y) in room_of.items():
+                if rule.params.room in (None, room_id):
+                    x1, y1, x2, y2 = rule.params.area
+                    scene.avoid_zones.append((storey, (origin_x + x1, origin_y + y1, origin_x + x2, origin_y + y2), f"#{index}"))
+        elif rule.type == 'PLACE_IN_ZONE' and rule.params.target in assignment:
+            storey, _, origin_x, origin_y = room_of[assignment[rule.params.target]]
+            x1, y1, x2, y2 = rule.params.area
+            scene.place_zones.append((storey, (origin_x + x1, origin_y + y1, origin_x + x2, origin_y + y2),
+                                      f"#{index} {rule.params.target}"))
+
+    # Collisions are found room by room, in room coordinates, as the validator does.
+    if arch.rooms:
+        parts = [part.project for part in split_rooms(project, assignment)]
+    else:
+        parts = [project]
+    for part in parts:
+        for collision in find_collisions(part, placements):
+            a, b = scene.items[collision.item_a], scene.items[collision.item_b]
+            box = overlap(a.maintenance if collision.kind == "MAINTENANCE_ZONE" else a.footprint, b.footprint)
+            if box is not None:
+                scene.collisions.append((a.storey, box))
+            scene.colliding.update((collision.item_a, collision.item_b))
+    return scene
+
+def room_walls(arch: Architecture, origin_x: float, origin_y: float) -> List[Box]:
+    # South, north, west and east wall, on the inside of the room's outer corner.
+    room = arch.room_dimensions
+    w, d, t = room.width, room.depth, arch.wall_thickness
+    x, y = origin_x, origin_y
+    return [(x, y, x + w, y + t), (x, y + d - t, x + w, y + d), (x, y + t, x + t, y + d - t), (x + w - t, y + t, x + w, y + d - t)]
+
+def hex_colour(rgb: Tuple[float, float, float]) -> str:
+    return "#" + "".join(f"{round(channel * 255):02x}" for channel in rgb)
+
+def render_svg(scene: PreviewScene) -> str:
+    """
+    The floor plan as SVG: one plan per storey, stacked from top to bottom, each showing the
+    walls, the AVOID_ZONE (red) and PLACE_IN_ZONE (green, dashed) areas, maintenance zones
+    (dashed), footprints coloured like the IFC styles with their IDs, and collisions in red.
+    Hovering a footprint shows the item's name, size and rotation.
+    """
+    extents = {}
+    for storey, _, arch, x, y in scene.rooms:
+        room = arch.room_dimensions
+        extents.setdefault(storey, []).append((x, y, x + room.width, y + room.depth))
+    for placed in scene.items.values():
+        extents.setdefault(placed.storey, []).append(placed.maintenance or placed.footprint)
+    for storey, box, _ in scene.avoid_zones + scene.place_zones:
+        extents.setdefault(storey, []).append(box)
+
+    min_x = min((box[0] for boxes in extents.values() for box in boxes), default=0.0) - SVG_MARGIN
+    max_x = max((box[2] for boxes in extents.values() for box in boxes), default=0.0) + SVG_MARGIN
+    # Every storey gets a band of the drawing; within it Y points up, as in the project's coordinates.
+    bands = {}
+    top = 0.0
+    for storey, _ in scene.storeys:
+        if storey not in extents:
+            continue
+        low = min(box[1] for box in extents[storey])
+        high = max(box[3] for box in extents[storey])
+        bands[storey] = (top + SVG_MARGIN * 1.5, high)
+        top += SVG_MARGIN * 1.5 + (high - low) + SVG_MARGIN
+
+    def rect(storey: str, box: Box, css: str, title: Optional[str] = None) -> str:
+        band_top, high = bands[storey]
+        element = (f'<rect x="{box[0]:.3f}" y="{band_top + high - box[3]:.3f}" width="{box[2] - box[0]:.3f}" '
+                   f'height="{box[3] - box[1]:.3f}" class="{css}"')
+        return f"{element}><title>{escape(title)}</title></rect>" if title else element + "/>"
+
+    def text(storey: str, x: float, y: float, label: str, size: float, css: str = "") -> str:
+        band_top, high = bands[storey]
+        return f'<text x="{x:.3f}" y="{band_top + high - y:.3f}" font-size="{size:.2f}"{css}>{escape(label)}</text>'
+
+    width, height = max_x - min_x, max(top, SVG_MARGIN)
+    fills = "".join(f".{kind}{{fill:{hex_colour(COLOURS[kind])}}}" for kind in ("silo", "mixer", "press", "equipment"))
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width * SVG_SCALE:.0f}" height="{height * SVG_SCALE:.0f}" '
+        f'viewBox="{min_x:.3f} 0 {width:.3f} {height:.3f}" font-family="sans-serif">',
+        f'<title>{escape(scene.project_name)}</title>',
+        "<style>"
+        f".floor{{fill:#f4f4f6;stroke:#666;stroke-width:.04}}.wall{{fill:{hex_colour(COLOURS['wall'])}}}"
+        ".avoid{fill:#e53935;fill-opacity:.15;stroke:#e53935;stroke-width:.05}"
+        ".zone{fill:#43a047;fill-opacity:.06;stroke:#43a047;stroke-width:.05;stroke-dasharray:.3 .15}"
+        ".mz{fill:none;stroke:#777;stroke-width:.03;stroke-dasharray:.15 .1}"
+        f".fp{{stroke:#333;stroke-width:.04}}{fills}.hit{{stroke:#e53935;stroke-width:.12}}"
+        ".overlap{fill:#e53935;fill-opacity:.7}.zl{fill:#555}"
+        "</style>",
+    ]
+
+    for storey, name in scene.storeys:
+        if storey in bands:
+            band_top, _ = bands[storey]
+            parts.append(f'<text x="{min_x + SVG_MARGIN:.3f}" y="{band_top - SVG_MARGIN * 0.5:.3f}" font-size="{SVG_MARGIN * 0.6:.2f}">'
+                         f'{escape(name if len(bands) > 1 else scene.project_name)}</text>')
+
+    parts.append('<g id="rooms">')
+    for storey, _, arch, x, y in scene.rooms:
+        room = arch.room_dimensions
+        parts.append(rect(storey, (x, y, x + room.width, y + room.depth), "floor"))
+        parts.extend(rect(storey, wall, "wall") for wall in room_walls(arch, x, y))
+    parts.append('</g><g id="zones">')
+    for storey, box, label in scene.place_zones:
+        parts.append(rect(storey, box, "zone"))
+        parts.append(text(storey, box[0] + 0.1, box[3] - 0.35, label, 0.3, ' class="zl"'))
+    for storey, box, label in scene.avoid_zones:
+        parts.append(rect(storey, box, "avoid"))
+        parts.append(text(storey, box[0] + 0.1, box[3] - 0.35, label, 0.3, ' class="zl"'))
+    parts.append('</g><g id="maintenance">')
+    parts.extend(rect(placed.storey, placed.maintenance, "mz") for placed in scene.items.values() if placed.maintenance)
+    parts.append('</g><g id="equipment">')
+    for eq_id, placed in scene.items.items():
+        item = placed.item
+        css = f"fp {equipment_kind(item)}" + (" hit" if eq_id in scene.colliding else "")
+        x1, y1, x2, y2 = placed.footprint
+        hover = f"{item.name} ({eq_id}): {item.footprint.width:g} x {item.footprint.depth:g} m, rotated {placed.rotation_deg:g}°"
+        parts.append(rect(placed.storey, placed.footprint, css, hover))
+        size = max(0.12, min(0.5, 0.25 * min(x2 - x1, y2 - y1)))
+        parts.append(text(placed.storey, x1 + 0.05, y2 - 0.05 - size, eq_id, size))
+    parts.append('</g><g id="collisions">')
+    parts.extend(rect(storey, box, "overlap") for storey, box in scene.collisions)
+    parts.append("</g></svg>")
+    return "\n".join(parts)
+
+def scene_boxes(scene: PreviewScene) -> List[Tuple[str, str, Box, float, float]]:
+    # The box-level 3D view: (name, material, floor box, bottom, top) for the floor slabs,
+    # walls and items. Items in a collision get the collision material.
+    boxes = []
+    for k, (storey, elevation, arch, x, y) in enumerate(scene.rooms):
+        room = arch.room_dimensions
+        boxes.append((f"floor_{k}", "floor", (x, y, x + room.width, y + room.depth), elevation - SLAB_THICKNESS, elevation))
+        for side, wall in zip(("south", "north", "west", "east"), room_walls(arch, x, y)):
+            if wall[2] > wall[0] and wall[3] > wall[1]:
+                boxes.append((f"wall_{side}_{k}", "wall", wall, elevation, elevation + room.height))
+    for eq_id, placed in scene.items.items():
+        material = "collision" if eq_id in scene.colliding else equipment_kind(placed.item)
+        boxes.append((eq_id, material, placed.footprint, placed.elevation, placed.elevation + placed.item.height))
+    return boxes
+
+# Corners of the unit box as bits x, y, z of the index, and its faces wound outwards.
+BOX_FACES = ((0, 2, 3, 1), (4, 5, 7, 6), (0, 1, 5, 4), (2, 6, 7, 3), (0, 4, 6, 2), (1, 3, 7, 5))
+BOX_NORMALS = ((0, 0, -1), (0, 0, 1), (0, -1, 0), (0, 1, 0), (-1, 0, 0), (1, 0, 0))
+
+def to_y_up(x: float, y: float, z: float) -> Tuple[float, float, float]:
+    # OBJ and glTF viewers expect Y up; the plan's Y axis becomes -Z.
+    return x, z, -y
+
+def render_obj(scene: PreviewScene, mtl_name: str) -> Tuple[str, str]:
+    # Returns the OBJ text and the MTL text it refers to as `mtl_name`.
+    lines = [f"# {scene.project_name}", f"mtllib {mtl_name}"]
+    for n, (name, material, (x1, y1, x2, y2), z1, z2) in enumerate(scene_boxes(scene)):
+        lines.append(f"o {name.replace(' ', '_')}")
+        lines.append(f"usemtl {material}")
+        for corner in range(8):
+            x, y, z = to_y_up(x2 if corner & 1 else x1, y2 if corner & 2 else y1, z2 if corner & 4 else z1)
+            lines.append(f"v {x:.3f} {y:.3f} {z:.3f}")
+        base = n * 8 + 1
+        lines.extend("f " + " ".join(str(base + corner) for corner in face) for face in BOX_FACES)
+    mtl = "\n".join(f"newmtl {name}\nKd {r:.3f} {g:.3f} {b:.3f}\n" for name, (r, g, b) in COLOURS.items())
+    return "\n".join(lines) + "\n", mtl
+
+def render_gltf(scene: PreviewScene) -> Tuple[dict, bytes]:
+    """
+    The box-level 3D view as glTF 2.0: a single unit box mesh per material, and one node per
+    floor, wall and item that scales and moves it into place. Returns the glTF JSON and its
+    binary buffer.
+    """
+    positions, normals = [], []
+    for face, normal in zip(BOX_FACES, BOX_NORMALS):
+        for corner in face:
+            positions.append(to_y_up(corner & 1, (corner >> 1) & 1, (corner >> 2) & 1))
+            normals.append(to_y_up(*normal))
+    indices = [base + offset for base in range(0, 24, 4) for offset in (0, 1, 2, 0, 2, 3)]
+    vertex_data = b"".join(struct.pack("<3f", *p) for p in positions) + b"".join(struct.pack("<3f", *n) for n in normals)
+    buffer = vertex_data + struct.pack(f"<{len(indices)}H", *indices)
+
+    materials = list(COLOURS)
+    nodes = []
+    for name, material, (x1, y1, x2, y2), z1, z2 in scene_boxes(scene):
+        nodes.append({
+            "name": name,
+            "mesh": materials.index(material),
+            # Rounded to a tenth of a millimetre; adding 0.0 turns -0.0 into 0.0.
+            "translation": [round(value, 4) + 0.0 for value in to_y_up(x1, y1, z1)],
+            "scale": [round(value, 4) for value in (x2 - x1, z2 - z1, y2 - y1)],
+        })
+    gltf = {
+        "asset": {"version": "2.0", "generator": "layout preview"},
+        "scene": 0,
+        "scenes": [{"name": scene.project_name, "nodes": list(range(len(nodes)))}],
+        "nodes": nodes,
+        "meshes": [{"name": name, "primitives": [{"attributes": {"POSITION": 0, "NORMAL": 1}, "indices": 2, "material": k}]}
+                   for k, name in enumerate(materials)],
+        "materials": [{"name": name, "pbrMetallicRoughness": {"baseColorFactor": [*COLOURS[name], 1.0], "metallicFactor": 0.0,
+                                                              "roughnessFactor": 0.9}} for name in materials],
+        "buffers": [{"byteLength": len(buffer)}],
+        "bufferViews": [
+            {"buffer": 0, "byteOffset": 0, "byteLength": len(vertex_data), "byteStride": 12, "target": 34962},
+            {"buffer": 0, "byteOffset": len(vertex_data), "byteLength": len(indices) * 2, "target": 34963},
+        ],
+        "accessors": [
+            {"bufferView": 0, "byteOffset": 0, "componentType": 5126, "count": 24, "type": "VEC3",
+             "min": [0.0, 0.0, -1.0], "max": [1.0, 1.0, 0.0]},
+            {"bufferView": 0, "byteOffset": 24 * 12, "componentType": 5126, "count": 24, "type": "VEC3"},
+            {"bufferView": 1, "byteOffset": 0, "componentType": 5123, "count": len(indices), "type": "SCALAR"},
+        ],
+    }
+    return gltf, buffer
+
+def write_glb(path: str, gltf: dict, buffer: bytes):
+    # Binary glTF: a 12-byte header, then the JSON and the buffer as chunks padded to 4 bytes.
+    json_chunk = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
+    json_chunk += b" " * (-len(json_chunk) % 4)
+    buffer += b"\0" * (-len(buffer) % 4)
+    length = 12 + 8 + len(json_chunk) + 8 + len(buffer)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<4sII", b"glTF", 2, length))
+        f.write(struct.pack("<I4s", len(json_chunk), b"JSON") + json_chunk)
+        f.write(struct.pack("<I4s", len(buffer), b"BIN\0") + buffer)
+
+@traced("preview")
+def write_preview(project: Project, placements: Dict[str, Dict[str, float]], path: str):
+    """
+    Writes a quick look at a layout, straight from the project and its placements and without
+    building the IFC model: an SVG floor plan (.svg) or a box-level 3D view as OBJ (.obj, with
+    a .mtl next to it) or glTF (.gltf with the buffer embedded, or .glb).
+    """
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension not in PREVIEW_FORMATS:
+        raise ValueError(f"Unknown preview format '{extension}'; expected one of {', '.join(PREVIEW_FORMATS)}.")
+    scene = build_scene(project, placements)
+    if extension == "svg":
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(render_svg(scene))
+    elif extension == "obj":
+        mtl_path = os.path.splitext(path)[0] + ".mtl"
+        obj, mtl = render_obj(scene, os.path.basename(mtl_path))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(obj)
+        with open(mtl_path, "w", encoding="utf-8") as f:
+            f.write(mtl)
+    else:
+        gltf, buffer = render_gltf(scene)
+        if extension == "glb":
+            write_glb(path, gltf, buffer)
+        else:
+            gltf["buffers"][0]["uri"] = "data:application/octet-stream;base64," + base64.b64encode(buffer).decode("ascii")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(gltf, f, separators=(",", ":"))
+    count("preview.items", len(scene.items))
+    count("preview.collisions", len(scene.collisions))
+    count("preview.output_bytes", os.path.getsize(path))
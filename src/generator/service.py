@@ -2,21 +2,38 @@ import ifcopenshell
 import ifcopenshell.api
 import ifcopenshell.guid
 import ifcopenshell.geom
+import math
 import time
 import logging
-from typing import Dict
+import os
+import zipfile
+from typing import Dict, List, Optional
 
-from src.core.models import Project, EquipmentItem
+from src.core.geometry import oriented_footprint, quarter_turns
+from src.core.models import Architecture, Project, EquipmentItem, ExportOptions, Storey
+from src.core.rooms import placement_room, room_architecture
+from src.core.tracing import count, peak_memory_mb, span, traced
+from src.generator.library import ModelLibrary
 
 logging.getLogger('ifcopenshell').setLevel(logging.ERROR)
+logger = logging.getLogger(__name__)
 
-try:
-    from OCC.Core.gp import gp_Pnt, gp_Dir, gp_Ax2
-    from OCC.Core.BRepPrimAPI import BRepPrimAPI_MakeCylinder, BRepPrimAPI_MakeCone
-    OCC_AVAILABLE = True
-except ImportError:
-    logging.warning("pythonOCC not found. Complex geometry for silos will be replaced by simple boxes.")
-    OCC_AVAILABLE = False
+# pythonOCC is only needed for BREP silos, so it is imported on first use.
+OCC_AVAILABLE = None
+
+# Local X axis of an equipment placement per quarter turn counter-clockwise.
+QUARTER_TURN_AXES = {1: (0.0, 1.0, 0.0), 2: (-1.0, 0.0, 0.0), 3: (0.0, -1.0, 0.0)}
+
+def occ_available() -> bool:
+    global OCC_AVAILABLE
+    if OCC_AVAILABLE is None:
+        try:
+            import OCC.Core.BRepPrimAPI
+            OCC_AVAILABLE = True
+        except ImportError:
+            logger.warning("pythonOCC not found. BREP silos will be exported as swept solids instead.")
+            OCC_AVAILABLE = False
+    return OCC_AVAILABLE
 
 def create_surface_style(f: ifcopenshell.file, name: str, r: float, g: float, b: float, transparency: float = 0.0):
     rendering = f.create_entity(
@@ -39,69 +56,172 @@ def apply_style_to_representation(f: ifcopenshell.file, representation, style):
         Styles=[f.create_entity("IfcPresentationStyleAssignment", Styles=[style])],
     )
 
-def create_element(f: ifcopenshell.file, context, name: str, placement, w: float, d: float, h: float, style=None):
-    owner_history = f.by_type("IfcOwnerHistory")[0]
-    
-    if "силос" in name.lower() and OCC_AVAILABLE:
-        product = f.createIfcBuildingElementProxy(ifcopenshell.guid.new(), owner_history, name, None, None, placement, None, None)
-        
+def brep_silo_parts(f: ifcopenshell.file, radius: float, cylinder_height: float, cone_height: float):
+    from OCC.Core.gp import gp_Pnt, gp_Dir, gp_Ax2
+    from OCC.Core.BRepPrimAPI import BRepPrimAPI_MakeCylinder, BRepPrimAPI_MakeCone
+
+    settings = ifcopenshell.geom.settings()
+    settings.set(settings.STRICT_TOLERANCE, True)
+
+    cyl_axis = gp_Ax2(gp_Pnt(0.0, 0.0, cone_height), gp_Dir(0.0, 0.0, 1.0))
+    occ_cylinder = BRepPrimAPI_MakeCylinder(cyl_axis, radius, cylinder_height).Shape()
+    ifc_cyl_geom = ifcopenshell.geom.create_shape(f, occ_cylinder, settings).geometry
+
+    cone_axis = gp_Ax2(gp_Pnt(0.0, 0.0, 0.0), gp_Dir(0.0, 0.0, 1.0))
+    occ_cone = BRepPrimAPI_MakeCone(cone_axis, radius, 0.0, cone_height).Shape()
+    ifc_cone_geom = ifcopenshell.geom.create_shape(f, occ_cone, settings).geometry
+    return ifc_cyl_geom, ifc_cone_geom
+
+def swept_silo_parts(f: ifcopenshell.file, radius: float, cylinder_height: float, cone_height: float):
+    # The same cylinder and hopper as the B-rep version, built from IFC primitives directly:
+    # an extruded circle, and a right triangle in the XZ plane revolved around the Z axis.
+    up = f.createIfcDirection((0.0, 0.0, 1.0))
+    circle = f.createIfcCircleProfileDef('AREA', None, None, radius)
+    cylinder = f.createIfcExtrudedAreaSolid(circle, f.createIfcAxis2Placement3D(f.createIfcCartesianPoint((0.0, 0.0, cone_height))), up, cylinder_height)
+
+    def P2(x, y): return f.createIfcCartesianPoint((float(x), float(y)))
+    triangle = f.createIfcArbitraryClosedProfileDef(
+        'AREA', None, f.createIfcPolyline([P2(0.0, 0.0), P2(radius, 0.0), P2(0.0, cone_height), P2(0.0, 0.0)])
+    )
+    xz_plane = f.createIfcAxis2Placement3D(f.createIfcCartesianPoint((0.0, 0.0, 0.0)), f.createIfcDirection((0.0, -1.0, 0.0)), f.createIfcDirection((1.0, 0.0, 0.0)))
+    z_axis = f.createIfcAxis1Placement(f.createIfcCartesianPoint((0.0, 0.0, 0.0)), f.createIfcDirection((0.0, 1.0, 0.0)))
+    hopper = f.createIfcRevolvedAreaSolid(triangle, xz_plane, z_axis, 2.0 * math.pi)
+    return [cylinder], [hopper]
+
+class GeometryCache:
+    """
+    Shared geometry and styles for one IFC file. Identical equipment is modelled once as an
+    IfcRepresentationMap (per shape kind and size) and instanced through IfcMappedItem, and
+    every material gets a single IfcSurfaceStyle. Products showing the same maps share one
+    IfcProductDefinitionShape, and directions and the owner history are created or looked up
+    once per file rather than per element.
+    """
+
+    def __init__(self, f: ifcopenshell.file, context, owner_history=None):
+        self.f = f
+        self.context = context
+        self.owner_history = owner_history or f.by_type("IfcOwnerHistory")[0]
+        self.styles = {}
+        self.maps = {}
+        self.shapes = {}
+        self.directions = {}
+        self.types = {}
+        self.type_instances = {}
+        self.origin = f.createIfcAxis2Placement3D(f.createIfcCartesianPoint((0.0, 0.0, 0.0)))
+        self.identity = f.createIfcCartesianTransformationOperator3D(None, None, f.createIfcCartesianPoint((0.0, 0.0, 0.0)), None, None)
+
+    def direction(self, ratios):
+        if ratios not in self.directions:
+            self.directions[ratios] = self.f.createIfcDirection(ratios)
+        return self.directions[ratios]
+
+    def style(self, name: str, r: float, g: float, b: float, transparency: float = 0.0):
+        if name not in self.styles:
+            self.styles[name] = create_surface_style(self.f, name, r, g, b, transparency)
+        return self.styles[name]
+
+    def representation_map(self, key, identifier: str, rep_type: str, items, style=None):
+        if key not in self.maps:
+            rep = self.f.createIfcShapeRepresentation(self.context, identifier, rep_type, items)
+            apply_style_to_representation(self.f, rep, style)
+            self.maps[key] = self.f.createIfcRepresentationMap(self.origin, rep)
+        return self.maps[key]
+
+    def mapped_representation(self, rep_map, target=None):
+        mapped_item = self.f.createIfcMappedItem(rep_map, target or self.identity)
+        return self.f.createIfcShapeRepresentation(
+            self.context, rep_map.MappedRepresentation.RepresentationIdentifier, "MappedRepresentation", [mapped_item]
+        )
+
+    def product_shape(self, rep_maps, target=None):
+        # IFC4 lets several products share a product shape; it holds one mapped representation per map.
+        key = (tuple(rep_map.id() for rep_map in rep_maps), target.id() if target else None)
+        if key not in self.shapes:
+            self.shapes[key] = self.f.createIfcProductDefinitionShape(
+                None, None, [self.mapped_representation(rep_map, target) for rep_map in rep_maps])
+        return self.shapes[key]
+
+    def box_map(self, w: float, d: float, h: float, style=None):
+        key = ("box", round(w, 6), round(d, 6), round(h, 6), style.Name if style else None)
+        if key not in self.maps:
+            profile = self.f.createIfcRectangleProfileDef('AREA', None, None, w, d)
+            extrusion = self.f.createIfcExtrudedAreaSolid(profile, self.origin, self.direction((0.0, 0.0, 1.0)), abs(h))
+            self.representation_map(key, 'Body', 'SweptSolid', [extrusion], style)
+        return self.maps[key]
+
+    def silo_maps(self, w: float, d: float, h: float, lod: str = "BREP"):
+        key = ("silo", round(w, 6), round(d, 6), round(h, 6), lod)
+        if key in self.maps:
+            return self.maps[key]
+
+        f = self.f
         radius = min(w, d) / 2.0
         cylinder_height = h * 0.8
         cone_height = h * 0.2
         base_platform_height = 0.15
 
-        representations = []
-        settings = ifcopenshell.geom.settings()
-        settings.set(settings.STRICT_TOLERANCE, True)
-
-        cyl_axis = gp_Ax2(gp_Pnt(0.0, 0.0, cone_height), gp_Dir(0.0, 0.0, 1.0))
-        occ_cylinder = BRepPrimAPI_MakeCylinder(cyl_axis, radius, cylinder_height).Shape()
-        ifc_cyl_geom = ifcopenshell.geom.create_shape(f, occ_cylinder, settings).geometry
-        
-        cyl_rep = f.createIfcShapeRepresentation(
-            ContextOfItems=context, RepresentationIdentifier="Body", RepresentationType="Brep", Items=ifc_cyl_geom
-        )
-        silo_body_style = create_surface_style(f, "Silo Body", 0.8, 0.82, 0.84)
-        apply_style_to_representation(f, cyl_rep, silo_body_style)
-        representations.append(cyl_rep)
+        if lod == "BREP":
+            body_items, hopper_items = brep_silo_parts(f, radius, cylinder_height, cone_height)
+            rep_type = "Brep"
+        else:
+            body_items, hopper_items = swept_silo_parts(f, radius, cylinder_height, cone_height)
+            rep_type = "SweptSolid"
 
-        cone_axis = gp_Ax2(gp_Pnt(0.0, 0.0, 0.0), gp_Dir(0.0, 0.0, 1.0))
-        occ_cone = BRepPrimAPI_MakeCone(cone_axis, radius, 0.0, cone_height).Shape()
-        ifc_cone_geom = ifcopenshell.geom.create_shape(f, occ_cone, settings).geometry
+        body_map = self.representation_map(key + ("body",), "Body", rep_type, body_items,
+                                           self.style("Silo Body", 0.8, 0.82, 0.84))
+        hopper_map = self.representation_map(key + ("hopper",), "Hopper", rep_type, hopper_items,
+                                             self.style("Silo Hopper", 0.5, 0.5, 0.5))
 
-        cone_rep = f.createIfcShapeRepresentation(
-            ContextOfItems=context, RepresentationIdentifier="Hopper", RepresentationType="Brep", Items=ifc_cone_geom
-        )
-        hopper_style = create_surface_style(f, "Silo Hopper", 0.5, 0.5, 0.5)
-        apply_style_to_representation(f, cone_rep, hopper_style)
-        representations.append(cone_rep)
-        
         base_profile = f.createIfcRectangleProfileDef('AREA', "Base_Profile", None, w, d)
         base_pos = f.createIfcAxis2Placement3D(f.createIfcCartesianPoint((0.0, 0.0, -base_platform_height)))
         base_extrusion = f.createIfcExtrudedAreaSolid(
             SweptArea=base_profile, 
             Position=base_pos, 
-            ExtrudedDirection=f.createIfcDirection((0.0, 0.0, 1.0)), 
+            ExtrudedDirection=self.direction((0.0, 0.0, 1.0)),
             Depth=base_platform_height
         )
-        base_rep = f.createIfcShapeRepresentation(
-            ContextOfItems=context, RepresentationIdentifier="Base", RepresentationType="SweptSolid", Items=[base_extrusion]
-        )
-        base_style = create_surface_style(f, "Concrete Base", 0.6, 0.6, 0.6)
-        apply_style_to_representation(f, base_rep, base_style)
-        representations.append(base_rep)
+        base_map = self.representation_map(key + ("base",), "Base", "SweptSolid", [base_extrusion],
+                                           self.style("Concrete Base", 0.6, 0.6, 0.6))
+
+        self.maps[key] = [body_map, hopper_map, base_map]
+        return self.maps[key]
+
+    def assign_type(self, key, rep_maps, product, name: str = None):
+        if key not in self.types:
+            if name is None:
+                kind, w, d, h = key[:4]
+                name = f"{kind.capitalize()} {w:g}x{d:g}x{h:g}"
+            self.types[key] = self.f.createIfcBuildingElementProxyType(
+                ifcopenshell.guid.new(), self.owner_history, name, None, None, None, rep_maps, None, None, "NOTDEFINED"
+            )
+            self.type_instances[key] = []
+        self.type_instances[key].append(product)
 
-        product.Representation = f.createIfcProductDefinitionShape(None, None, representations)
+    def write_type_relations(self):
+        for key, element_type in self.types.items():
+            self.f.createIfcRelDefinesByType(ifcopenshell.guid.new(), self.owner_history, None, None, self.type_instances[key], element_type)
+
+def create_element(f: ifcopenshell.file, context, name: str, placement, w: float, d: float, h: float, style=None,
+                   cache: GeometryCache = None, lod: str = "BREP"):
+    if cache is None:
+        cache = GeometryCache(f, context)
+    owner_history = cache.owner_history
+    is_silo = "силос" in name.lower()
+    if is_silo and lod == "BREP" and not occ_available():
+        lod = "SWEPT"
+    
+    if is_silo and lod != "BOX":
+        rep_maps = cache.silo_maps(w, d, h, lod)
+        product = f.createIfcBuildingElementProxy(ifcopenshell.guid.new(), owner_history, name, None, None, placement,
+                                                  cache.product_shape(rep_maps), None)
+        cache.assign_type(("silo", round(w, 6), round(d, 6), round(h, 6), lod), rep_maps, product)
         return product
 
     else:
-        profile = f.createIfcRectangleProfileDef('AREA', name + "_profile", None, w, d)
-        extrusion_placement = f.createIfcAxis2Placement3D(f.createIfcCartesianPoint((0.0, 0.0, 0.0)))
-        extrusion_direction = f.createIfcDirection((0.0, 0.0, 1.0))
-        extrusion = f.createIfcExtrudedAreaSolid(profile, extrusion_placement, extrusion_direction, abs(h))
-        
-        shape_rep = f.createIfcShapeRepresentation(context, 'Body', 'SweptSolid', [extrusion])
-        product_shape = f.createIfcProductDefinitionShape(None, None, [shape_rep])
+        if is_silo and style is None:
+            style = cache.style("Silo Body", 0.8, 0.82, 0.84)
+        rep_map = cache.box_map(w, d, h, style)
+        product_shape = cache.product_shape([rep_map])
 
         element_type = name.split('_')[0]
         if "Стена" in element_type:
@@ -111,75 +231,58 @@ def create_element(f: ifcopenshell.file, context, name: str, placement, w: float
             element = f.createIfcSlab(ifcopenshell.guid.new(), owner_history, name, None, None, placement, product_shape, None, 'FLOOR')
         else:
             element = f.createIfcBuildingElementProxy(ifcopenshell.guid.new(), owner_history, name, None, None, placement, product_shape, None)
-
-        if style:
-            apply_style_to_representation(f, shape_rep, style)
+            cache.assign_type(("box", round(w, 6), round(d, 6), round(h, 6), style.Name if style else None), [rep_map], element)
         
         return element
 
-def create_3d_model(project: Project, placements: Dict[str, Dict[str, float]], output_filename: str):
-    print("\n5. Creating 3D model (IFC)...")
-    
-    f = ifcopenshell.file(schema="IFC4")
-    
-    owner_history = f.createIfcOwnerHistory(f.createIfcPersonAndOrganization(), f.createIfcApplication(), None, 'ADDED', int(time.time()))
-    ifc_project = f.createIfcProject(ifcopenshell.guid.new(), owner_history, project.meta.project_name)
-    
-    context = ifcopenshell.api.run("context.add_context", f, context_type="Model", target_view="MODEL_VIEW", context_identifier="Body")
-    ifcopenshell.api.run("unit.assign_unit", f)
-    ifc_project.RepresentationContexts = [context]
-    
-    site = f.createIfcSite(ifcopenshell.guid.new(), owner_history, "Site")
-    building = f.createIfcBuilding(ifcopenshell.guid.new(), owner_history, "Factory Building")
-    storey = f.createIfcBuildingStorey(ifcopenshell.guid.new(), owner_history, "Ground Floor")
-    ifcopenshell.api.run("aggregate.assign_object", f, relating_object=ifc_project, products=[site])
-    ifcopenshell.api.run("aggregate.assign_object", f, relating_object=site, products=[building])
-    ifcopenshell.api.run("aggregate.assign_object", f, relating_object=building, products=[storey])
+def create_library_element(f: ifcopenshell.file, name: str, placement, model_file: str, library: ModelLibrary,
+                           cache: GeometryCache):
+    library_maps = library.representation_maps(model_file)
+    if library_maps is None:
+        return None
+    rep_maps, mapping_target = library_maps
+    product = f.createIfcBuildingElementProxy(ifcopenshell.guid.new(), cache.owner_history, name, None, None, placement,
+                                              cache.product_shape(rep_maps, mapping_target), None)
+    type_name = os.path.splitext(os.path.basename(model_file))[0]
+    cache.assign_type(("model", model_file), rep_maps, product, name=type_name)
+    return product
 
+def create_room_shell(f: ifcopenshell.file, context, owner_history, building, parent_placement, arch: Architecture,
+                      styles_map: Dict, cache: GeometryCache, label: str = "") -> List:
+    # Floor, walls and roof of one room, placed relative to parent_placement (the room's outer
+    # corner). The roof is aggregated to the building; the floor and walls are returned so the
+    # caller can put them into their storey.
     def P(x, y, z): return f.createIfcCartesianPoint((float(x), float(y), float(z)))
 
-    print("   - Creating material styles...")
-    styles_map = {
-        "floor_style": create_surface_style(f, "FloorStyle", 0.4, 0.4, 0.45, transparency=0.0),
-        "wall_style": create_surface_style(f, "WallStyle", 0.75, 0.75, 0.75, transparency=0.0),
-        "roof_style": create_surface_style(f, "RoofStyle", 0.2, 0.6, 0.3, transparency=0.0),
-        "flat_roof_style": create_surface_style(f, "FlatRoofStyle", 0.5, 0.5, 0.5, transparency=0.0),
-        "mixer_style": create_surface_style(f, "MixerStyle", 0.9, 0.9, 0.6),
-        "press_style": create_surface_style(f, "PressStyle", 0.6, 0.9, 0.6),
-        "default_style": create_surface_style(f, "DefaultStyle", 0.9, 0.5, 0.5)
-    }
-    
-    all_elements = []
-    print("   - Creating architecture (floor, walls, roof)...")
-    
-    arch = project.architecture
+    elements = []
     room = arch.room_dimensions
     wall_t = max(0.5, arch.wall_thickness)
     slab_t = 0.2
     w, d, h = room.width, room.depth, room.height
 
-    floor_placement = f.createIfcLocalPlacement(storey.ObjectPlacement, f.createIfcAxis2Placement3D(P(0.0, 0.0, 0.0)))
-    floor = create_element(f, context, "Пол", floor_placement, w, d, -slab_t, style=styles_map["floor_style"])
-    all_elements.append(floor)
+    # Box profiles are centred on their placement, so every element is placed at its centre.
+    floor_placement = f.createIfcLocalPlacement(parent_placement, f.createIfcAxis2Placement3D(P(w / 2.0, d / 2.0, 0.0)))
+    floor = create_element(f, context, "Пол" + label, floor_placement, w, d, -slab_t, style=styles_map["floor_style"], cache=cache)
+    elements.append(floor)
     
     walls_def = [
-        {'name': 'Стена_Юг', 'pos': P(0.0, 0.0, 0.0), 'dims': (w, wall_t, h)},
-        {'name': 'Стена_Север', 'pos': P(0.0, d - wall_t, 0.0), 'dims': (w, wall_t, h)},
-        {'name': 'Стена_Запад', 'pos': P(0.0, 0.0, 0.0), 'dims': (wall_t, d, h)},
-        {'name': 'Стена_Восток', 'pos': P(w - wall_t, 0.0, 0.0), 'dims': (wall_t, d, h)}
+        {'name': 'Стена_Юг', 'pos': P(w / 2.0, wall_t / 2.0, 0.0), 'dims': (w, wall_t, h)},
+        {'name': 'Стена_Север', 'pos': P(w / 2.0, d - wall_t / 2.0, 0.0), 'dims': (w, wall_t, h)},
+        {'name': 'Стена_Запад', 'pos': P(wall_t / 2.0, d / 2.0, 0.0), 'dims': (wall_t, d, h)},
+        {'name': 'Стена_Восток', 'pos': P(w - wall_t / 2.0, d / 2.0, 0.0), 'dims': (wall_t, d, h)}
     ]
     for w_def in walls_def:
-        wall_placement = f.createIfcLocalPlacement(storey.ObjectPlacement, f.createIfcAxis2Placement3D(w_def['pos']))
-        wall = create_element(f, context, w_def['name'], wall_placement, *w_def['dims'], style=styles_map["wall_style"])
-        all_elements.append(wall)
+        wall_placement = f.createIfcLocalPlacement(parent_placement, f.createIfcAxis2Placement3D(w_def['pos']))
+        wall = create_element(f, context, w_def['name'] + label, wall_placement, *w_def['dims'], style=styles_map["wall_style"], cache=cache)
+        elements.append(wall)
 
     roof_extrusion, roof_placement, roof_style = None, None, None
-    roof_config = project.architecture.roof
+    roof_config = arch.roof
 
     if roof_config:
-        print(f"     - Creating roof of type: {roof_config.type}...")
+        logger.debug(f"     - Creating roof of type: {roof_config.type}...")
         roof_placement_3d = f.createIfcAxis2Placement3D(P(0.0, 0.0, h))
-        roof_placement = f.createIfcLocalPlacement(building.ObjectPlacement, roof_placement_3d)
+        roof_placement = f.createIfcLocalPlacement(parent_placement, roof_placement_3d)
 
         if roof_config.type == 'GABLE':
             gable_height = roof_config.height if roof_config.height is not None else w / 4.0
@@ -188,31 +291,32 @@ def create_3d_model(project: Project, placements: Dict[str, Dict[str, float]], o
             polyline = f.createIfcPolyline(profile_points)
             closed_profile = f.createIfcArbitraryClosedProfileDef("AREA", "Gable_Roof_Profile", polyline)
             
-            extrusion_dir = f.createIfcDirection((0.0, 1.0, 0.0))
+            extrusion_dir = cache.direction((0.0, 1.0, 0.0))
             roof_extrusion = f.createIfcExtrudedAreaSolid(closed_profile, None, extrusion_dir, d)
             roof_style = styles_map["roof_style"]
 
         elif roof_config.type == 'FLAT':
             roof_thickness = roof_config.thickness if roof_config.thickness is not None else 0.3
             
-            flat_profile = f.createIfcRectangleProfileDef('AREA', 'Flat_Roof_Profile', None, w, d)
-            extrusion_dir = f.createIfcDirection((0.0, 0.0, 1.0))
+            flat_profile = f.createIfcRectangleProfileDef('AREA', 'Flat_Roof_Profile',
+                                                          f.createIfcAxis2Placement2D(f.createIfcCartesianPoint((w / 2.0, d / 2.0))), w, d)
+            extrusion_dir = cache.direction((0.0, 0.0, 1.0))
             roof_extrusion = f.createIfcExtrudedAreaSolid(flat_profile, None, extrusion_dir, roof_thickness)
             roof_style = styles_map["flat_roof_style"]
 
     else:
-        print("     - Creating roof (using fallback/legacy logic)...")
+        logger.debug("     - Creating roof (using fallback/legacy logic)...")
         gable_height = w / 4.0
         
         profile_points = [P(0.0, 0.0, 0.0), P(w, 0.0, 0.0), P(w / 2.0, 0.0, gable_height)]
         polyline = f.createIfcPolyline(profile_points)
         closed_profile = f.createIfcArbitraryClosedProfileDef("AREA", "Gable_Roof_Profile", polyline)
         
-        extrusion_dir = f.createIfcDirection((0.0, 1.0, 0.0))
+        extrusion_dir = cache.direction((0.0, 1.0, 0.0))
         roof_extrusion = f.createIfcExtrudedAreaSolid(closed_profile, None, extrusion_dir, d)
         
         roof_placement_3d = f.createIfcAxis2Placement3D(P(0.0, 0.0, h))
-        roof_placement = f.createIfcLocalPlacement(building.ObjectPlacement, roof_placement_3d)
+        roof_placement = f.createIfcLocalPlacement(parent_placement, roof_placement_3d)
         roof_style = styles_map["roof_style"]
 
     if roof_extrusion and roof_placement:
@@ -220,20 +324,36 @@ def create_3d_model(project: Project, placements: Dict[str, Dict[str, float]], o
         apply_style_to_representation(f, shape_rep, roof_style)
         product_shape = f.createIfcProductDefinitionShape(None, None, [shape_rep])
         
-        roof = f.createIfcRoof(ifcopenshell.guid.new(), owner_history, "Крыша", None, None, roof_placement, product_shape, "NOTDEFINED")
+        roof = f.createIfcRoof(ifcopenshell.guid.new(), owner_history, "Крыша" + label, None, None, roof_placement, product_shape, "NOTDEFINED")
         ifcopenshell.api.run("aggregate.assign_object", f, relating_object=building, products=[roof])
+    return elements
+
+def create_equipment(f: ifcopenshell.file, context, equipment: List[EquipmentItem], placements: Dict[str, Dict[str, float]],
+                     parent_placement, styles_map: Dict, cache: GeometryCache, library: ModelLibrary,
+                     share_geometry: bool, lod: str) -> List:
+    # Equipment placed relative to parent_placement.
+    def P(x, y, z): return f.createIfcCartesianPoint((float(x), float(y), float(z)))
 
-    print("   - Placing equipment...")
-    equipment_map: Dict[str, EquipmentItem] = {eq.id: eq for eq in project.equipment}
+    elements = []
+    equipment_map: Dict[str, EquipmentItem] = {eq.id: eq for eq in equipment}
     
     for eq_id, placement in placements.items():
         eq_data = equipment_map.get(eq_id)
         if not eq_data: continue
 
         eq_w, eq_d, eq_h = eq_data.footprint.width, eq_data.footprint.depth, eq_data.height
-        pos = P(placement['x'], placement['y'], 0.0)
+        # The placement is the corner of the (possibly turned) footprint; the geometry is built
+        # around its centre and turned there.
+        rotation = placement.get('rotation_deg', 0)
+        placed_w, placed_d = oriented_footprint(eq_data, rotation)
+        pos = P(placement['x'] + placed_w / 2.0, placement['y'] + placed_d / 2.0, 0.0)
+        turns = quarter_turns(rotation)
+        if turns:
+            axis_placement = f.createIfcAxis2Placement3D(pos, cache.direction((0.0, 0.0, 1.0)), cache.direction(QUARTER_TURN_AXES[turns]))
+        else:
+            axis_placement = f.createIfcAxis2Placement3D(pos)
         
-        eq_placement = f.createIfcLocalPlacement(storey.ObjectPlacement, f.createIfcAxis2Placement3D(pos))
+        eq_placement = f.createIfcLocalPlacement(parent_placement, axis_placement)
         
         eq_style = None
         eq_name_lower = eq_data.name.lower()
@@ -242,12 +362,130 @@ def create_3d_model(project: Project, placements: Dict[str, Dict[str, float]], o
             elif "пресс" in eq_name_lower: eq_style = styles_map["press_style"]
             else: eq_style = styles_map["default_style"]
 
-        element = create_element(f, context, eq_data.name, eq_placement, eq_w, eq_d, eq_h, style=eq_style)
-        all_elements.append(element)
-        print(f"     - Created object: '{eq_data.name}'")
+        element_cache = cache if share_geometry else GeometryCache(f, context, cache.owner_history)
+        element = None
+        if eq_data.model_file and lod != "BOX":
+            element = create_library_element(f, eq_data.name, eq_placement, eq_data.model_file, library, element_cache)
+        if element is None:
+            element = create_element(f, context, eq_data.name, eq_placement, eq_w, eq_d, eq_h, style=eq_style, cache=element_cache, lod=lod)
+        if element_cache is not cache:
+            element_cache.write_type_relations()
+        elements.append(element)
+        logger.debug(f"     - Created object: '{eq_data.name}'")
+    return elements
+
+def write_ifc(f: ifcopenshell.file, output_filename: str):
+    # A .ifczip file is the STEP file deflated into a zip archive, as IFC viewers expect it. The
+    # STEP text goes through a temporary file so it is never held in memory as one string.
+    if not output_filename.lower().endswith(".ifczip"):
+        f.write(output_filename)
+        return
+    step_file = os.path.splitext(output_filename)[0] + ".tmp.ifc"
+    f.write(step_file)
+    try:
+        with zipfile.ZipFile(output_filename, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.write(step_file, os.path.splitext(os.path.basename(output_filename))[0] + ".ifc")
+    finally:
+        os.remove(step_file)
+
+@traced("ifc_build")
+def create_3d_model(project: Project, placements: Dict[str, Dict[str, float]], output_filename: str, share_geometry: bool = True,
+                    library_dir: Optional[str] = None):
+    """
+    Writes the layout as an IFC model. A single-room project gets one storey holding the room
+    shell and the equipment. With several rooms, every storey becomes an IfcBuildingStorey at
+    its elevation and every room an IfcSpace in its storey, placed at the room's origin; the
+    room's equipment is contained in the space and its floor and walls in the storey.
+    """
+    lod = (project.export_options or ExportOptions()).level_of_detail
+    logger.info(f"\n5. Creating 3D model (IFC, level of detail: {lod})...")
+    
+    f = ifcopenshell.file(schema="IFC4")
+    
+    owner_history = f.createIfcOwnerHistory(f.createIfcPersonAndOrganization(), f.createIfcApplication(), None, 'ADDED', int(time.time()))
+    ifc_project = f.createIfcProject(ifcopenshell.guid.new(), owner_history, project.meta.project_name)
+    
+    context = ifcopenshell.api.run("context.add_context", f, context_type="Model", target_view="MODEL_VIEW", context_identifier="Body")
+    ifcopenshell.api.run("unit.assign_unit", f)
+    ifc_project.RepresentationContexts = [context]
+    
+    site = f.createIfcSite(ifcopenshell.guid.new(), owner_history, "Site")
+    building = f.createIfcBuilding(ifcopenshell.guid.new(), owner_history, "Factory Building")
+    ifcopenshell.api.run("aggregate.assign_object", f, relating_object=ifc_project, products=[site])
+    ifcopenshell.api.run("aggregate.assign_object", f, relating_object=site, products=[building])
+
+    def P(x, y, z): return f.createIfcCartesianPoint((float(x), float(y), float(z)))
+
+    logger.info("   - Creating material styles...")
+    cache = GeometryCache(f, context, owner_history)
+    styles_map = {
+        "floor_style": cache.style("FloorStyle", 0.4, 0.4, 0.45, transparency=0.0),
+        "wall_style": cache.style("WallStyle", 0.75, 0.75, 0.75, transparency=0.0),
+        "roof_style": cache.style("RoofStyle", 0.2, 0.6, 0.3, transparency=0.0),
+        "flat_roof_style": cache.style("FlatRoofStyle", 0.5, 0.5, 0.5, transparency=0.0),
+        "mixer_style": cache.style("MixerStyle", 0.9, 0.9, 0.6),
+        "press_style": cache.style("PressStyle", 0.6, 0.9, 0.6),
+        "default_style": cache.style("DefaultStyle", 0.9, 0.5, 0.5)
+    }
+    # Vendor models replace the built-in boxes and silos except in the BOX quick-look mode.
+    library = ModelLibrary(f, context, library_dir)
+    arch = project.architecture
+    element_count = 0
+
+    if not arch.rooms:
+        storey = f.createIfcBuildingStorey(ifcopenshell.guid.new(), owner_history, "Ground Floor")
+        ifcopenshell.api.run("aggregate.assign_object", f, relating_object=building, products=[storey])
+
+        logger.info("   - Creating architecture (floor, walls, roof)...")
+        all_elements = create_room_shell(f, context, owner_history, building, storey.ObjectPlacement, arch, styles_map, cache)
+        logger.info("   - Placing equipment...")
+        all_elements += create_equipment(f, context, project.equipment, placements, storey.ObjectPlacement, styles_map, cache,
+                                         library, share_geometry, lod)
+        cache.write_type_relations()
+
+        if all_elements:
+            ifcopenshell.api.run("spatial.assign_container", f, products=all_elements, relating_structure=storey)
+        element_count = len(all_elements)
+    else:
+        storeys = {}
+        for storey_def in arch.storeys or [Storey(id="ground", name="Ground Floor")]:
+            storey_placement = f.createIfcLocalPlacement(None, f.createIfcAxis2Placement3D(P(0.0, 0.0, storey_def.elevation)))
+            storey = f.createIfcBuildingStorey(ifcopenshell.guid.new(), owner_history, storey_def.name, None, None, storey_placement,
+                                               None, None, "ELEMENT", float(storey_def.elevation))
+            ifcopenshell.api.run("aggregate.assign_object", f, relating_object=building, products=[storey])
+            storeys[storey_def.id] = storey
+
+        items = {item.id: item for item in project.equipment}
+        first_storey = next(iter(storeys.values()))
+        for room in arch.rooms:
+            storey = storeys.get(room.storey, first_storey) if room.storey is not None else first_storey
+            room_placement = f.createIfcLocalPlacement(storey.ObjectPlacement, f.createIfcAxis2Placement3D(P(room.origin_x, room.origin_y, 0.0)))
+            space = f.createIfcSpace(ifcopenshell.guid.new(), owner_history, room.id, None, None, room_placement, None, room.name,
+                                     "ELEMENT", "INTERNAL")
+            ifcopenshell.api.run("aggregate.assign_object", f, relating_object=storey, products=[space])
+            # The aggregation replaces the space's placement with one relative to the storey.
+            room_placement = space.ObjectPlacement
+
+            logger.info(f"   - Creating room '{room.name}' (floor, walls, roof)...")
+            shell = create_room_shell(f, context, owner_history, building, room_placement, room_architecture(room, arch),
+                                      styles_map, cache, label=f" ({room.name})")
+            ifcopenshell.api.run("spatial.assign_container", f, products=shell, relating_structure=storey)
 
-    if all_elements:
-        ifcopenshell.api.run("spatial.assign_container", f, products=all_elements, relating_structure=storey)
+            room_placements = {eq_id: placement for eq_id, placement in placements.items()
+                               if eq_id in items and placement_room(items[eq_id], placement) == room.id}
+            equipment = create_equipment(f, context, project.equipment, room_placements, room_placement, styles_map, cache,
+                                         library, share_geometry, lod)
+            if equipment:
+                ifcopenshell.api.run("spatial.assign_container", f, products=equipment, relating_structure=space)
+            element_count += len(shell) + len(equipment)
+        cache.write_type_relations()
 
-    f.write(output_filename)
-    print(f"   > Model successfully saved to file: {output_filename}")
+    with span("ifc_write"):
+        write_ifc(f, output_filename)
+    count("ifc.entities", len(f.entity_names()))
+    count("ifc.elements", element_count)
+    count("ifc.output_bytes", os.path.getsize(output_filename))
+    peak_mb = peak_memory_mb()
+    if peak_mb is not None:
+        count("ifc.peak_memory_mb", peak_mb)
+    logger.info(f"   > Model successfully saved to file: {output_filename}")
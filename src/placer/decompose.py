@@ -0,0 +1,286 @@
+import contextlib
+import io
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ortools.sat.python import cp_model
+
+from src.core.models import Project, PlacementResult, SolveStats, SolverOptions
+from src.core.tracing import span, traced
+from src.placer.service import (
+    PlacementSolutionCallback, SolutionHandler, add_objective, add_rules, calculate_placements, collect_solve_stats,
+    configure_solver, count_model, make_box, oriented, run_solver,
+)
+from src.placer.units import SCALE, box_variant, box_variants, room_bounds
+
+logger = logging.getLogger(__name__)
+
+# Share of the time limit given to the cluster stage; the block stage gets the rest.
+CLUSTER_TIME_SHARE = 0.3
+ABSOLUTE_RULES = ('AVOID_ZONE', 'PLACE_IN_ZONE', 'ATTACH_TO_WALL')
+
+def find_clusters(project: Project) -> List[List[str]]:
+    # Items tied by relative rules (PLACE_AFTER chains, ALIGN), items that share a PLACE_IN_ZONE
+    # area and items of the same production-line group end up in one cluster.
+    parent = {item.id: item.id for item in project.equipment}
+
+    def find(eq_id: str) -> str:
+        while parent[eq_id] != eq_id:
+            parent[eq_id] = parent[parent[eq_id]]
+            eq_id = parent[eq_id]
+        return eq_id
+
+    def union(members: List[str]):
+        for other in members[1:]:
+            parent[find(other)] = find(members[0])
+
+    shared = defaultdict(list)
+    for rule in project.rules:
+        targets = sorted(target for target in set(rule.targets) if target in parent)
+        if rule.type in ('PLACE_AFTER', 'ALIGN'):
+            union(targets)
+        elif rule.type == 'PLACE_IN_ZONE' and targets:
+            shared[('zone', tuple(rule.params.area))].extend(targets)
+    for item in project.equipment:
+        if item.group:
+            shared[('group', item.group)].append(item.id)
+    for members in shared.values():
+        union(members)
+
+    clusters = defaultdict(list)
+    for item in project.equipment:
+        clusters[find(item.id)].append(item.id)
+    return list(clusters.values())
+
+def cluster_project(project: Project, members: List[str], time_limit_sec: float, num_workers: int) -> Project:
+    # The cluster is laid out in the full room with every rule that only concerns its members,
+    # so its own position already satisfies the absolute rules and is a valid start for the block.
+    # A greedy layout may break the cluster's rules, so it must not become a block.
+    member_set = set(members)
+    options = (project.solver_options or SolverOptions()).copy(update={
+        'time_limit_sec': time_limit_sec, 'num_workers': num_workers, 'decompose': False, 'use_heuristic': False,
+    })
+    return project.copy(update={
+        'equipment': [item for item in project.equipment if item.id in member_set],
+        'rules': [rule for rule in project.rules
+                  if rule.type == 'AVOID_ZONE' or (rule.targets and set(rule.targets) <= member_set)],
+        'flows': [flow for flow in project.flows if flow.source in member_set and flow.target in member_set],
+        'solver_options': options,
+    })
+
+def solve_cluster(sub_project: Project, deadline: float,
+                  stop_event: Optional[threading.Event] = None) -> Optional[Dict[str, Dict[str, float]]]:
+    # Runs in a worker process; the per-rule output of the cluster models is not interesting.
+    # Clusters queued behind others only get what is left of the stage's time (`deadline` is a
+    # time.time() value, which every process shares).
+    remaining = deadline - time.time()
+    if remaining < 0.1:
+        return None
+    options = sub_project.solver_options
+    sub_project = sub_project.copy(update={'solver_options': options.copy(update={
+        'time_limit_sec': min(options.time_limit_sec, remaining),
+    })})
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = calculate_placements(sub_project, stop_event=stop_event)
+    return None if result.is_fallback else result.placements
+
+def solve_clusters(project: Project, clusters: List[List[str]], time_limit_sec: float, max_workers: Optional[int],
+                   stop_event: Optional[threading.Event] = None) -> Optional[List[Optional[Dict[str, Dict[str, float]]]]]:
+    # Every cluster may use time_limit_sec, and the stage as a whole too. Clusters solved at the
+    # same time share the solver workers. Returns None if stop_event is set before every cluster is solved.
+    deadline = time.time() + time_limit_sec
+    results: List[Optional[Dict[str, Dict[str, float]]]] = [None] * len(clusters)
+    solved = [index for index, members in enumerate(clusters) if len(members) > 1]
+    concurrent = min(max_workers or os.cpu_count() or 1, len(solved)) if len(solved) > 1 else 1
+    options = project.solver_options or SolverOptions()
+    num_workers = max(1, (options.num_workers or os.cpu_count() or 1) // concurrent)
+    jobs = {}
+    for index, members in enumerate(clusters):
+        if len(members) == 1:
+            # A lone item is its own block; its position inside the block is the origin.
+            results[index] = {members[0]: None}
+        else:
+            jobs[index] = cluster_project(project, members, time_limit_sec, num_workers)
+
+    if len(jobs) > 1:
+        executor = ProcessPoolExecutor(max_workers=concurrent)
+        stopped = False
+        try:
+            futures = {executor.submit(solve_cluster, sub_project, deadline): index for index, sub_project in jobs.items()}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[futures[future]] = future.result()
+                if pending and stop_event is not None and stop_event.is_set():
+                    stopped = True
+                    return None
+        finally:
+            # A stopped run does not wait for the cluster solves still running; they end at their time limit.
+            executor.shutdown(wait=not stopped, cancel_futures=True)
+    else:
+        for index, sub_project in jobs.items():
+            results[index] = solve_cluster(sub_project, deadline, stop_event)
+            if stop_event is not None and stop_event.is_set():
+                return None
+    return results
+
+def build_blocks(project: Project, clusters: List[List[str]], cluster_placements: List[Dict]) -> List[Dict]:
+    # Each block is the bounding box of its members' virtual boxes, with every member's
+    # virtual box at a fixed offset from the block corner. Members keep the orientation of their
+    # cluster layout; a lone item that may be rotated keeps both, one entry in 'sizes' each.
+    items = {item.id: item for item in project.equipment}
+    blocks = []
+    for members, placements in zip(clusters, cluster_placements):
+        if placements[members[0]] is None:
+            variants = box_variants(items[members[0]], project.solver_options)
+            blocks.append({
+                'members': {members[0]: (0, 0, variants)},
+                'w': variants[0].w,
+                'd': variants[0].d,
+                'sizes': [(variant.w, variant.d) for variant in variants],
+            })
+            continue
+        boxes = {}
+        for eq_id in members:
+            placement = placements[eq_id]
+            variant = box_variant(items[eq_id], placement.get('rotation_deg', 0))
+            vx = int(round(placement['x'] * SCALE)) - variant.x_offset
+            vy = int(round(placement['y'] * SCALE)) - variant.y_offset
+            boxes[eq_id] = (vx, vy, variant)
+        min_vx = min(vx for vx, _, _ in boxes.values())
+        min_vy = min(vy for _, vy, _ in boxes.values())
+        w = max(vx + variant.w for vx, _, variant in boxes.values()) - min_vx
+        d = max(vy + variant.d for _, vy, variant in boxes.values()) - min_vy
+        blocks.append({
+            'members': {eq_id: (vx - min_vx, vy - min_vy, [variant]) for eq_id, (vx, vy, variant) in boxes.items()},
+            'w': w,
+            'd': d,
+            'sizes': [(w, d)],
+        })
+    return blocks
+
+def shelf_pack(blocks: List[Dict], min_x: int, max_x: int, min_y: int) -> Dict[int, Tuple[int, int]]:
+    # Deepest blocks first, row by row. Rules are ignored; the packing only gives the block
+    # model a collision-free starting point, which matters most when there are many blocks.
+    corners = {}
+    x, y, row_depth = min_x, min_y, 0
+    for index in sorted(range(len(blocks)), key=lambda index: -blocks[index]['d']):
+        block = blocks[index]
+        if x + block['w'] > max_x and x > min_x:
+            x, y, row_depth = min_x, y + row_depth, 0
+        corners[index] = (x, y)
+        x += block['w']
+        row_depth = max(row_depth, block['d'])
+    return corners
+
+@traced("model_build")
+def build_block_model(project: Project, blocks: List[Dict], block_of: Dict[str, int]) -> Tuple[cp_model.CpModel, Dict[str, Dict]]:
+    # Every block is one rigid box; a member's position is its block's corner plus a fixed offset.
+    # Blocks of a single rotatable item choose their orientation like free items do.
+    min_x_room, max_x_room, min_y_room, max_y_room = room_bounds(project)
+    hints = shelf_pack(blocks, min_x_room, max_x_room, min_y_room)
+    model = cp_model.CpModel()
+    intervals_x, intervals_y, member_boxes, positions = [], [], [], {}
+    for index, block in enumerate(blocks):
+        widths, depths = zip(*block['sizes'])
+        bx = model.NewIntVar(min_x_room, max_x_room - min(widths), f"bx_{index}")
+        by = model.NewIntVar(min_y_room, max_y_room - min(depths), f"by_{index}")
+        if index in hints:
+            model.AddHint(bx, hints[index][0])
+            model.AddHint(by, hints[index][1])
+        turned = model.NewBoolVar(f"rot_{index}") if len(block['sizes']) > 1 else None
+        if turned is None:
+            intervals_x.append(model.NewFixedSizeIntervalVar(bx, block['w'], f"ibx_{index}"))
+            intervals_y.append(model.NewFixedSizeIntervalVar(by, block['d'], f"iby_{index}"))
+        else:
+            model.Add(bx + oriented(widths, turned) <= max_x_room)
+            model.Add(by + oriented(depths, turned) <= max_y_room)
+            for literal, (w, d), suffix in zip((turned.Not(), turned), block['sizes'], ('', 'r')):
+                intervals_x.append(model.NewOptionalFixedSizeIntervalVar(bx, w, literal, f"ibx{suffix}_{index}"))
+                intervals_y.append(model.NewOptionalFixedSizeIntervalVar(by, d, literal, f"iby{suffix}_{index}"))
+        for eq_id, (ox, oy, variants) in block['members'].items():
+            box = make_box(eq_id, bx + ox, by + oy, variants, turned)
+            positions[eq_id] = box
+            member_boxes.append(box)
+    model.AddNoOverlap2D(intervals_x, intervals_y)
+
+    # Rules inside one block are already satisfied by the cluster layout; absolute rules and
+    # rules between blocks are applied to the members' positions in the block model.
+    block_rules = [
+        rule for rule in project.rules
+        if rule.type in ABSOLUTE_RULES or len({block_of.get(target) for target in rule.targets}) > 1
+    ]
+    # Project order keeps the objective pairs and their weights the same as in the monolithic model.
+    order = {item.id: i for i, item in enumerate(project.equipment)}
+    member_boxes.sort(key=lambda box: order[box['id']])
+    block_project = project.copy(update={'rules': block_rules})
+    connected_pairs, alignment_penalties = add_rules(model, block_project, member_boxes)
+    add_objective(model, block_project, member_boxes, connected_pairs, alignment_penalties,
+                  skip_pair=lambda id1, id2: block_of[id1] == block_of[id2])
+    count_model(model)
+    return model, positions
+
+def calculate_placements_decomposed(project: Project,
+                                    log_callback: Optional[Callable[[str], None]] = None,
+                                    on_solution: Optional[SolutionHandler] = None,
+                                    stop_event: Optional[threading.Event] = None) -> Optional[PlacementResult]:
+    logger.info("  - Decomposed mode: solving clusters of related items, then placing them as blocks.")
+    start = time.perf_counter()
+    options = project.solver_options or SolverOptions()
+    time_limit = options.time_limit_sec if options.time_limit_sec else 30.0
+
+    clusters = find_clusters(project)
+    multi = sum(1 for members in clusters if len(members) > 1)
+    logger.info(f"  - {len(clusters)} blocks, {multi} of them clusters of several items. Solving clusters...")
+    with span("decompose.clusters", clusters=len(clusters)):
+        cluster_placements = solve_clusters(project, clusters, time_limit * CLUSTER_TIME_SHARE,
+                                            options.decompose_workers or os.cpu_count(), stop_event)
+    if cluster_placements is None:
+        logger.info("  - Search stopped by the caller while solving clusters.")
+        return PlacementResult(placements=None, stats=SolveStats(status='UNKNOWN', wall_time_sec=time.perf_counter() - start),
+                               stopped=True)
+    if any(placements is None for placements in cluster_placements):
+        logger.warning("  > A cluster has no feasible layout on its own.")
+        return None
+
+    blocks = build_blocks(project, clusters, cluster_placements)
+    block_of = {eq_id: index for index, block in enumerate(blocks) for eq_id in block['members']}
+
+    min_x_room, max_x_room, min_y_room, max_y_room = room_bounds(project)
+    if any(all(w > max_x_room - min_x_room or d > max_y_room - min_y_room for w, d in block['sizes']) for block in blocks):
+        logger.warning("  > A cluster is larger than the room.")
+        return None
+
+    model, positions = build_block_model(project, blocks, block_of)
+
+    def extract_placements(value: Callable) -> Dict[str, Dict[str, float]]:
+        return {
+            item.id: {
+                'x': value(positions[item.id]['px']) / SCALE,
+                'y': value(positions[item.id]['py']) / SCALE,
+                'rotation_deg': value(positions[item.id]['rotation']),
+            }
+            for item in project.equipment
+        }
+
+    remaining = max(1.0, time_limit - (time.perf_counter() - start))
+    solver = configure_solver(options.copy(update={'time_limit_sec': remaining}), log_callback)
+    callback = PlacementSolutionCallback(extract_placements, on_solution)
+    status = run_solver(solver, model, callback, stop_event)
+    stats = collect_solve_stats(solver, status, options)
+    stats.wall_time_sec = time.perf_counter() - start
+    stats.num_solutions = callback.solution_count
+    stopped = callback.stopped or (stop_event is not None and stop_event.is_set())
+
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        logger.warning(f"  > Blocks could not be placed. Status: {stats.status}")
+        return PlacementResult(placements=None, stats=stats, stopped=stopped)
+
+    logger.info("  > Solution found!")
+    return PlacementResult(placements=extract_placements(solver.Value), stats=stats, stopped=stopped)
@@ -0,0 +1,243 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.models import PlaceAfterParams, Project
+from src.placer.units import SCALE, box_variants, room_bounds
+
+# Candidate corners are checked against the placed boxes in chunks, lowest first, so the
+# search usually stops after the first chunk.
+CHUNK_SIZE = 64
+
+def unique_points(points: np.ndarray) -> np.ndarray:
+    # np.unique(axis=0) is slow; room coordinates are non-negative centimetres, so pack each point
+    # into one integer. Negative candidates (e.g. a centred position past the wall) are never valid.
+    points = np.maximum(points, 0)
+    keys = np.unique(points[:, 0] * (1 << 32) + points[:, 1])
+    return np.stack([keys >> 32, keys & ((1 << 32) - 1)], axis=1)
+
+class GreedyPlacer:
+    """
+    Constructive bottom-left placer. Every item goes to the lowest, then leftmost free corner
+    point that satisfies its rules; items tied by PLACE_AFTER are placed right after their
+    anchor. Works in solver units on virtual boxes (footprint plus maintenance zone), so its
+    layout can be used directly as a CP-SAT hint. Rotatable items are tried in both
+    orientations and keep the one with the better position.
+    """
+
+    def __init__(self, project: Project):
+        self.project = project
+        self.min_x, self.max_x, self.min_y, self.max_y = room_bounds(project)
+        self.variants = {item.id: box_variants(item, project.solver_options) for item in project.equipment}
+        # Sizes of the orientation currently tried or chosen per item.
+        self.sizes: Dict[str, Tuple[int, int, int, int]] = {}
+        self.footprints: Dict[str, Tuple[int, int]] = {}
+        self.rotations: Dict[str, int] = {}
+        for eq_id, variants in self.variants.items():
+            self.orient(eq_id, variants[0])
+
+        self.zones: Dict[str, Tuple[int, int, int, int]] = {}
+        self.walls: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+        self.after: Dict[str, PlaceAfterParams] = {}
+        self.followers: Dict[str, List[str]] = defaultdict(list)
+        self.aligned: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+        obstacles = []
+        for rule in project.rules:
+            params = rule.params
+            if any(target not in self.variants for target in rule.targets):
+                continue
+            if rule.type == 'AVOID_ZONE':
+                obstacles.append([int(value * SCALE) for value in params.area])
+            elif rule.type == 'PLACE_IN_ZONE':
+                self.zones[params.target] = tuple(int(value * SCALE) for value in params.area)
+            elif rule.type == 'ATTACH_TO_WALL':
+                self.walls[params.target].append((params.side, int(params.distance * SCALE)))
+            elif rule.type == 'ALIGN':
+                self.aligned[params.target1].append((params.target2, params.axis))
+                self.aligned[params.target2].append((params.target1, params.axis))
+            elif rule.type == 'PLACE_AFTER':
+                self.after[params.target] = params
+                self.followers[params.anchor].append(params.target)
+
+        self.boxes = np.array(obstacles, dtype=np.int64).reshape(-1, 4)
+        points = [(self.min_x, self.min_y)]
+        for x1, y1, x2, y2 in obstacles:
+            points.extend([(x2, y1), (x1, y2), (x2, self.min_y), (self.min_x, y2)])
+        self.points = np.array(points, dtype=np.int64)
+        self.placed: Dict[str, Tuple[int, int]] = {}
+        self.relaxed: List[str] = []
+
+    def orient(self, eq_id: str, variant):
+        self.sizes[eq_id] = (variant.w, variant.d, variant.x_offset, variant.y_offset)
+        self.footprints[eq_id] = (variant.footprint_w, variant.footprint_d)
+        self.rotations[eq_id] = variant.rotation
+
+    def targets_for(self, eq_id: str) -> Tuple[Optional[int], Optional[int], Optional[int], Optional[int]]:
+        # Required (fixed) and preferred virtual-box corner coordinates from walls, PLACE_AFTER and ALIGN.
+        w, d, x_offset, y_offset = self.sizes[eq_id]
+        fw, fd = self.footprints[eq_id]
+        fixed_x, fixed_y = None, None
+        for side, dist in self.walls.get(eq_id, []):
+            if side == 'Xmin': fixed_x = self.min_x + dist
+            elif side == 'Xmax': fixed_x = self.max_x - dist - w
+            elif side == 'Ymin': fixed_y = self.min_y + dist
+            elif side == 'Ymax': fixed_y = self.max_y - dist - d
+        preferred_x, preferred_y = None, None
+
+        params = self.after.get(eq_id)
+        if params and params.anchor in self.placed:
+            anchor = params.anchor
+            ax, ay = self.placed[anchor]
+            _, _, anchor_x_offset, anchor_y_offset = self.sizes[anchor]
+            apx, apy = ax + anchor_x_offset, ay + anchor_y_offset
+            afw, afd = self.footprints[anchor]
+            distance = int(params.distance * SCALE)
+            centered = params.alignment == 'center'
+            if params.direction == 'Y':
+                fixed_y = apy + afd + distance - y_offset
+                if centered: preferred_x = apx + afw // 2 - fw // 2 - x_offset
+            else:
+                fixed_x = apx + afw + distance - x_offset
+                if centered: preferred_y = apy + afd // 2 - fd // 2 - y_offset
+
+        for other, axis in self.aligned.get(eq_id, []):
+            if other in self.placed:
+                ox, oy = self.placed[other]
+                _, _, other_x_offset, other_y_offset = self.sizes[other]
+                ofw, ofd = self.footprints[other]
+                if axis == 'X': preferred_x = ox + other_x_offset + ofw // 2 - fw // 2 - x_offset
+                else: preferred_y = oy + other_y_offset + ofd // 2 - fd // 2 - y_offset
+        return fixed_x, fixed_y, preferred_x, preferred_y
+
+    def candidates(self, fixed_x, fixed_y, preferred_x, preferred_y) -> np.ndarray:
+        xs, ys = self.points[:, 0], self.points[:, 1]
+        if fixed_x is not None and fixed_y is not None:
+            return np.array([[fixed_x, fixed_y]], dtype=np.int64)
+        if fixed_y is not None:
+            xs = np.unique(np.concatenate([xs, [preferred_x] if preferred_x is not None else []]).astype(np.int64))
+            return np.stack([xs, np.full(len(xs), fixed_y)], axis=1)
+        if fixed_x is not None:
+            ys = np.unique(np.concatenate([ys, [preferred_y] if preferred_y is not None else []]).astype(np.int64))
+            return np.stack([np.full(len(ys), fixed_x), ys], axis=1)
+        candidates = self.points
+        if preferred_x is not None:
+            candidates = np.concatenate([candidates, np.stack([np.full(len(ys), preferred_x), ys], axis=1)])
+        if preferred_y is not None:
+            candidates = np.concatenate([candidates, np.stack([xs, np.full(len(xs), preferred_y)], axis=1)])
+        return unique_points(candidates)
+
+    def find_position(self, eq_id: str, candidates: np.ndarray, bounds: Tuple[int, int, int, int],
+                      preferred: Tuple[Optional[int], Optional[int]]) -> Optional[Tuple[int, int]]:
+        w, d, _, _ = self.sizes[eq_id]
+        x1, y1, x2, y2 = bounds
+        cx, cy = candidates[:, 0], candidates[:, 1]
+        candidates = candidates[(cx >= x1) & (cy >= y1) & (cx + w <= x2) & (cy + d <= y2)]
+        if not len(candidates):
+            return None
+
+        # Bottom-left order, or distance to the preferred position when there is one.
+        preferred_x, preferred_y = preferred
+        if preferred_x is None and preferred_y is None:
+            order = np.lexsort((candidates[:, 0], candidates[:, 1]))
+        else:
+            cost = np.zeros(len(candidates), dtype=np.int64)
+            if preferred_x is not None: cost += np.abs(candidates[:, 0] - preferred_x)
+            if preferred_y is not None: cost += np.abs(candidates[:, 1] - preferred_y)
+            order = np.lexsort((candidates[:, 0], candidates[:, 1], cost))
+        candidates = candidates[order]
+
+        for start in range(0, len(candidates), CHUNK_SIZE):
+            chunk = candidates[start:start + CHUNK_SIZE]
+            # Only boxes near the chunk can block it; filtering them first keeps the pairwise test small.
+            boxes = self.boxes
+            near = ((boxes[:, 0] < chunk[:, 0].max() + w) & (boxes[:, 2] > chunk[:, 0].min()) &
+                    (boxes[:, 1] < chunk[:, 1].max() + d) & (boxes[:, 3] > chunk[:, 1].min()))
+            boxes = boxes[near]
+            overlaps = ((chunk[:, None, 0] < boxes[None, :, 2]) & (chunk[:, None, 0] + w > boxes[None, :, 0]) &
+                        (chunk[:, None, 1] < boxes[None, :, 3]) & (chunk[:, None, 1] + d > boxes[None, :, 1]))
+            free = ~overlaps.any(axis=1)
+            if free.any():
+                vx, vy = chunk[np.argmax(free)]
+                return int(vx), int(vy)
+        return None
+
+    def locate(self, eq_id: str) -> Optional[Tuple[Tuple, Tuple[int, int]]]:
+        # Position of the item in its current orientation, with a sort key for comparing orientations:
+        # positions that keep the rules first, then closeness to the preferred position, then the
+        # lowest top edge.
+        fixed_x, fixed_y, preferred_x, preferred_y = self.targets_for(eq_id)
+        room = (self.min_x, self.min_y, self.max_x, self.max_y)
+        zone = self.zones.get(eq_id)
+        bounds = (max(room[0], zone[0]), max(room[1], zone[1]), min(room[2], zone[2]), min(room[3], zone[3])) if zone else room
+
+        relaxed = False
+        position = self.find_position(eq_id, self.candidates(fixed_x, fixed_y, preferred_x, preferred_y),
+                                      bounds, (preferred_x, preferred_y))
+        if position is None:
+            # Degrade rather than give up: the item goes anywhere free and the validator reports the broken rule.
+            position = self.find_position(eq_id, self.candidates(None, None, None, None), room, (None, None))
+            if position is None:
+                return None
+            relaxed = True
+
+        vx, vy = position
+        w, d, _, _ = self.sizes[eq_id]
+        cost = (abs(vx - preferred_x) if preferred_x is not None else 0) + (abs(vy - preferred_y) if preferred_y is not None else 0)
+        return (relaxed, cost, vy + d, vx), position
+
+    def place(self, eq_id: str) -> bool:
+        zone = self.zones.get(eq_id)
+        if zone:
+            self.points = np.concatenate([self.points, [[max(self.min_x, zone[0]), max(self.min_y, zone[1])]]])
+
+        best = None
+        for variant in self.variants[eq_id]:
+            self.orient(eq_id, variant)
+            found = self.locate(eq_id)
+            if found is not None and (best is None or found[0] < best[0]):
+                best = found + (variant,)
+        if best is None:
+            return False
+        key, (vx, vy), variant = best
+        self.orient(eq_id, variant)
+        if key[0]:
+            self.relaxed.append(eq_id)
+
+        w, d, _, _ = self.sizes[eq_id]
+        self.placed[eq_id] = (vx, vy)
+        self.boxes = np.concatenate([self.boxes, [[vx, vy, vx + w, vy + d]]])
+        # Corner points covered by the new box can never be used again.
+        points = self.points
+        inside = (points[:, 0] >= vx) & (points[:, 0] < vx + w) & (points[:, 1] >= vy) & (points[:, 1] < vy + d)
+        new_points = [(vx + w, vy), (vx, vy + d), (vx + w, self.min_y), (self.min_x, vy + d)]
+        self.points = unique_points(np.concatenate([points[~inside], new_points]))
+        return True
+
+    def place_with_followers(self, eq_id: str) -> bool:
+        stack = [eq_id]
+        while stack:
+            current = stack.pop()
+            if current in self.placed:
+                continue
+            if not self.place(current):
+                return False
+            stack.extend(reversed(self.followers.get(current, [])))
+        return True
+
+    def run(self) -> Optional[Dict[str, Dict[str, float]]]:
+        # Most constrained items first, then the rest in project order. PLACE_AFTER targets are
+        # placed together with their anchor; targets in cycles are placed at the end.
+        ids = [item.id for item in self.project.equipment]
+        roots = [eq_id for eq_id in ids if eq_id not in self.after]
+        roots.sort(key=lambda eq_id: 0 if eq_id in self.walls or eq_id in self.zones else 1)
+        for eq_id in roots + ids:
+            if not self.place_with_followers(eq_id):
+                return None
+
+        placements = {}
+        for eq_id in ids:
+            vx, vy = self.placed[eq_id]
+            _, _, x_offset, y_offset = self.sizes[eq_id]
+            placements[eq_id] = {'x': (vx + x_offset) / SCALE, 'y': (vy + y_offset) / SCALE, 'rotation_deg': self.rotations[eq_id]}
+        return placements
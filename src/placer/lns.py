@@ -0,0 +1,227 @@
+import logging
+import math
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from ortools.sat.python import cp_model
+
+from src.core.geometry import oriented_footprint
+from src.core.models import PlacementResult, Project, SolutionUpdate, SolveStats, SolverOptions
+from src.core.tracing import count, span
+from src.placer.service import (
+    PlacementModel, SolutionHandler, build_placement_model, calculate_placements, configure_solver, hint_or_fix,
+)
+from src.placer.units import SCALE
+
+logger = logging.getLogger(__name__)
+
+# Share of the time limit given to the first layout; the neighbourhood rounds get the rest.
+LNS_START_SHARE = 0.2
+NEIGHBOURHOODS = ('spatial', 'related')
+# Neighbourhood size factor after every / none of the neighbourhoods of a round is solved to optimality.
+GROW, SHRINK = 1.25, 0.8
+
+# Built once per worker process and cloned for every neighbourhood.
+_worker: Dict = {}
+
+def init_worker(project: Project):
+    # The model is built once per process; its per-rule log lines were already shown for the first layout.
+    logging.getLogger('src.placer.service').setLevel(logging.WARNING)
+    _worker['project'] = project
+    _worker['model'] = build_placement_model(project)
+    _worker['boxes'] = {box['id']: box for box in _worker['model'].virtual_boxes}
+
+def warm_up() -> int:
+    return os.getpid()
+
+def solve_neighbourhood(free_ids: List[str], placements: Dict[str, Dict[str, float]], time_limit_sec: float,
+                        num_workers: int, seed: int) -> Tuple[str, Optional[float], Optional[Dict[str, Dict[str, float]]]]:
+    # Runs in a worker process: every item outside the neighbourhood is fixed where the current
+    # layout has it, the neighbourhood is hinted with its current positions and re-optimised.
+    placement_model: PlacementModel = _worker['model']
+    free = set(free_ids)
+    model = placement_model.model.Clone()
+    for eq_id, box in _worker['boxes'].items():
+        hint_or_fix(model, box, placements[eq_id], eq_id not in free)
+
+    options = (_worker['project'].solver_options or SolverOptions()).copy(update={
+        'time_limit_sec': time_limit_sec, 'num_workers': num_workers, 'random_seed': seed, 'log_search_progress': False,
+    })
+    solver = configure_solver(options)
+    status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return solver.StatusName(status), None, None
+    positions = placement_model.positions
+    moved = {
+        eq_id: {
+            'x': solver.Value(positions[eq_id]['x']) / SCALE,
+            'y': solver.Value(positions[eq_id]['y']) / SCALE,
+            'rotation_deg': solver.Value(positions[eq_id]['rotation']),
+        }
+        for eq_id in free_ids
+    }
+    return solver.StatusName(status), solver.ObjectiveValue(), moved
+
+class NeighbourhoodPicker:
+    """
+    Chooses the items re-optimised together in one LNS step, around a random seed item: the
+    items closest to it in the current layout ('spatial'), or the items reached from it over
+    rules, flows and production-line groups, topped up with the closest ones ('related').
+    Frozen items are never picked.
+    """
+
+    def __init__(self, project: Project, frozen_ids: Optional[Set[str]], seed: int):
+        self.items = {item.id: item for item in project.equipment}
+        self.movable = [item.id for item in project.equipment if not frozen_ids or item.id not in frozen_ids]
+        self.rng = random.Random(seed)
+        self.neighbours: Dict[str, Set[str]] = defaultdict(set)
+        links = [rule.targets for rule in project.rules] + [[flow.source, flow.target] for flow in project.flows]
+        groups = defaultdict(list)
+        for item in project.equipment:
+            if item.group:
+                groups[item.group].append(item.id)
+        for members in links + list(groups.values()):
+            for eq_id in members:
+                self.neighbours[eq_id].update(other for other in members if other != eq_id)
+
+    def centres(self, placements: Dict[str, Dict[str, float]]) -> Dict[str, Tuple[float, float]]:
+        centres = {}
+        for eq_id in self.movable:
+            placement = placements[eq_id]
+            width, depth = oriented_footprint(self.items[eq_id], placement.get('rotation_deg', 0))
+            centres[eq_id] = (placement['x'] + width / 2, placement['y'] + depth / 2)
+        return centres
+
+    def pick(self, kind: str, size: int, placements: Dict[str, Dict[str, float]]) -> List[str]:
+        seed = self.rng.choice(self.movable)
+        centres = self.centres(placements)
+        cx, cy = centres[seed]
+        by_distance = sorted(self.movable, key=lambda eq_id: abs(centres[eq_id][0] - cx) + abs(centres[eq_id][1] - cy))
+        if kind == 'spatial':
+            return by_distance[:size]
+        picked = {seed: None}
+        queue = [seed]
+        while queue and len(picked) < size:
+            for other in sorted(self.neighbours[queue.pop(0)]):
+                if other in centres and other not in picked and len(picked) < size:
+                    picked[other] = None
+                    queue.append(other)
+        for eq_id in by_distance:
+            if len(picked) >= size:
+                break
+            picked.setdefault(eq_id, None)
+        return list(picked)
+
+def calculate_placements_lns(project: Project, log_callback: Optional[Callable[[str], None]] = None,
+                             hint_placements: Optional[Dict[str, Dict[str, float]]] = None,
+                             frozen_ids: Optional[Set[str]] = None, on_solution: Optional[SolutionHandler] = None,
+                             stop_event: Optional[threading.Event] = None) -> PlacementResult:
+    """
+    Large neighbourhood search: a first layout from the usual solve with a share of the time
+    limit, then rounds in which worker processes each re-optimise one small neighbourhood of
+    the current layout with every other item fixed. The best improving neighbourhood of a round
+    is kept. Every improvement is reported to `on_solution` like a solver solution, and the
+    objective over time ends up in the stats.
+    """
+    options = project.solver_options or SolverOptions()
+    time_limit = options.time_limit_sec if options.time_limit_sec else 30.0
+    start = time.perf_counter()
+    stopped = threading.Event()
+
+    def report(update: SolutionUpdate) -> Optional[bool]:
+        if on_solution is not None and on_solution(update):
+            stopped.set()
+            return True
+        return None
+
+    logger.info("  - LNS mode: solving a first layout, then re-optimising neighbourhoods of it.")
+    first_options = options.copy(update={'lns': False, 'time_limit_sec': max(1.0, time_limit * LNS_START_SHARE)})
+    first = calculate_placements(project.copy(update={'solver_options': first_options}), log_callback, hint_placements,
+                                 frozen_ids, report, stop_event)
+    stats = first.stats
+    if first.placements is None or first.is_fallback or stats.status == 'OPTIMAL' or stopped.is_set() \
+            or (stop_event is not None and stop_event.is_set()):
+        return first
+
+    current = dict(first.placements)
+    best = stats.objective_value
+    bound = stats.best_objective_bound
+    # The solver times its own search only; model building before it is added back.
+    offset = max(0.0, time.perf_counter() - start - stats.wall_time_sec)
+    history = [(seconds + offset, objective) for seconds, objective in stats.objective_history] \
+        or [(time.perf_counter() - start, best)]
+    solution_index = stats.num_solutions
+    picker = NeighbourhoodPicker(project, frozen_ids, options.random_seed or 0)
+    size = min(options.lns_neighborhood_size, len(picker.movable))
+    workers = options.lns_workers or os.cpu_count() or 1
+    threads_per_solve = max(1, (os.cpu_count() or 1) // workers)
+    rounds = improvements = 0
+
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(project,))
+    with span("lns", workers=workers):
+        # Each worker builds the model when it starts. Wait for that here, within the time limit,
+        # so the first round is not charged for it.
+        wait([executor.submit(warm_up) for _ in range(workers)], timeout=max(0.0, time_limit - (time.perf_counter() - start)))
+        while not stopped.is_set() and not (stop_event is not None and stop_event.is_set()):
+            remaining = time_limit - (time.perf_counter() - start)
+            if remaining < 0.5 or size < 2:
+                break
+            sub_limit = min(options.lns_subsolve_sec, remaining)
+            neighbourhoods = [picker.pick(NEIGHBOURHOODS[(rounds + k) % len(NEIGHBOURHOODS)], size, current)
+                              for k in range(workers)]
+            futures = [executor.submit(solve_neighbourhood, free_ids, current, sub_limit, threads_per_solve, rounds * workers + k)
+                       for k, free_ids in enumerate(neighbourhoods)]
+            # Neighbourhoods still running at the time limit are given up.
+            wait(futures, timeout=max(0.0, time_limit - (time.perf_counter() - start)))
+            results = [future.result() for future in futures if future.done()]
+            rounds += 1
+            if not results:
+                break
+            used = size
+            statuses = [status for status, _, _ in results]
+            logger.debug(f"  - LNS round {rounds}: {used} items per neighbourhood, {', '.join(statuses)}")
+            if all(status == 'OPTIMAL' for status in statuses):
+                size = min(len(picker.movable), math.ceil(size * GROW))
+            elif 'OPTIMAL' not in statuses:
+                size = max(2, int(size * SHRINK))
+
+            improving = [(objective, moved) for _, objective, moved in results if objective is not None and objective < best - 0.5]
+            if not improving:
+                continue
+            best, moved = min(improving, key=lambda result: result[0])
+            current.update(moved)
+            improvements += 1
+            solution_index += 1
+            elapsed = time.perf_counter() - start
+            history.append((elapsed, best))
+            logger.info(f"  - LNS round {rounds}: objective {best:.0f} ({used} items per neighbourhood), {elapsed:.2f}s")
+            report(SolutionUpdate(
+                solution_index=solution_index,
+                objective_value=best,
+                best_objective_bound=bound,
+                relative_gap=abs(best - bound) / max(1.0, abs(best)),
+                wall_time_sec=elapsed,
+                placements=dict(current),
+            ))
+
+    executor.shutdown(wait=False, cancel_futures=True)
+    count("lns.rounds", rounds)
+    count("lns.improvements", improvements)
+    logger.info(f"  > LNS: {improvements} improvements in {rounds} rounds, objective {stats.objective_value:.0f} -> {best:.0f}.")
+    return PlacementResult(placements=current, stats=SolveStats(
+        status=stats.status,
+        wall_time_sec=time.perf_counter() - start,
+        num_conflicts=stats.num_conflicts,
+        num_branches=stats.num_branches,
+        objective_value=best,
+        best_objective_bound=bound,
+        relative_gap=abs(best - bound) / max(1.0, abs(best)),
+        num_workers=workers,
+        num_solutions=solution_index,
+        objective_history=history,
+    ), stopped=stopped.is_set() or (stop_event is not None and stop_event.is_set()))
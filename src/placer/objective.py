@@ -0,0 +1,121 @@
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+from src.core.geometry import oriented_footprint, oriented_maintenance
+from src.core.models import Project, SolverOptions
+
+CONNECTED_WEIGHT = 1
+UNCONNECTED_WEIGHT = 10
+# Rows of the KNN distance matrix computed at once.
+KNN_CHUNK = 512
+
+def pair_key(id1: str, id2: str) -> Tuple[str, str]:
+    return tuple(sorted((id1, id2)))
+
+def get_connected_pairs(project: Project) -> Set[Tuple[str, str]]:
+    return {
+        pair_key(rule.params.anchor, rule.params.target)
+        for rule in project.rules if rule.type == 'PLACE_AFTER'
+    }
+
+def shelf_layout(boxes: List[Dict], min_x: int, max_x: int, min_y: int) -> Dict[str, Tuple[int, int]]:
+    # Cheap row-by-row packing in project order. It ignores rules and may run past the
+    # back wall; it only has to put items that are listed together close to each other.
+    # Rotatable items are packed unturned.
+    centers = {}
+    x, y, row_depth = min_x, min_y, 0
+    for box in boxes:
+        w, d = box['variants'][0].w, box['variants'][0].d
+        if x + w > max_x and x > min_x:
+            x, y, row_depth = min_x, y + row_depth, 0
+        centers[box['id']] = (x + w // 2, y + d // 2)
+        x += w
+        row_depth = max(row_depth, d)
+    return centers
+
+def nearest_neighbours(points: np.ndarray, k: int):
+    # Yields (row, indices of its k nearest other points by Manhattan distance). Ties at the
+    # k-th distance go to the lower indices, as with heapq.nsmallest over the points in order.
+    if k <= 0:
+        return
+    n = len(points)
+    for start in range(0, n, KNN_CHUNK):
+        rows = np.arange(start, min(start + KNN_CHUNK, n))
+        dist = np.abs(points[rows, None, 0] - points[None, :, 0]) + np.abs(points[rows, None, 1] - points[None, :, 1])
+        dist[np.arange(len(rows)), rows] = np.iinfo(np.int64).max
+        kth = np.partition(dist, k - 1, axis=1)[:, k - 1]
+        for row, i in enumerate(rows):
+            closer = np.flatnonzero(dist[row] < kth[row])
+            tied = np.flatnonzero(dist[row] == kth[row])[:k - len(closer)]
+            yield i, np.concatenate((closer, tied)).tolist()
+
+def select_objective_pairs(project: Project, boxes: List[Dict], connected_pairs: Set[Tuple[str, str]],
+                           min_x: int, max_x: int, min_y: int) -> List[Tuple[str, str, int]]:
+    options = project.solver_options or SolverOptions()
+    mode = options.objective_mode
+    ids = [box['id'] for box in boxes]
+    order = {eq_id: i for i, eq_id in enumerate(ids)}
+
+    if mode == 'ALL_PAIRS':
+        pairs = []
+        for i in range(len(ids)):
+            for j in range(i + 1, len(ids)):
+                weight = CONNECTED_WEIGHT if pair_key(ids[i], ids[j]) in connected_pairs else UNCONNECTED_WEIGHT
+                pairs.append((ids[i], ids[j], weight))
+        return pairs
+
+    weights: Dict[Tuple[str, str], int] = {}
+
+    if mode == 'KNN':
+        centers = shelf_layout(boxes, min_x, max_x, min_y)
+        k = min(options.knn_neighbors, len(ids) - 1)
+        for i, neighbours in nearest_neighbours(np.array([centers[eq_id] for eq_id in ids], dtype=np.int64), k):
+            for j in neighbours:
+                # Connected neighbours keep their connected weight, as in ALL_PAIRS.
+                key = pair_key(ids[i], ids[j])
+                weights[key] = CONNECTED_WEIGHT if key in connected_pairs else UNCONNECTED_WEIGHT
+
+    elif mode == 'FLOW':
+        for flow in project.flows:
+            for eq_id in (flow.source, flow.target):
+                if eq_id not in order:
+                    raise ValueError(f"Flow error: Could not find an object with ID '{eq_id}'")
+            if flow.source == flow.target:
+                continue
+            key = pair_key(flow.source, flow.target)
+            weights[key] = weights.get(key, 0) + max(1, round(flow.weight))
+
+    for key in connected_pairs:
+        weights.setdefault(key, CONNECTED_WEIGHT)
+
+    pairs = [
+        (id1, id2, weight) if order[id1] < order[id2] else (id2, id1, weight)
+        for (id1, id2), weight in weights.items()
+    ]
+    return sorted(pairs, key=lambda pair: (order[pair[0]], order[pair[1]]))
+
+def evaluate_layout_cost(project: Project, placements: Dict[str, Dict[str, float]]) -> float:
+    # The ALL_PAIRS objective evaluated on a finished layout (in metres, without alignment
+    # penalties), so that layouts produced by different objective modes can be compared.
+    connected_pairs = get_connected_pairs(project)
+    centers = []
+    for item in project.equipment:
+        placement = placements.get(item.id)
+        if not placement:
+            continue
+        rotation = placement.get('rotation_deg', 0)
+        left, back, right, front = oriented_maintenance(item, rotation)
+        width, depth = oriented_footprint(item, rotation)
+        cx = placement['x'] - left + (left + width + right) / 2.0
+        cy = placement['y'] - back + (back + depth + front) / 2.0
+        centers.append((item.id, cx, cy))
+
+    total = 0.0
+    for i in range(len(centers)):
+        id1, x1, y1 = centers[i]
+        for j in range(i + 1, len(centers)):
+            id2, x2, y2 = centers[j]
+            weight = CONNECTED_WEIGHT if pair_key(id1, id2) in connected_pairs else UNCONNECTED_WEIGHT
+            total += weight * (abs(x1 - x2) + abs(y1 - y2))
+    return total
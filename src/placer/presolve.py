@@ -0,0 +1,222 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from src.core.models import Project
+from src.core.tracing import traced
+from src.placer.units import SCALE, box_variants, room_bounds
+
+AXES = ('X', 'Y')
+AVOID_SIDES = ('left', 'right', 'below', 'above')
+
+class InfeasibleRulesError(ValueError):
+    pass
+
+@dataclass
+class PresolveResult:
+    # Bounds of each virtual box corner as [lo_x, hi_x, lo_y, hi_y] in solver units.
+    bounds: Dict[str, List[int]]
+    # Sides of an AVOID_ZONE area an item can still be on, per (rule index, item ID). Items that
+    # can never reach the area have no entry and need no constraint at all.
+    avoid_sides: Dict[Tuple[int, str], Tuple[str, ...]] = field(default_factory=dict)
+    narrowed: int = 0
+    dropped_reifications: int = 0
+
+def describe(value: int) -> str:
+    return f"{value / SCALE:.2f}"
+
+class Presolver:
+    """
+    Propagates the hard rules into bounds on every item's position before the CP model is
+    built: zones and walls narrow an item directly, PLACE_AFTER and ALIGN shift bounds between
+    the two items they link. Rule sets that cannot be satisfied are reported with the rules
+    that led there instead of an INFEASIBLE status after the solve.
+
+    Bounds of rotatable items hold for either orientation: they are tightened with the smaller
+    extent on each axis only, and such items are left out of the PLACE_AFTER/ALIGN links.
+    """
+
+    def __init__(self, project: Project):
+        self.project = project
+        self.names = {item.id: item.name for item in project.equipment}
+        self.min_x, self.max_x, self.min_y, self.max_y = room_bounds(project)
+        self.variants = {item.id: box_variants(item, project.solver_options) for item in project.equipment}
+        self.bounds = {eq_id: [self.min_x, self.max_x - self.extent(eq_id, 0), self.min_y, self.max_y - self.extent(eq_id, 1)]
+                       for eq_id in self.variants}
+        self.reasons: Dict[str, Tuple[List[str], List[str]]] = {eq_id: ([], []) for eq_id in self.variants}
+        self.narrowed = set()
+
+    def extent(self, eq_id: str, axis: int, largest: bool = False) -> int:
+        # Virtual box size along an axis, over the orientations the item may take.
+        sizes = [variant.w if axis == 0 else variant.d for variant in self.variants[eq_id]]
+        return max(sizes) if largest else min(sizes)
+
+    def tighten(self, eq_id: str, axis: int, lo: int, hi: int, reason: str) -> bool:
+        bounds = self.bounds[eq_id]
+        changed = False
+        if lo > bounds[2 * axis]:
+            bounds[2 * axis] = lo
+            changed = True
+        if hi < bounds[2 * axis + 1]:
+            bounds[2 * axis + 1] = hi
+            changed = True
+        if changed:
+            self.narrowed.add((eq_id, axis))
+            if reason not in self.reasons[eq_id][axis]:
+                self.reasons[eq_id][axis].append(reason)
+        if bounds[2 * axis] > bounds[2 * axis + 1]:
+            self.fail(eq_id, axis)
+        return changed
+
+    def fail(self, eq_id: str, axis: int):
+        size = self.extent(eq_id, axis)
+        reasons = self.reasons[eq_id][axis] or ["the room walls"]
+        raise InfeasibleRulesError(
+            f"'{self.names[eq_id]}' ({describe(size)} m along {AXES[axis]} with its maintenance zone) has no valid "
+            f"{AXES[axis]} position. Conflicting constraints: {'; '.join(reasons)}."
+        )
+
+    def check_room(self):
+        room_sizes = (self.max_x - self.min_x, self.max_y - self.min_y)
+        for eq_id, variants in self.variants.items():
+            if any(variant.w <= room_sizes[0] and variant.d <= room_sizes[1] for variant in variants):
+                continue
+            # Reported for the unturned orientation.
+            axis = 0 if variants[0].w > room_sizes[0] else 1
+            size = variants[0].w if axis == 0 else variants[0].d
+            raise InfeasibleRulesError(
+                f"'{self.names[eq_id]}' is {describe(size)} m along {AXES[axis]} with its maintenance zone, "
+                f"but the room is only {describe(room_sizes[axis])} m wide inside the walls"
+                f"{' and the item does not fit turned either' if len(variants) > 1 else ''}."
+            )
+        total = sum(variants[0].w * variants[0].d for variants in self.variants.values())
+        floor = (self.max_x - self.min_x) * (self.max_y - self.min_y)
+        if total > floor:
+            raise InfeasibleRulesError(
+                f"The equipment needs {total / SCALE ** 2:.1f} m² including maintenance zones, "
+                f"but the room has only {floor / SCALE ** 2:.1f} m² inside the walls."
+            )
+
+    def run(self) -> PresolveResult:
+        self.check_room()
+
+        # Links v_b = v_a + offset on one axis, from PLACE_AFTER and ALIGN.
+        links: List[Tuple[int, str, str, int, str]] = []
+        avoid_rules = []
+        for i, rule in enumerate(self.project.rules):
+            params = rule.params
+            targets = rule.targets
+            if any(target not in self.variants for target in targets):
+                # Unknown IDs are reported when the model is built.
+                continue
+
+            if rule.type == 'PLACE_IN_ZONE':
+                eq_id = params.target
+                x1, y1, x2, y2 = (int(value * SCALE) for value in params.area)
+                reason = f"PLACE_IN_ZONE #{i} area {list(params.area)}"
+                self.tighten(eq_id, 0, x1, x2 - self.extent(eq_id, 0), reason)
+                self.tighten(eq_id, 1, y1, y2 - self.extent(eq_id, 1), reason)
+
+            elif rule.type == 'ATTACH_TO_WALL':
+                eq_id = params.target
+                dist = int(params.distance * SCALE)
+                side = params.side
+                reason = f"ATTACH_TO_WALL #{i} to wall {side}"
+                if side == 'Xmin': self.tighten(eq_id, 0, self.min_x + dist, self.min_x + dist, reason)
+                elif side == 'Xmax': self.tighten(eq_id, 0, self.max_x - dist - self.extent(eq_id, 0, largest=True),
+                                                  self.max_x - dist - self.extent(eq_id, 0), reason)
+                elif side == 'Ymin': self.tighten(eq_id, 1, self.min_y + dist, self.min_y + dist, reason)
+                elif side == 'Ymax': self.tighten(eq_id, 1, self.max_y - dist - self.extent(eq_id, 1, largest=True),
+                                                  self.max_y - dist - self.extent(eq_id, 1), reason)
+
+            elif rule.type in ('PLACE_AFTER', 'ALIGN') and any(len(self.variants[target]) > 1 for target in targets):
+                # The offset between a rotatable item and its partner depends on the orientation.
+                continue
+
+            elif rule.type == 'PLACE_AFTER':
+                target_id, anchor_id = params.target, params.anchor
+                anchor, target = self.variants[anchor_id][0], self.variants[target_id][0]
+                distance = int(params.distance * SCALE)
+                reason = f"PLACE_AFTER #{i} after '{self.names[anchor_id]}'"
+                if params.direction == 'Y':
+                    links.append((1, anchor_id, target_id, anchor.y_offset + anchor.footprint_d + distance - target.y_offset, reason))
+                else:
+                    links.append((0, anchor_id, target_id, anchor.x_offset + anchor.footprint_w + distance - target.x_offset, reason))
+
+            elif rule.type == 'ALIGN':
+                t1_id, t2_id = params.target1, params.target2
+                first, second = self.variants[t1_id][0], self.variants[t2_id][0]
+                reason = f"ALIGN #{i} of '{self.names[t1_id]}' and '{self.names[t2_id]}'"
+                if params.axis == 'X':
+                    links.append((0, t1_id, t2_id, first.x_offset + first.footprint_w // 2 - second.x_offset - second.footprint_w // 2, reason))
+                else:
+                    links.append((1, t1_id, t2_id, first.y_offset + first.footprint_d // 2 - second.y_offset - second.footprint_d // 2, reason))
+
+            elif rule.type == 'AVOID_ZONE':
+                avoid_rules.append((i, params))
+
+        # A consistent set of links settles within a few rounds; an inconsistent cycle keeps
+        # shrinking the bounds and is left to the solver once the round limit is reached.
+        for _ in range(2 * len(links) + 2):
+            changed = False
+            for axis, a, b, offset, reason in links:
+                lo_a, hi_a = self.bounds[a][2 * axis], self.bounds[a][2 * axis + 1]
+                changed |= self.tighten(b, axis, lo_a + offset, hi_a + offset, reason)
+                lo_b, hi_b = self.bounds[b][2 * axis], self.bounds[b][2 * axis + 1]
+                changed |= self.tighten(a, axis, lo_b - offset, hi_b - offset, reason)
+            if not changed:
+                break
+
+        self.check_pinned()
+        avoid_sides, dropped = self.analyse_avoid_zones(avoid_rules)
+        return PresolveResult(bounds=self.bounds, avoid_sides=avoid_sides, narrowed=len(self.narrowed), dropped_reifications=dropped)
+
+    def check_pinned(self):
+        # Items fixed on both axes cannot move out of each other's way. A pinned rotatable item
+        # can still turn, so it is not checked.
+        pinned = sorted((bounds[0], bounds[2], eq_id) for eq_id, bounds in self.bounds.items()
+                        if bounds[0] == bounds[1] and bounds[2] == bounds[3] and len(self.variants[eq_id]) == 1)
+        for i, (x1, y1, id1) in enumerate(pinned):
+            w1, d1 = self.variants[id1][0].w, self.variants[id1][0].d
+            for x2, y2, id2 in pinned[i + 1:]:
+                if x2 >= x1 + w1:
+                    break
+                w2, d2 = self.variants[id2][0].w, self.variants[id2][0].d
+                if y1 < y2 + d2 and y2 < y1 + d1:
+                    reasons = self.reasons[id1][0] + self.reasons[id1][1] + self.reasons[id2][0] + self.reasons[id2][1]
+                    raise InfeasibleRulesError(
+                        f"'{self.names[id1]}' and '{self.names[id2]}' are both fixed in place by their rules and would overlap "
+                        f"(maintenance zones included). Conflicting constraints: {'; '.join(dict.fromkeys(reasons))}."
+                    )
+
+    def analyse_avoid_zones(self, avoid_rules) -> Tuple[Dict[Tuple[int, str], Tuple[str, ...]], int]:
+        avoid_sides = {}
+        dropped = 0
+        for i, params in avoid_rules:
+            x1, y1, x2, y2 = (int(value * SCALE) for value in params.area)
+            for eq_id, (lo_x, hi_x, lo_y, hi_y) in self.bounds.items():
+                if (hi_x + self.extent(eq_id, 0, largest=True) <= x1 or lo_x >= x2 or
+                        hi_y + self.extent(eq_id, 1, largest=True) <= y1 or lo_y >= y2):
+                    dropped += len(AVOID_SIDES)
+                    continue
+                possible = (lo_x + self.extent(eq_id, 0) <= x1, hi_x >= x2, lo_y + self.extent(eq_id, 1) <= y1, hi_y >= y2)
+                sides = tuple(side for side, ok in zip(AVOID_SIDES, possible) if ok)
+                if not sides:
+                    reasons = list(dict.fromkeys(self.reasons[eq_id][0] + self.reasons[eq_id][1])) or ["the room walls"]
+                    raise InfeasibleRulesError(
+                        f"'{self.names[eq_id]}' cannot stay out of the avoid zone {list(params.area)} (AVOID_ZONE #{i}). "
+                        f"Constraints that keep it there: {'; '.join(reasons)}."
+                    )
+                # A single remaining side is a plain constraint without any BoolVar.
+                dropped += len(AVOID_SIDES) - (len(sides) if len(sides) > 1 else 0)
+                avoid_sides[(i, eq_id)] = sides
+        return avoid_sides, dropped
+
+@traced("presolve")
+def presolve_rules(project: Project, enabled: bool = True) -> PresolveResult:
+    if enabled:
+        return Presolver(project).run()
+    # Room bounds only and every avoid-zone side open, i.e. the model as it was built without presolve.
+    presolver = Presolver(project)
+    avoid_sides = {(i, eq_id): AVOID_SIDES for i, rule in enumerate(project.rules) if rule.type == 'AVOID_ZONE'
+                   for eq_id in presolver.variants}
+    return PresolveResult(bounds=presolver.bounds, avoid_sides=avoid_sides)
@@ -0,0 +1,87 @@
+import json
+import queue
+import threading
+from typing import IO, Iterator, Optional
+
+from src.core.models import PlacementResult, Project, SolutionUpdate
+from src.placer.service import calculate_placements
+
+class JsonLinesWriter:
+    """
+    Solution handler that appends every SolutionUpdate to a JSON-lines file. Each line is
+    flushed as soon as it is written, so a UI or `tail -f` can follow a running solve.
+    """
+
+    def __init__(self, path: str, include_placements: bool = True):
+        self.path = path
+        self.include_placements = include_placements
+        self.file: Optional[IO] = open(path, 'w', encoding='utf-8')
+
+    def __call__(self, update: SolutionUpdate) -> bool:
+        data = update.dict(exclude=None if self.include_placements else {'placements'})
+        self.file.write(json.dumps(data, ensure_ascii=False) + "\n")
+        self.file.flush()
+        return False
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class SolutionStream:
+    """
+    Runs calculate_placements in a background thread and yields each improving solution as it
+    is found:
+
+        stream = SolutionStream(project)
+        for update in stream:
+            show(update.placements)
+            if good_enough(update):
+                stream.stop()
+        result = stream.result
+
+    After the loop, `result` holds the final PlacementResult (the best solution, or the
+    fallback / no layout), exactly as calculate_placements would have returned it.
+    """
+
+    _DONE = object()
+
+    def __init__(self, project: Project, **kwargs):
+        self.project = project
+        self.kwargs = kwargs
+        self.stop_event = threading.Event()
+        self.result: Optional[PlacementResult] = None
+        self.error: Optional[BaseException] = None
+        self._updates: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        try:
+            self.result = calculate_placements(self.project, on_solution=self._updates.put, stop_event=self.stop_event, **self.kwargs)
+        except BaseException as e:
+            self.error = e
+        finally:
+            self._updates.put(self._DONE)
+
+    def __iter__(self) -> Iterator[SolutionUpdate]:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        while True:
+            update = self._updates.get()
+            if update is self._DONE:
+                break
+            yield update
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def stop(self):
+        """Ends the search; the best solution so far becomes the result."""
+        self.stop_event.set()
@@ -0,0 +1,329 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from ortools.sat.python import cp_model
+
+from src.core.geometry import oriented_footprint, roof_clearance
+from src.core.models import Architecture, EquipmentItem, PlacementResult, Project, Room, SolutionUpdate, SolveStats, SolverOptions
+from src.core.rooms import RoomPart, placement_room, room_architecture, room_elevation, split_rooms
+from src.core.tracing import count, span
+from src.placer.objective import pair_key
+from src.placer.presolve import InfeasibleRulesError
+from src.placer.service import SolutionHandler, calculate_placements, configure_solver
+from src.placer.units import SCALE, architecture_bounds, box_variants
+
+logger = logging.getLogger(__name__)
+
+# Share of a room's floor the assignment fills at first; rooms are filled up to 1.0 only if
+# the equipment does not fit otherwise, since a full room is hard or impossible to lay out.
+ROOM_FILLS = (0.7, 1.0)
+ASSIGNMENT_TIME_LIMIT_SEC = 10.0
+# A room that starts when the time limit is (nearly) used up still gets a short search, and
+# with it the greedy fallback, so that it has a layout.
+MIN_ROOM_TIME_SEC = 0.1
+
+def room_distance(room_a: Room, room_b: Room, arch: Architecture) -> int:
+    # Manhattan distance between the room centres plus the height between their storeys, in solver units.
+    centre_a = (room_a.origin_x + room_a.room_dimensions.width / 2, room_a.origin_y + room_a.room_dimensions.depth / 2)
+    centre_b = (room_b.origin_x + room_b.room_dimensions.width / 2, room_b.origin_y + room_b.room_dimensions.depth / 2)
+    climb = abs(room_elevation(room_a, arch) - room_elevation(room_b, arch))
+    return int(round((abs(centre_a[0] - centre_b[0]) + abs(centre_a[1] - centre_b[1]) + climb) * SCALE))
+
+def room_ties(project: Project) -> List[Tuple[str, str]]:
+    # Pairs of items that must share a room: rules that place one item relative to another,
+    # and items of one production-line group.
+    ids = {item.id for item in project.equipment}
+    ties = []
+    for rule in project.rules:
+        if rule.type in ('PLACE_AFTER', 'ALIGN'):
+            targets = rule.targets
+            if len(targets) == 2 and all(target in ids for target in targets):
+                ties.append((targets[0], targets[1]))
+    groups = defaultdict(list)
+    for item in project.equipment:
+        if item.group:
+            groups[item.group].append(item.id)
+    for members in groups.values():
+        ties.extend(zip(members, members[1:]))
+    return ties
+
+def headroom(item: EquipmentItem, room_arch: Architecture, options: SolverOptions) -> float:
+    # The most clearance the item can have in the room: under the ridge of a gable roof, in the
+    # narrower of its orientations, by the rule the validator checks.
+    half_width = room_arch.room_dimensions.width / 2.0
+    widths = np.array([oriented_footprint(item, variant.rotation)[0] for variant in box_variants(item, options)])
+    return float(np.max(roof_clearance(room_arch, half_width - widths / 2.0, half_width + widths / 2.0)))
+
+def candidate_rooms(project: Project, previous: Dict[str, str], frozen_ids: Set[str]) -> Dict[str, List[str]]:
+    # Rooms each item may go to: its own room if it names one (or stays frozen in its previous
+    # room), otherwise every room it fits into in some orientation, with its zones inside the
+    # room and enough clearance under the roof for its height.
+    arch = project.architecture
+    options = project.solver_options or SolverOptions()
+    room_ids = {room.id for room in arch.rooms}
+    room_archs = {room.id: room_architecture(room, arch) for room in arch.rooms}
+    interiors = {room_id: architecture_bounds(room_arch) for room_id, room_arch in room_archs.items()}
+    zones = defaultdict(list)
+    for rule in project.rules:
+        if rule.type == 'PLACE_IN_ZONE':
+            zones[rule.params.target].append([int(value * SCALE) for value in rule.params.area])
+
+    candidates = {}
+    for item in project.equipment:
+        fixed = item.room
+        if fixed is None and item.id in frozen_ids:
+            fixed = previous.get(item.id)
+        if fixed is not None and fixed not in room_ids:
+            raise InfeasibleRulesError(f"'{item.name}' is assigned to an unknown room '{fixed}'.")
+        variants = box_variants(item, options)
+        fitting = []
+        too_low = []
+        for room in arch.rooms:
+            min_x, max_x, min_y, max_y = interiors[room.id]
+            if fixed is not None and room.id != fixed:
+                continue
+            if not any(variant.w <= max_x - min_x and variant.d <= max_y - min_y for variant in variants):
+                continue
+            if any(x1 < min_x or y1 < min_y or x2 > max_x or y2 > max_y for x1, y1, x2, y2 in zones[item.id]):
+                continue
+            if headroom(item, room_archs[room.id], options) < item.height:
+                too_low.append(room.id)
+                continue
+            fitting.append(room.id)
+        if not fitting:
+            where = f"its room '{fixed}'" if fixed is not None else "any of the rooms"
+            if too_low:
+                raise InfeasibleRulesError(f"'{item.name}' ({item.height:.2f} m tall) does not fit under the roof of {where}.")
+            raise InfeasibleRulesError(f"'{item.name}' (with its maintenance zone and PLACE_IN_ZONE areas) does not fit into {where}.")
+        candidates[item.id] = fitting
+    return candidates
+
+def build_assignment_model(project: Project, candidates: Dict[str, List[str]], previous: Dict[str, str],
+                           fill: float) -> Tuple[cp_model.CpModel, Dict[Tuple[str, str], cp_model.IntVar], bool]:
+    arch = project.architecture
+    options = project.solver_options or SolverOptions()
+    model = cp_model.CpModel()
+    x = {(eq_id, room_id): model.NewBoolVar(f"in_{eq_id}_{room_id}") for eq_id, rooms in candidates.items() for room_id in rooms}
+    for eq_id, rooms in candidates.items():
+        model.AddExactlyOne(x[eq_id, room_id] for room_id in rooms)
+        if eq_id in previous:
+            for room_id in rooms:
+                model.AddHint(x[eq_id, room_id], previous[eq_id] == room_id)
+
+    for a, b in room_ties(project):
+        for room in arch.rooms:
+            in_a, in_b = x.get((a, room.id)), x.get((b, room.id))
+            if in_a is not None and in_b is not None:
+                model.Add(in_a == in_b)
+            elif in_a is not None or in_b is not None:
+                model.Add((in_a if in_a is not None else in_b) == 0)
+
+    # Virtual boxes cover the same area in either orientation.
+    areas = {item.id: box_variants(item, options)[0] for item in project.equipment}
+    for room in arch.rooms:
+        min_x, max_x, min_y, max_y = architecture_bounds(room_architecture(room, arch))
+        members = [(x[eq_id, room.id], areas[eq_id].w * areas[eq_id].d) for eq_id in candidates if (eq_id, room.id) in x]
+        if members:
+            model.Add(sum(area * literal for literal, area in members) <= int(fill * (max_x - min_x) * (max_y - min_y)))
+
+    weights: Dict[Tuple[str, str], int] = {}
+    for flow in project.flows:
+        if flow.source != flow.target and flow.source in candidates and flow.target in candidates:
+            key = pair_key(flow.source, flow.target)
+            weights[key] = weights.get(key, 0) + max(1, round(flow.weight))
+    rooms_by_id = {room.id: room for room in arch.rooms}
+    cost_terms = []
+    for (a, b), weight in weights.items():
+        for room_a in candidates[a]:
+            for room_b in candidates[b]:
+                distance = room_distance(rooms_by_id[room_a], rooms_by_id[room_b], arch)
+                if room_a == room_b or distance == 0:
+                    continue
+                # Set whenever a sits in room_a and b in room_b.
+                apart = model.NewBoolVar(f"apart_{a}_{b}_{room_a}_{room_b}")
+                model.AddBoolOr([x[a, room_a].Not(), x[b, room_b].Not(), apart])
+                cost_terms.append(weight * distance * apart)
+    if cost_terms:
+        model.Minimize(sum(cost_terms))
+    return model, x, bool(cost_terms)
+
+def assign_rooms(project: Project, previous: Optional[Dict[str, str]] = None,
+                 frozen_ids: Optional[Set[str]] = None) -> Dict[str, str]:
+    """
+    Chooses a room for every item of a project with several rooms. Items that name a room stay
+    there; the rest are shared out so that the weighted flows between rooms (by the distance of
+    the room centres and the height between storeys) are as short as possible, while no room is
+    filled beyond what it can hold. Items tied by PLACE_AFTER, ALIGN or a common group share a room.
+    """
+    arch = project.architecture
+    options = project.solver_options or SolverOptions()
+    previous = previous or {}
+    with span("room_assignment", rooms=len(arch.rooms)):
+        candidates = candidate_rooms(project, previous, frozen_ids or set())
+        time_limit = min(ASSIGNMENT_TIME_LIMIT_SEC, options.time_limit_sec or ASSIGNMENT_TIME_LIMIT_SEC)
+        solver = configure_solver(options.copy(update={'time_limit_sec': time_limit, 'log_search_progress': False}))
+        for fill in ROOM_FILLS:
+            model, x, has_cost = build_assignment_model(project, candidates, previous, fill)
+            status = solver.Solve(model)
+            if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                break
+        else:
+            raise InfeasibleRulesError(
+                "The equipment cannot be shared out among the rooms: with the rooms fixed on items, groups and "
+                "PLACE_AFTER/ALIGN rules kept together, some room would need more floor area than it has."
+            )
+
+        assignment = {eq_id: room_id for (eq_id, room_id), literal in x.items() if solver.BooleanValue(literal)}
+        cross_cost = solver.ObjectiveValue() / SCALE if has_cost else 0.0
+    count("rooms.cross_flow_cost", cross_cost)
+    per_room = ", ".join(f"{room.name} {sum(1 for room_id in assignment.values() if room_id == room.id)}" for room in arch.rooms)
+    logger.info(f"  - Room assignment: {per_room} items; cross-room flow cost {cross_cost:.1f} (weight × m).")
+    return assignment
+
+class RoomSolutionMerger:
+    """
+    Combines the improving solutions of the rooms solved in parallel into SolutionUpdates for
+    the whole plant. An update is passed on once every room has a solution, with the sum of
+    the rooms' objectives and bounds; a handler returning True stops every room.
+    """
+
+    def __init__(self, parts: List[RoomPart], on_solution: Optional[SolutionHandler], stop: threading.Event):
+        self.parts = parts
+        self.on_solution = on_solution
+        self.stop = stop
+        self.latest: Dict[str, SolutionUpdate] = {}
+        self.solution_count = 0
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def handler_for(self, room_id: str) -> SolutionHandler:
+        def handle(update: SolutionUpdate) -> bool:
+            with self.lock:
+                self.latest[room_id] = update
+                if len(self.latest) < len(self.parts):
+                    return self.stop.is_set()
+                self.solution_count += 1
+                objective = sum(update.objective_value for update in self.latest.values())
+                bound = sum(update.best_objective_bound for update in self.latest.values())
+                merged = SolutionUpdate(
+                    solution_index=self.solution_count,
+                    objective_value=objective,
+                    best_objective_bound=bound,
+                    relative_gap=abs(objective - bound) / max(1.0, abs(objective)),
+                    wall_time_sec=time.perf_counter() - self.start,
+                    placements=merge_placements((part.room.id, self.latest[part.room.id].placements) for part in self.parts),
+                )
+                if self.on_solution(merged):
+                    self.stop.set()
+                return self.stop.is_set()
+        return handle
+
+def merge_placements(room_placements) -> Dict[str, Dict]:
+    return {eq_id: {**placement, 'room': room_id} for room_id, placements in room_placements for eq_id, placement in placements.items()}
+
+def merge_stats(results: List[PlacementResult], options: SolverOptions, wall_time: float) -> SolveStats:
+    statuses = [result.stats.status for result in results]
+    if len(set(statuses)) == 1:
+        status = statuses[0]
+    elif all(result.placements for result in results):
+        status = 'FEASIBLE'
+    else:
+        status = next(result.stats.status for result in results if not result.placements)
+    objectives = [result.stats.objective_value for result in results]
+    bounds = [result.stats.best_objective_bound for result in results]
+    objective = sum(objectives) if None not in objectives else None
+    bound = sum(bounds) if None not in bounds else None
+    return SolveStats(
+        status=status,
+        wall_time_sec=wall_time,
+        num_conflicts=sum(result.stats.num_conflicts for result in results),
+        num_branches=sum(result.stats.num_branches for result in results),
+        objective_value=objective,
+        best_objective_bound=bound,
+        relative_gap=abs(objective - bound) / max(1.0, abs(objective)) if objective is not None and bound is not None else None,
+        num_workers=options.num_workers,
+        num_solutions=sum(result.stats.num_solutions for result in results),
+    )
+
+def calculate_placements_by_room(project: Project, log_callback: Optional[Callable[[str], None]] = None,
+                                 hint_placements: Optional[Dict[str, Dict]] = None,
+                                 frozen_ids: Optional[Set[str]] = None, on_solution: Optional[SolutionHandler] = None,
+                                 stop_event: Optional[threading.Event] = None) -> PlacementResult:
+    """
+    Lays out a project with several rooms: the items are assigned to rooms first (see
+    assign_rooms), then every room is solved as an independent single-room project. The rooms
+    run in parallel threads, which the solver allows since it releases the GIL while searching.
+    Placements carry the ID of their room; their coordinates are relative to that room.
+    """
+    start = time.perf_counter()
+    options = project.solver_options or SolverOptions()
+    items = {item.id: item for item in project.equipment}
+    previous = {}
+    for eq_id, placement in (hint_placements or {}).items():
+        if eq_id in items and placement_room(items[eq_id], placement):
+            previous[eq_id] = placement_room(items[eq_id], placement)
+    assignment = assign_rooms(project, previous, frozen_ids)
+    parts = [part for part in split_rooms(project, assignment) if part.project.equipment]
+    count("rooms.solved", len(parts))
+    if not parts:
+        return PlacementResult(placements={}, stats=SolveStats(status='OPTIMAL', wall_time_sec=time.perf_counter() - start))
+
+    # Rooms solved at the same time share the solver workers (all cores when num_workers is unset)
+    # instead of each starting that many threads.
+    concurrent = min(options.room_workers or len(parts), len(parts))
+    room_options = options.copy(update={'num_workers': max(1, (options.num_workers or os.cpu_count() or 1) // concurrent)})
+
+    # One event stops every room: set by the caller's stop_event or by a handler returning True.
+    stop = threading.Event()
+    merger = RoomSolutionMerger(parts, on_solution, stop) if on_solution else None
+    finished = threading.Event()
+
+    def watch():
+        while not finished.is_set():
+            if stop_event.wait(0.1):
+                stop.set()
+                return
+
+    def solve(part: RoomPart) -> PlacementResult:
+        ids = {item.id for item in part.project.equipment}
+        # Hints from another room are coordinates in the wrong room.
+        hints = {eq_id: placement for eq_id, placement in (hint_placements or {}).items()
+                 if eq_id in ids and previous.get(eq_id, part.room.id) == part.room.id} or None
+        frozen = {eq_id for eq_id in (frozen_ids or set()) if eq_id in ids and hints and eq_id in hints} or None
+        logger.info(f"  - Room '{part.room.name}': {len(ids)} items, {len(part.rule_indices)} rules.")
+        part_options = room_options
+        if options.time_limit_sec:
+            # Rooms queued behind others get what is left of the time limit, not all of it again.
+            remaining = options.time_limit_sec - (time.perf_counter() - start)
+            part_options = room_options.copy(update={'time_limit_sec': max(MIN_ROOM_TIME_SEC, remaining)})
+        try:
+            return calculate_placements(part.project.copy(update={'solver_options': part_options}), log_callback, hints, frozen,
+                                        merger.handler_for(part.room.id) if merger else None, stop)
+        except InfeasibleRulesError as e:
+            raise InfeasibleRulesError(f"Room '{part.room.name}': {e}") from e
+
+    watcher = None
+    if stop_event is not None:
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrent) as executor:
+            results = list(executor.map(solve, parts))
+    finally:
+        finished.set()
+        if watcher:
+            watcher.join()
+
+    stats = merge_stats(results, options, time.perf_counter() - start)
+    if any(not result.placements for result in results):
+        logger.error(f"  > ERROR: No layout for room(s): {', '.join(part.room.name for part, result in zip(parts, results) if not result.placements)}.")
+        return PlacementResult(placements=None, stats=stats, stopped=stop.is_set())
+    placements = merge_placements((part.room.id, result.placements) for part, result in zip(parts, results))
+    return PlacementResult(placements=placements, stats=stats, is_fallback=any(result.is_fallback for result in results),
+                           stopped=stop.is_set() or any(result.stopped for result in results))
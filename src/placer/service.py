@@ -1,191 +1,516 @@
+from ortools.sat import sat_parameters_pb2
 from ortools.sat.python import cp_model
-from typing import Dict, List
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
 
-from src.core.models import Project, EquipmentItem
+from src.core.geometry import quarter_turns, roof_band
+from src.core.models import Project, PlacementResult, SolutionUpdate, SolveStats, SolverOptions
+from src.core.tracing import count, span, traced
+from src.placer.heuristic import GreedyPlacer
+from src.placer.objective import pair_key, select_objective_pairs
+from src.placer.presolve import PresolveResult, presolve_rules
+from src.placer.units import SCALE, BoxVariant, box_variants, room_bounds
 
-def get_box_by_id(boxes: List[Dict], target_id: str) -> Dict:
+logger = logging.getLogger(__name__)
+
+PENALTY_COST = 10000
+
+# Receives every improving solution; returning True stops the search.
+SolutionHandler = Callable[[SolutionUpdate], Optional[bool]]
+
+@dataclass
+class ModelParameters:
+    # Room bounds and AVOID_ZONE areas as variables of a compiled model (see sweep.py): a variant
+    # fixes them and the rest of the model is shared.
+    max_x: cp_model.IntVar
+    max_y: cp_model.IntVar
+    # (x1, y1, x2, y2) per AVOID_ZONE rule index.
+    avoid_areas: Dict[int, Tuple[cp_model.IntVar, ...]]
+    # The literal of each (AVOID_ZONE rule index, item ID, side).
+    avoid_literals: Dict[Tuple[int, str, str], cp_model.IntVar] = field(default_factory=dict)
+
+@dataclass
+class PlacementModel:
+    model: cp_model.CpModel
+    positions: Dict[str, Dict]
+    virtual_boxes: List[Dict]
+    objective_pairs: int
+    parameters: Optional[ModelParameters] = None
+
+def get_box_by_id(boxes: Dict[str, Dict], target_id: str) -> Dict:
     try:
-        return next(b for b in boxes if b['id'] == target_id)
-    except StopIteration:
+        return boxes[target_id]
+    except KeyError:
         raise ValueError(f"Rule error: Could not find an object with ID '{target_id}'")
 
-def calculate_placements(project: Project) -> Dict[str, Dict[str, float]]:
-    print("3. Calculating equipment placements with OR-Tools...")
-    
-    model = cp_model.CpModel()
-    SCALE = 100
-    PENALTY_COST = 10000
+def oriented(values: Sequence[int], turned: Optional[cp_model.IntVar]):
+    # A per-orientation constant; with an orientation literal it becomes a linear expression of it.
+    if turned is None or values[1] == values[0]:
+        return values[0]
+    return values[0] + (values[1] - values[0]) * turned
 
-    room_dims = project.architecture.room_dimensions
-    wall_thickness = project.architecture.wall_thickness
-    
-    time_limit = 30.0
-    if project.solver_options:
-        time_limit = project.solver_options.time_limit_sec
+def make_box(eq_id: str, vx, vy, variants: List[BoxVariant], turned: Optional[cp_model.IntVar] = None) -> Dict:
+    # Sizes and offsets are constants for items with one orientation and linear expressions of
+    # `turned` for items that may be rotated, so the rules read the same for both.
+    columns = list(zip(*variants))
+    rotation, w, d, x_offset, y_offset, fw, fd = (oriented(column, turned) for column in columns)
+    half = lambda column: oriented([value // 2 for value in column], turned)
+    return {'id': eq_id, 'vx': vx, 'vy': vy, 'vw': w, 'vd': d, 'px': vx + x_offset, 'py': vy + y_offset,
+            'hw': half(columns[1]), 'hd': half(columns[2]), 'fw': fw, 'fd': fd, 'hfw': half(columns[5]), 'hfd': half(columns[6]),
+            'rotation': rotation, 'turned': turned, 'variants': variants}
 
-    min_x_room = int(wall_thickness * SCALE)
-    max_x_room = int((room_dims.width - wall_thickness) * SCALE)
-    min_y_room = int(wall_thickness * SCALE)
-    max_y_room = int((room_dims.depth - wall_thickness) * SCALE)
+def add_box_intervals(model: cp_model.CpModel, box: Dict, intervals_x: List, intervals_y: List):
+    # A rotatable box gets one optional interval pair per orientation, present when that orientation is chosen.
+    variants, turned = box['variants'], box['turned']
+    if turned is None or (variants[0].w, variants[0].d) == (variants[1].w, variants[1].d):
+        intervals_x.append(model.NewFixedSizeIntervalVar(box['vx'], variants[0].w, f"ivx_{box['id']}"))
+        intervals_y.append(model.NewFixedSizeIntervalVar(box['vy'], variants[0].d, f"ivy_{box['id']}"))
+        return
+    for literal, variant in zip((turned.Not(), turned), variants):
+        intervals_x.append(model.NewOptionalFixedSizeIntervalVar(box['vx'], variant.w, literal, f"ivx{variant.rotation}_{box['id']}"))
+        intervals_y.append(model.NewOptionalFixedSizeIntervalVar(box['vy'], variant.d, literal, f"ivy{variant.rotation}_{box['id']}"))
+
+def hint_or_fix(model: cp_model.CpModel, box: Dict, previous: Dict[str, float], fix: bool):
+    # Puts a box where a previous solution had it: as a hint, or fixed there for frozen items.
+    hint_x = int(round(previous['x'] * SCALE))
+    hint_y = int(round(previous['y'] * SCALE))
+    turned = box['turned']
+    hint_turned = turned is not None and quarter_turns(previous.get('rotation_deg', 0)) % 2 == 1
+    variant = box['variants'][1] if hint_turned else box['variants'][0]
+    if fix:
+        model.Add(box['px'] == hint_x)
+        model.Add(box['py'] == hint_y)
+        if turned is not None:
+            model.Add(turned == int(hint_turned))
+    else:
+        model.AddHint(box['px'], hint_x)
+        model.AddHint(box['py'], hint_y)
+        model.AddHint(box['vx'], hint_x - variant.x_offset)
+        model.AddHint(box['vy'], hint_y - variant.y_offset)
+        if turned is not None:
+            model.AddHint(turned, hint_turned)
+
+def add_parameters(model: cp_model.CpModel, project: Project) -> ModelParameters:
+    # The project's room is the largest one the parameters may take.
+    min_x_room, max_x_room, min_y_room, max_y_room = room_bounds(project)
+    reach = max(max_x_room, max_y_room)
+    avoid_areas = {
+        i: tuple(model.NewIntVar(-reach, 2 * reach, f"az_{corner}_{i}") for corner in ('x1', 'y1', 'x2', 'y2'))
+        for i, rule in enumerate(project.rules) if rule.type == 'AVOID_ZONE'
+    }
+    return ModelParameters(model.NewIntVar(min_x_room, max_x_room, "room_max_x"),
+                           model.NewIntVar(min_y_room, max_y_room, "room_max_y"), avoid_areas)
+
+@traced("model_build")
+def build_placement_model(project: Project, hint_placements: Optional[Dict[str, Dict[str, float]]] = None,
+                          frozen_ids: Optional[Set[str]] = None, presolved: Optional[PresolveResult] = None,
+                          parametric: bool = False) -> PlacementModel:
+    # A parametric model is built for the project's room, with the far walls and the AVOID_ZONE
+    # areas as variables instead of constants and without the presolve, which depends on them.
+    model = cp_model.CpModel()
+    options = project.solver_options or SolverOptions()
+
+    if presolved is None:
+        presolved = presolve_rules(project, options.presolve and not parametric)
+    min_x_room, max_x_room, min_y_room, max_y_room = room_bounds(project)
+    parameters = add_parameters(model, project) if parametric else None
+    room_max_x = parameters.max_x if parameters else max_x_room
+    room_max_y = parameters.max_y if parameters else max_y_room
 
     positions = {}
     virtual_boxes = []
-    equipment_map: Dict[str, EquipmentItem] = {item.id: item for item in project.equipment}
+    intervals_x, intervals_y = [], []
 
     for item in project.equipment:
-        m_zone_left = item.maintenance_zone.left if item.maintenance_zone else 0.0
-        m_zone_right = item.maintenance_zone.right if item.maintenance_zone else 0.0
-        m_zone_back = item.maintenance_zone.back if item.maintenance_zone else 0.0
-        m_zone_front = item.maintenance_zone.front if item.maintenance_zone else 0.0
+        variants = box_variants(item, options)
 
-        w = int((m_zone_left + item.footprint.width + m_zone_right) * SCALE)
-        d = int((m_zone_back + item.footprint.depth + m_zone_front) * SCALE)
-        
-        x_offset = int(m_zone_left * SCALE)
-        y_offset = int(m_zone_back * SCALE)
+        lo_x, hi_x, lo_y, hi_y = presolved.bounds[item.id]
 
-        vx = model.NewIntVar(min_x_room, max_x_room - w, f"vx_{item.id}")
-        vy = model.NewIntVar(min_y_room, max_y_room - d, f"vy_{item.id}")
-        
-        px = model.NewIntVar(min_x_room, max_x_room, f"x_{item.id}")
-        py = model.NewIntVar(min_y_room, max_y_room, f"y_{item.id}")
+        vx = model.NewIntVar(lo_x, hi_x, f"vx_{item.id}")
+        vy = model.NewIntVar(lo_y, hi_y, f"vy_{item.id}")
+        turned = model.NewBoolVar(f"rot_{item.id}") if len(variants) > 1 else None
+        box = make_box(item.id, vx, vy, variants, turned)
+        if turned is not None or parameters:
+            # The presolved bounds fit the narrower orientation (or the largest room); the chosen one must still fit the room.
+            model.Add(vx + box['vw'] <= room_max_x)
+            model.Add(vy + box['vd'] <= room_max_y)
+
+        px = model.NewIntVar(lo_x + min(v.x_offset for v in variants), hi_x + max(v.x_offset for v in variants), f"x_{item.id}")
+        py = model.NewIntVar(lo_y + min(v.y_offset for v in variants), hi_y + max(v.y_offset for v in variants), f"y_{item.id}")
         
-        model.Add(px == vx + x_offset)
-        model.Add(py == vy + y_offset)
+        model.Add(px == box['px'])
+        model.Add(py == box['py'])
+        box.update({'px': px, 'py': py})
+
+        # Items taller than the walls stand where the gable roof is high enough. Parametric models
+        # change the room width, and with it the roof, so their layouts are left to the validator.
+        band = roof_band(project.architecture, item.height) if not parameters else None
+        if band is not None:
+            model.Add(px >= math.ceil(band[0] * SCALE))
+            model.Add(px + box['fw'] <= math.floor(band[1] * SCALE))
         
-        positions[item.id] = {'x': px, 'y': py, 'w': w, 'd': d}
-        virtual_boxes.append({'id': item.id, 'vx': vx, 'vy': vy, 'vw': w, 'vd': d, 'px': px, 'py': py})
+        positions[item.id] = {'x': px, 'y': py, 'w': box['vw'], 'd': box['vd'], 'rotation': box['rotation']}
+        virtual_boxes.append(box)
+        add_box_intervals(model, box, intervals_x, intervals_y)
+
+        previous = hint_placements.get(item.id) if hint_placements else None
+        if previous:
+            hint_or_fix(model, box, previous, bool(frozen_ids) and item.id in frozen_ids)
 
-    intervals_x = [model.NewIntervalVar(box['vx'], box['vw'], box['vx'] + box['vw'], f"ivx_{box['id']}") for box in virtual_boxes]
-    intervals_y = [model.NewIntervalVar(box['vy'], box['vd'], box['vy'] + box['vd'], f"ivy_{box['id']}") for box in virtual_boxes]
     model.AddNoOverlap2D(intervals_x, intervals_y)
-    print("  - Added global rule: NoOverlap2D (including maintenance zones).")
-    
-    print("  - Applying rules from project data...")
+    logger.info("  - Added global rule: NoOverlap2D (including maintenance zones).")
+
+    connected_pairs, alignment_penalties = add_rules(model, project, virtual_boxes, presolved, parameters)
+    objective_pairs = add_objective(model, project, virtual_boxes, connected_pairs, alignment_penalties)
+    count_model(model)
+
+    return PlacementModel(model=model, positions=positions, virtual_boxes=virtual_boxes, objective_pairs=objective_pairs,
+                          parameters=parameters)
+
+def count_model(model: cp_model.CpModel):
+    proto = model.Proto()
+    count("model.variables", len(proto.variables))
+    count("model.constraints", len(proto.constraints))
+
+def add_rules(model: cp_model.CpModel, project: Project, virtual_boxes: List[Dict],
+              presolved: Optional[PresolveResult] = None,
+              parameters: Optional[ModelParameters] = None) -> Tuple[Set[Tuple[str, str]], List]:
+    # Box coordinates ('vx', 'vy', 'px', 'py') and sizes may be variables or linear expressions
+    # (see make_box), so the same rules apply to free, rotatable and block member items (see decompose.py).
+    if presolved is None:
+        presolved = presolve_rules(project, (project.solver_options or SolverOptions()).presolve)
+    min_x_room, max_x_room, min_y_room, max_y_room = room_bounds(project)
+    if parameters:
+        max_x_room, max_y_room = parameters.max_x, parameters.max_y
+
+    logger.info("  - Applying rules from project data...")
     connected_pairs = set()
     alignment_penalties = []
+    # Rules look their targets up by ID; a scan of the box list per rule grows with rules × items.
+    boxes = {box['id']: box for box in virtual_boxes}
 
     for i, rule in enumerate(project.rules):
         rtype = rule.type
         params = rule.params
         
         if rtype == 'AVOID_ZONE':
-            x1, y1, x2, y2 = params['area']
-            print(f"    - Rule AVOID_ZONE for area [{x1},{y1},{x2},{y2}]")
-            for box in virtual_boxes:
-                is_left = model.NewBoolVar(f"az_left_{i}_{box['id']}")
-                is_right = model.NewBoolVar(f"az_right_{i}_{box['id']}")
-                is_below = model.NewBoolVar(f"az_below_{i}_{box['id']}")
-                is_above = model.NewBoolVar(f"az_above_{i}_{box['id']}")
-                model.Add(box['vx'] + box['vw'] <= int(x1 * SCALE)).OnlyEnforceIf(is_left)
-                model.Add(box['vx'] >= int(x2 * SCALE)).OnlyEnforceIf(is_right)
-                model.Add(box['vy'] + box['vd'] <= int(y1 * SCALE)).OnlyEnforceIf(is_below)
-                model.Add(box['vy'] >= int(y2 * SCALE)).OnlyEnforceIf(is_above)
-                model.AddBoolOr([is_left, is_right, is_below, is_above])
+            x1, y1, x2, y2 = parameters.avoid_areas[i] if parameters else (int(value * SCALE) for value in params.area)
+            # Only boxes that can reach the area get constraints, and only for the sides they can still be on.
+            reachable = [box for box in virtual_boxes if (i, box['id']) in presolved.avoid_sides]
+            logger.debug(f"    - Rule AVOID_ZONE for area {list(params.area)} ({len(reachable)} of {len(virtual_boxes)} items can reach it)")
+            for box in reachable:
+                conditions = {
+                    'left': box['vx'] + box['vw'] <= x1,
+                    'right': box['vx'] >= x2,
+                    'below': box['vy'] + box['vd'] <= y1,
+                    'above': box['vy'] >= y2,
+                }
+                sides = presolved.avoid_sides[(i, box['id'])]
+                if len(sides) == 1:
+                    model.Add(conditions[sides[0]])
+                    continue
+                literals = []
+                for side in sides:
+                    literal = model.NewBoolVar(f"az_{side}_{i}_{box['id']}")
+                    model.Add(conditions[side]).OnlyEnforceIf(literal)
+                    literals.append(literal)
+                    if parameters:
+                        parameters.avoid_literals[(i, box['id'], side)] = literal
+                model.AddBoolOr(literals)
 
         elif rtype == 'PLACE_IN_ZONE':
-            box = get_box_by_id(virtual_boxes, params['target'])
-            x1, y1, x2, y2 = params['area']
-            print(f"    - Rule PLACE_IN_ZONE for '{box['id']}'")
+            box = get_box_by_id(boxes, params.target)
+            x1, y1, x2, y2 = params.area
+            logger.debug(f"    - Rule PLACE_IN_ZONE for '{box['id']}'")
             model.Add(box['vx'] >= int(x1 * SCALE))
             model.Add(box['vy'] >= int(y1 * SCALE))
             model.Add(box['vx'] + box['vw'] <= int(x2 * SCALE))
             model.Add(box['vy'] + box['vd'] <= int(y2 * SCALE))
 
         elif rtype == 'ATTACH_TO_WALL':
-            box = get_box_by_id(virtual_boxes, params['target'])
-            side = params['side']
-            dist = int(params.get('distance', 0) * SCALE)
-            print(f"    - Rule ATTACH_TO_WALL for '{box['id']}' to wall {side}")
+            box = get_box_by_id(boxes, params.target)
+            side = params.side
+            dist = int(params.distance * SCALE)
+            logger.debug(f"    - Rule ATTACH_TO_WALL for '{box['id']}' to wall {side}")
             if side == 'Xmin': model.Add(box['vx'] == min_x_room + dist)
             elif side == 'Xmax': model.Add(box['vx'] + box['vw'] == max_x_room - dist)
             elif side == 'Ymin': model.Add(box['vy'] == min_y_room + dist)
             elif side == 'Ymax': model.Add(box['vy'] + box['vd'] == max_y_room - dist)
             
         elif rtype == 'ALIGN':
-            t1_id, t2_id = params['target1'], params['target2']
-            box1 = get_box_by_id(virtual_boxes, t1_id)
-            box2 = get_box_by_id(virtual_boxes, t2_id)
-            axis = params['axis']
-            print(f"    - Hard rule ALIGN for '{t1_id}' and '{t2_id}' on axis {axis}")
-            
-            w1 = int(equipment_map[t1_id].footprint.width * SCALE)
-            d1 = int(equipment_map[t1_id].footprint.depth * SCALE)
-            w2 = int(equipment_map[t2_id].footprint.width * SCALE)
-            d2 = int(equipment_map[t2_id].footprint.depth * SCALE)
+            t1_id, t2_id = params.target1, params.target2
+            box1 = get_box_by_id(boxes, t1_id)
+            box2 = get_box_by_id(boxes, t2_id)
+            axis = params.axis
+            logger.debug(f"    - Hard rule ALIGN for '{t1_id}' and '{t2_id}' on axis {axis}")
             
-            center1_x = box1['px'] + w1 // 2
-            center1_y = box1['py'] + d1 // 2
-            center2_x = box2['px'] + w2 // 2
-            center2_y = box2['py'] + d2 // 2
+            center1_x = box1['px'] + box1['hfw']
+            center1_y = box1['py'] + box1['hfd']
+            center2_x = box2['px'] + box2['hfw']
+            center2_y = box2['py'] + box2['hfd']
             
             if axis == 'X': model.Add(center1_x == center2_x)
             else: model.Add(center1_y == center2_y)
 
         elif rtype == 'PLACE_AFTER':
-            target_id, anchor_id = params['target'], params['anchor']
-            target_box = get_box_by_id(virtual_boxes, target_id)
-            anchor_box = get_box_by_id(virtual_boxes, anchor_id)
-            direction = params.get('direction', 'Y')
-            distance = int(params.get('distance', 0) * SCALE)
-            alignment = params.get('alignment', 'center')
-
-            connected_pairs.add(tuple(sorted((anchor_id, target_id))))
-            print(f"    - Rule PLACE_AFTER: '{target_id}' after '{anchor_id}', alignment: {alignment} (soft)")
-
-            anchor_w = int(equipment_map[anchor_id].footprint.width * SCALE)
-            anchor_d = int(equipment_map[anchor_id].footprint.depth * SCALE)
-            target_w = int(equipment_map[target_id].footprint.width * SCALE)
-            target_d = int(equipment_map[target_id].footprint.depth * SCALE)
-
-            if direction == 'Y': model.Add(target_box['py'] == anchor_box['py'] + anchor_d + distance)
-            elif direction == 'X': model.Add(target_box['px'] == anchor_box['px'] + anchor_w + distance)
+            target_id, anchor_id = params.target, params.anchor
+            target_box = get_box_by_id(boxes, target_id)
+            anchor_box = get_box_by_id(boxes, anchor_id)
+            direction = params.direction
+            distance = int(params.distance * SCALE)
+            alignment = params.alignment
+
+            connected_pairs.add(pair_key(anchor_id, target_id))
+            logger.debug(f"    - Rule PLACE_AFTER: '{target_id}' after '{anchor_id}', alignment: {alignment} (soft)")
+
+            if direction == 'Y': model.Add(target_box['py'] == anchor_box['py'] + anchor_box['fd'] + distance)
+            elif direction == 'X': model.Add(target_box['px'] == anchor_box['px'] + anchor_box['fw'] + distance)
             
             if alignment == 'center':
                 is_aligned = model.NewBoolVar(f"align_{anchor_id}_{target_id}")
                 if direction == 'Y':
-                    model.Add(target_box['px'] + target_w // 2 == anchor_box['px'] + anchor_w // 2).OnlyEnforceIf(is_aligned)
+                    model.Add(target_box['px'] + target_box['hfw'] == anchor_box['px'] + anchor_box['hfw']).OnlyEnforceIf(is_aligned)
                 elif direction == 'X':
-                    model.Add(target_box['py'] + target_d // 2 == anchor_box['py'] + anchor_d // 2).OnlyEnforceIf(is_aligned)
+                    model.Add(target_box['py'] + target_box['hfd'] == anchor_box['py'] + anchor_box['hfd']).OnlyEnforceIf(is_aligned)
                 alignment_penalties.append(PENALTY_COST * is_aligned.Not())
 
+    return connected_pairs, alignment_penalties
+
+def add_objective(model: cp_model.CpModel, project: Project, virtual_boxes: List[Dict], connected_pairs: Set[Tuple[str, str]],
+                  alignment_penalties: List, skip_pair: Optional[Callable[[str, str], bool]] = None) -> int:
+    min_x_room, max_x_room, min_y_room, max_y_room = room_bounds(project)
+    boxes_by_id = {box['id']: box for box in virtual_boxes}
+    objective_pairs = select_objective_pairs(project, virtual_boxes, connected_pairs, min_x_room, max_x_room, min_y_room)
+    if skip_pair is not None:
+        objective_pairs = [pair for pair in objective_pairs if not skip_pair(pair[0], pair[1])]
+
     all_distances, all_weights = [], []
-    for i in range(len(virtual_boxes)):
-        for j in range(i + 1, len(virtual_boxes)):
-            b1, b2 = virtual_boxes[i], virtual_boxes[j]
-            id1, id2 = b1['id'], b2['id']
+    for id1, id2, weight in objective_pairs:
+        b1, b2 = boxes_by_id[id1], boxes_by_id[id2]
 
-            dist_x = model.NewIntVar(0, max_x_room, f"dist_x_{id1}_{id2}")
-            dist_y = model.NewIntVar(0, max_y_room, f"dist_y_{id1}_{id2}")
-            
-            model.AddAbsEquality(dist_x, (b1['vx'] + b1['vw']//2) - (b2['vx'] + b2['vw']//2))
-            model.AddAbsEquality(dist_y, (b1['vy'] + b1['vd']//2) - (b2['vy'] + b2['vd']//2))
-            all_distances.extend([dist_x, dist_y])
-
-            weight = 1 if tuple(sorted((id1, id2))) in connected_pairs else 10
-            all_weights.extend([weight, weight])
-    
-    weighted_distance_sum = sum(dist * weight for dist, weight in zip(all_distances, all_weights))
+        dist_x = model.NewIntVar(0, max_x_room, f"dist_x_{id1}_{id2}")
+        dist_y = model.NewIntVar(0, max_y_room, f"dist_y_{id1}_{id2}")
+
+        model.AddAbsEquality(dist_x, (b1['vx'] + b1['hw']) - (b2['vx'] + b2['hw']))
+        model.AddAbsEquality(dist_y, (b1['vy'] + b1['hd']) - (b2['vy'] + b2['hd']))
+        all_distances.extend([dist_x, dist_y])
+        all_weights.extend([weight, weight])
+
+    weighted_distance_sum = cp_model.LinearExpr.WeightedSum(all_distances, all_weights)
     total_penalty = sum(alignment_penalties)
-    
+
     model.Minimize(weighted_distance_sum + total_penalty)
-    print("  - Added objective function: Minimize weighted distance and non-alignment penalties.")
+    objective_mode = project.solver_options.objective_mode if project.solver_options else 'ALL_PAIRS'
+    logger.info(f"  - Added objective function ({objective_mode}, {len(objective_pairs)} distance pairs): Minimize weighted distance and non-alignment penalties.")
+
+    return len(objective_pairs)
 
+def configure_solver(options: SolverOptions, log_callback: Optional[Callable[[str], None]] = None) -> cp_model.CpSolver:
     solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = time_limit
-    status = solver.Solve(model)
+    params = solver.parameters
+    params.max_time_in_seconds = options.time_limit_sec if options.time_limit_sec else 30.0
 
-    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-        print("  > Solution found!")
-        final_placements = {}
-        for item in project.equipment:
-            item_id = item.id
-            final_placements[item_id] = {
-                'x': solver.Value(positions[item_id]['x']) / SCALE,
-                'y': solver.Value(positions[item_id]['y']) / SCALE,
-                'rotation_deg': 0 
+    if options.num_workers is not None:
+        params.num_workers = options.num_workers
+    if options.random_seed is not None:
+        params.random_seed = options.random_seed
+    if options.relative_gap_limit is not None:
+        params.relative_gap_limit = options.relative_gap_limit
+    if options.absolute_gap_limit is not None:
+        params.absolute_gap_limit = options.absolute_gap_limit
+    if options.search_branching is not None:
+        params.search_branching = getattr(sat_parameters_pb2.SatParameters, options.search_branching)
+
+    params.log_search_progress = options.log_search_progress or log_callback is not None
+    if log_callback is not None:
+        params.log_to_stdout = False
+        solver.log_callback = log_callback
+    return solver
+
+def collect_solve_stats(solver: cp_model.CpSolver, status, options: SolverOptions) -> SolveStats:
+    has_solution = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    objective_value = solver.ObjectiveValue() if has_solution else None
+    best_bound = solver.BestObjectiveBound() if has_solution else None
+    relative_gap = None
+    if has_solution:
+        relative_gap = abs(objective_value - best_bound) / max(1.0, abs(objective_value))
+
+    return SolveStats(
+        status=solver.StatusName(status),
+        wall_time_sec=solver.WallTime(),
+        num_conflicts=solver.NumConflicts(),
+        num_branches=solver.NumBranches(),
+        objective_value=objective_value,
+        best_objective_bound=best_bound,
+        relative_gap=relative_gap,
+        num_workers=options.num_workers,
+    )
+
+class PlacementSolutionCallback(cp_model.CpSolverSolutionCallback):
+    """
+    Reports every improving solution while the solver runs: prints a progress line and, if a
+    handler is given, passes it a SolutionUpdate with the placements of that solution. The
+    search stops early when the handler returns True.
+    """
+
+    def __init__(self, extract_placements: Callable[[Callable], Dict[str, Dict[str, float]]],
+                 on_solution: Optional[SolutionHandler] = None):
+        super().__init__()
+        self.extract_placements = extract_placements
+        self.on_solution = on_solution
+        self.solution_count = 0
+        self.history: List[Tuple[float, float]] = []
+        self.stopped = False
+
+    def on_solution_callback(self):
+        self.solution_count += 1
+        objective, bound = self.ObjectiveValue(), self.BestObjectiveBound()
+        gap = abs(objective - bound) / max(1.0, abs(objective))
+        self.history.append((self.WallTime(), objective))
+        logger.info(f"  - Solution #{self.solution_count}: objective {objective:.0f}, bound {bound:.0f}, "
+                    f"gap {gap:.2%}, {self.WallTime():.2f}s")
+        if self.on_solution is None:
+            return
+        update = SolutionUpdate(
+            solution_index=self.solution_count,
+            objective_value=objective,
+            best_objective_bound=bound,
+            relative_gap=gap,
+            wall_time_sec=self.WallTime(),
+            placements=self.extract_placements(self.Value),
+        )
+        if self.on_solution(update):
+            logger.info("  - Search stopped by the caller.")
+            self.stopped = True
+            self.StopSearch()
+
+def run_solver(solver: cp_model.CpSolver, model: cp_model.CpModel, callback: PlacementSolutionCallback,
+               stop_event: Optional[threading.Event] = None):
+    with span("solve"):
+        status = run_search(solver, model, callback, stop_event)
+    count("solver.solutions", callback.solution_count)
+    count("solver.conflicts", solver.NumConflicts())
+    count("solver.branches", solver.NumBranches())
+    return status
+
+def run_search(solver: cp_model.CpSolver, model: cp_model.CpModel, callback: PlacementSolutionCallback,
+               stop_event: Optional[threading.Event] = None):
+    # A set stop_event ends the search from another thread (e.g. a UI or a job queue); the best
+    # solution found so far is kept, as with the time limit.
+    if stop_event is None:
+        return solver.Solve(model, callback)
+
+    finished = threading.Event()
+
+    def watch():
+        while not finished.is_set():
+            if stop_event.wait(0.1):
+                solver.StopSearch()
+                return
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        return solver.Solve(model, callback)
+    finally:
+        finished.set()
+        watcher.join()
+
+def calculate_placements(project: Project, log_callback: Optional[Callable[[str], None]] = None,
+                         hint_placements: Optional[Dict[str, Dict[str, float]]] = None,
+                         frozen_ids: Optional[Set[str]] = None, on_solution: Optional[SolutionHandler] = None,
+                         stop_event: Optional[threading.Event] = None) -> PlacementResult:
+    logger.info("3. Calculating equipment placements with OR-Tools...")
+    solve_start = time.perf_counter()
+
+    if project.architecture.rooms:
+        from src.placer.rooms import calculate_placements_by_room
+        return calculate_placements_by_room(project, log_callback, hint_placements, frozen_ids, on_solution, stop_event)
+
+    options = project.solver_options or SolverOptions()
+
+    if options.lns:
+        from src.placer.lns import calculate_placements_lns
+        return calculate_placements_lns(project, log_callback, hint_placements, frozen_ids, on_solution, stop_event)
+
+    presolved = presolve_rules(project, options.presolve)
+    logger.info(f"  - Presolve: {presolved.narrowed} item coordinates narrowed by rules, "
+                f"{presolved.dropped_reifications} avoid-zone literals not needed.")
+
+    if options.decompose:
+        from src.placer.decompose import calculate_placements_decomposed
+        if hint_placements:
+            logger.info("  - Warm start is not used by the decomposed solver.")
+        start = time.perf_counter()
+        result = calculate_placements_decomposed(project, log_callback, on_solution, stop_event)
+        if result is not None and (result.placements or result.stopped):
+            return result
+        logger.info("  > Decomposition found no layout. Retrying with the monolithic model...")
+        # The retry gets what is left of the time limit, not all of it again.
+        time_limit = options.time_limit_sec if options.time_limit_sec else 30.0
+        options = options.copy(update={'decompose': False,
+                                       'time_limit_sec': max(1.0, time_limit - (time.perf_counter() - start))})
+        project = project.copy(update={'solver_options': options})
+
+    greedy = None
+    if options.use_heuristic:
+        start = time.perf_counter()
+        with span("heuristic"):
+            placer = GreedyPlacer(project)
+            greedy = placer.run()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if greedy is None:
+            logger.info(f"  - Greedy layout: items do not fit the room ({elapsed_ms:.0f} ms).")
+        else:
+            logger.info(f"  - Greedy layout: {len(greedy)} items in {elapsed_ms:.0f} ms, {len(placer.relaxed)} placed without their rules.")
+
+    if hint_placements:
+        hinted = sum(1 for item in project.equipment if item.id in hint_placements)
+        frozen = len(frozen_ids) if frozen_ids else 0
+        logger.info(f"  - Warm start: {hinted} items hinted from a previous solution, {frozen} of them frozen.")
+    elif greedy is not None:
+        logger.info("  - Using the greedy layout as the solver hint.")
+        hint_placements = greedy
+
+    placement_model = build_placement_model(project, hint_placements, frozen_ids, presolved)
+    model, positions = placement_model.model, placement_model.positions
+
+    def extract_placements(value: Callable) -> Dict[str, Dict[str, float]]:
+        return {
+            item.id: {
+                'x': value(positions[item.id]['x']) / SCALE,
+                'y': value(positions[item.id]['y']) / SCALE,
+                'rotation_deg': value(positions[item.id]['rotation'])
             }
-        return final_placements
+            for item in project.equipment
+        }
+
+    solver = configure_solver(options, log_callback)
+    callback = PlacementSolutionCallback(extract_placements, on_solution)
+    status = run_solver(solver, model, callback, stop_event)
+    stats = collect_solve_stats(solver, status, options)
+    stats.num_solutions = callback.solution_count
+    stats.objective_history = callback.history
+    stopped = callback.stopped or (stop_event is not None and stop_event.is_set())
+
+    if frozen_ids and status == cp_model.INFEASIBLE:
+        logger.info("  > Frozen items leave no room for the edited ones. Retrying with hints only...")
+        if options.time_limit_sec:
+            # The retry gets what is left of the time limit, not all of it again.
+            remaining = options.time_limit_sec - (time.perf_counter() - solve_start)
+            project = project.copy(update={'solver_options': options.copy(update={'time_limit_sec': max(1.0, remaining)})})
+        return calculate_placements(project, log_callback, hint_placements, on_solution=on_solution, stop_event=stop_event)
+
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        logger.info("  > Solution found!")
+        return PlacementResult(placements=extract_placements(solver.Value), stats=stats, stopped=stopped)
+    elif greedy is not None:
+        logger.warning(f"  > WARNING: Solution not found (status: {stats.status}). Falling back to the greedy layout; rules may be violated.")
+        return PlacementResult(placements=greedy, stats=stats, is_fallback=True, stopped=stopped)
     else:
-        print(f"  > ERROR: Solution not found. Status: {solver.StatusName(status)}")
-        return None
+        logger.error(f"  > ERROR: Solution not found. Status: {stats.status}")
+        return PlacementResult(placements=None, stats=stats, stopped=stopped)
@@ -0,0 +1,161 @@
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from ortools.sat.python import cp_model
+
+from src.core.models import LayoutVariant, PlacementResult, Project, SolverOptions
+from src.core.tracing import span
+from src.placer.heuristic import GreedyPlacer
+from src.placer.objective import evaluate_layout_cost
+from src.placer.presolve import InfeasibleRulesError, presolve_rules
+from src.placer.service import build_placement_model, collect_solve_stats, configure_solver, hint_or_fix
+from src.placer.units import SCALE, room_bounds
+
+logger = logging.getLogger(__name__)
+
+SWEEP_FIELDS = ['variant', 'room_width', 'room_depth', 'time_limit_sec', 'status', 'objective', 'layout_cost',
+                'solve_time_sec', 'error']
+
+def variant_project(project: Project, variant: LayoutVariant) -> Project:
+    dims = project.architecture.room_dimensions
+    rules = list(project.rules)
+    for index, area in variant.avoid_zones.items():
+        if not 0 <= index < len(rules) or rules[index].type != 'AVOID_ZONE':
+            raise ValueError(f"Variant '{variant.name}': rule #{index} is not an AVOID_ZONE rule.")
+        rules[index] = rules[index].copy(update={'params': rules[index].params.copy(update={'area': tuple(area)})})
+    options = project.solver_options or SolverOptions()
+    if variant.time_limit_sec is not None:
+        options = options.copy(update={'time_limit_sec': variant.time_limit_sec})
+    return project.copy(update={
+        'architecture': project.architecture.copy(update={'room_dimensions': dims.copy(update={
+            'width': variant.room_width or dims.width, 'depth': variant.room_depth or dims.depth,
+        })}),
+        'rules': rules,
+        'solver_options': options,
+    })
+
+class CompiledPlacementModel:
+    """
+    The placement model of a project built once, for re-solving it in other rooms and with
+    other aisles. The model is built for the largest room of the sweep with the far walls and
+    the AVOID_ZONE areas as variables; a variant solves a copy in which those variables are
+    fixed, every item's position is narrowed to the variant's presolved bounds, avoid-zone
+    sides the presolve rules out are switched off, and the greedy layout of the variant is the
+    hint. The objective pairs, KNN neighbours included, are chosen once for the largest room.
+    """
+
+    def __init__(self, project: Project, max_room_width: Optional[float] = None, max_room_depth: Optional[float] = None):
+        if project.architecture.rooms:
+            raise ValueError("Parameter sweeps need a single-room project.")
+        self.project = project
+        envelope = variant_project(project, LayoutVariant(
+            name="envelope",
+            room_width=max(project.architecture.room_dimensions.width, max_room_width or 0),
+            room_depth=max(project.architecture.room_dimensions.depth, max_room_depth or 0),
+        ))
+        self.envelope_bounds = room_bounds(envelope)
+        with span("sweep.compile"):
+            self.placement_model = build_placement_model(envelope, parametric=True)
+
+    def variant_model(self, project: Project) -> cp_model.CpModel:
+        # A copy of the compiled model for a variant project (see variant_project).
+        min_x, max_x, min_y, max_y = room_bounds(project)
+        if max_x > self.envelope_bounds[1] or max_y > self.envelope_bounds[3]:
+            raise ValueError("The variant has a larger room than the model was compiled for.")
+        presolved = presolve_rules(project, (project.solver_options or SolverOptions()).presolve)
+        parameters = self.placement_model.parameters
+
+        model = self.placement_model.model.Clone()
+        # Unary constraints: CP-SAT's presolve turns them into the variables' domains.
+        model.AddLinearConstraint(parameters.max_x, max_x, max_x)
+        model.AddLinearConstraint(parameters.max_y, max_y, max_y)
+        for index, corners in parameters.avoid_areas.items():
+            for corner, value in zip(corners, project.rules[index].params.area):
+                scaled = int(value * SCALE)
+                model.AddLinearConstraint(corner, scaled, scaled)
+        for box in self.placement_model.virtual_boxes:
+            lo_x, hi_x, lo_y, hi_y = presolved.bounds[box['id']]
+            model.AddLinearConstraint(box['vx'], lo_x, hi_x)
+            model.AddLinearConstraint(box['vy'], lo_y, hi_y)
+        for (index, eq_id, side), literal in parameters.avoid_literals.items():
+            sides = presolved.avoid_sides.get((index, eq_id))
+            if sides is not None and side not in sides:
+                model.AddLinearConstraint(literal, 0, 0)
+        return model
+
+    def solve(self, variant: LayoutVariant) -> PlacementResult:
+        project = variant_project(self.project, variant)
+        options = project.solver_options or SolverOptions()
+        model = self.variant_model(project)
+
+        greedy = GreedyPlacer(project).run() if options.use_heuristic else None
+        if greedy is not None:
+            for box in self.placement_model.virtual_boxes:
+                hint_or_fix(model, box, greedy[box['id']], False)
+
+        solver = configure_solver(options)
+        with span("solve"):
+            status = solver.Solve(model)
+        stats = collect_solve_stats(solver, status, options)
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            positions = self.placement_model.positions
+            placements = {
+                item.id: {
+                    'x': solver.Value(positions[item.id]['x']) / SCALE,
+                    'y': solver.Value(positions[item.id]['y']) / SCALE,
+                    'rotation_deg': solver.Value(positions[item.id]['rotation']),
+                }
+                for item in project.equipment
+            }
+            return PlacementResult(placements=placements, stats=stats)
+        if greedy is not None:
+            return PlacementResult(placements=greedy, stats=stats, is_fallback=True)
+        return PlacementResult(placements=None, stats=stats)
+
+    def solve_row(self, variant: LayoutVariant) -> Dict[str, Any]:
+        # One line of the sweep table; contradictory rules in a variant are reported, not raised.
+        dims = self.project.architecture.room_dimensions
+        options = self.project.solver_options or SolverOptions()
+        row = {field: None for field in SWEEP_FIELDS}
+        row.update(variant=variant.name, room_width=variant.room_width or dims.width, room_depth=variant.room_depth or dims.depth,
+                   time_limit_sec=variant.time_limit_sec or options.time_limit_sec)
+        start = time.perf_counter()
+        try:
+            result = self.solve(variant)
+        except (InfeasibleRulesError, ValueError) as e:
+            row.update(status='INFEASIBLE_RULES' if isinstance(e, InfeasibleRulesError) else 'ERROR', error=str(e))
+            return row
+        row.update(status='FALLBACK' if result.is_fallback else result.stats.status, objective=result.stats.objective_value,
+                   solve_time_sec=time.perf_counter() - start)
+        if result.placements and not result.is_fallback:
+            row['layout_cost'] = evaluate_layout_cost(variant_project(self.project, variant), result.placements)
+        return row
+
+# Compiled once per worker process of a sweep.
+_compiled: Dict[str, CompiledPlacementModel] = {}
+
+def init_worker(project: Project, max_room_width: float, max_room_depth: float):
+    _compiled['model'] = CompiledPlacementModel(project, max_room_width, max_room_depth)
+
+def solve_variant_row(variant: LayoutVariant) -> Dict[str, Any]:
+    return _compiled['model'].solve_row(variant)
+
+def run_sweep(project: Project, variants: List[LayoutVariant], workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Solves every variant of `project` and returns one row per variant (see SWEEP_FIELDS), in
+    the order of `variants`. The model is compiled once per worker process, for the largest
+    room among the variants; with one worker everything runs in this process.
+    """
+    max_room_width = max((variant.room_width or 0 for variant in variants), default=0)
+    max_room_depth = max((variant.room_depth or 0 for variant in variants), default=0)
+    workers = min(workers or os.cpu_count() or 1, len(variants))
+    logger.info(f"--- Sweeping {len(variants)} variants of '{project.meta.project_name}' with {workers} workers ---")
+    if workers <= 1:
+        compiled = CompiledPlacementModel(project, max_room_width, max_room_depth)
+        return [compiled.solve_row(variant) for variant in variants]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(project, max_room_width, max_room_depth)) as executor:
+        return list(executor.map(solve_variant_row, variants))
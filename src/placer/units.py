@@ -0,0 +1,54 @@
+from typing import List, NamedTuple, Optional, Tuple
+
+from src.core.geometry import item_orientations, oriented_footprint, oriented_maintenance, quarter_turns
+from src.core.models import Architecture, Project, EquipmentItem, SolverOptions
+
+# The placer works in integer centimetres.
+SCALE = 100
+
+def room_bounds(project: Project) -> Tuple[int, int, int, int]:
+    return architecture_bounds(project.architecture)
+
+def architecture_bounds(arch: Architecture) -> Tuple[int, int, int, int]:
+    # Inside of the walls as (min_x, max_x, min_y, max_y).
+    room_dims = arch.room_dimensions
+    wall_thickness = arch.wall_thickness
+    return (
+        int(wall_thickness * SCALE),
+        int((room_dims.width - wall_thickness) * SCALE),
+        int(wall_thickness * SCALE),
+        int((room_dims.depth - wall_thickness) * SCALE),
+    )
+
+def virtual_box_size(item: EquipmentItem, rotation_deg: float = 0) -> Tuple[int, int, int, int]:
+    # Size of the footprint plus maintenance zone, and the footprint's offset inside it.
+    m_zone_left, m_zone_back, m_zone_right, m_zone_front = oriented_maintenance(item, rotation_deg)
+    width, depth = oriented_footprint(item, rotation_deg)
+
+    # Rounded, not truncated: int(2.3 * SCALE) is 229, which let neighbours overlap by a centimetre.
+    w = int(round((m_zone_left + width + m_zone_right) * SCALE))
+    d = int(round((m_zone_back + depth + m_zone_front) * SCALE))
+    return w, d, int(round(m_zone_left * SCALE)), int(round(m_zone_back * SCALE))
+
+def footprint_size(item: EquipmentItem, rotation_deg: float = 0) -> Tuple[int, int]:
+    width, depth = oriented_footprint(item, rotation_deg)
+    return int(round(width * SCALE)), int(round(depth * SCALE))
+
+class BoxVariant(NamedTuple):
+    # One orientation of an item: its virtual box size, the footprint's offset inside it and the footprint size.
+    rotation: int
+    w: int
+    d: int
+    x_offset: int
+    y_offset: int
+    footprint_w: int
+    footprint_d: int
+
+def box_variant(item: EquipmentItem, rotation_deg: float = 0) -> BoxVariant:
+    # Placements come back through pydantic as floats; the model works with whole degrees.
+    rotation = 90 * quarter_turns(rotation_deg)
+    return BoxVariant(rotation, *virtual_box_size(item, rotation), *footprint_size(item, rotation))
+
+def box_variants(item: EquipmentItem, options: Optional[SolverOptions]) -> List[BoxVariant]:
+    # The unturned orientation first, then the quarter turn if the item may be rotated.
+    return [box_variant(item, rotation) for rotation in item_orientations(item, options)]
@@ -0,0 +1,71 @@
+import json
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+from src.core.geometry import oriented_footprint
+from src.core.hashing import content_hash, project_hash
+from src.core.models import Project, EquipmentItem, Rule
+
+def item_signature(item: EquipmentItem, related_rules: List[Rule]) -> str:
+    # An item counts as unchanged only if its own data and every rule that mentions it are unchanged.
+    return content_hash({'item': item.dict(), 'rules': [rule.dict() for rule in related_rules]})
+
+def item_signatures(project: Project) -> Dict[str, str]:
+    # Rules are grouped by target once, instead of scanning every rule for every item.
+    related = defaultdict(list)
+    for rule in project.rules:
+        for target in dict.fromkeys(rule.targets):
+            related[target].append(rule)
+    return {item.id: item_signature(item, related[item.id]) for item in project.equipment}
+
+def save_placements(path: str, project: Project, placements: Dict[str, Dict[str, float]]):
+    records = {}
+    signatures = item_signatures(project)
+    for item in project.equipment:
+        if item.id not in placements:
+            continue
+        placement = placements[item.id]
+        # Extent as placed, i.e. after rotation, for the neighbourhood test in select_frozen_items.
+        width, depth = oriented_footprint(item, placement.get('rotation_deg', 0))
+        records[item.id] = {**placement, 'width': width, 'depth': depth, 'signature': signatures[item.id]}
+    data = {'project_hash': project_hash(project), 'placements': records}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+def load_placements(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def find_changed_items(project: Project, previous: Dict) -> Set[str]:
+    previous_placements = previous.get('placements', {})
+    signatures = item_signatures(project)
+    return {
+        item.id for item in project.equipment
+        if item.id not in previous_placements
+        or previous_placements[item.id].get('signature') != signatures[item.id]
+    }
+
+def rect_gap(a: Dict[str, float], b: Dict[str, float]) -> float:
+    gap_x = max(a['x'], b['x']) - min(a['x'] + a['width'], b['x'] + b['width'])
+    gap_y = max(a['y'], b['y']) - min(a['y'] + a['depth'], b['y'] + b['depth'])
+    return max(gap_x, gap_y, 0.0)
+
+def select_frozen_items(project: Project, previous: Dict, radius: float) -> Set[str]:
+    # Unchanged items stay frozen unless they lie within `radius` metres of an edited item's
+    # previous footprint; that neighbourhood is re-optimised together with the edited items.
+    # Only items in the same room are neighbours.
+    previous_placements = previous.get('placements', {})
+    changed = find_changed_items(project, previous)
+    changed_rects = [previous_placements[eq_id] for eq_id in changed if eq_id in previous_placements]
+
+    frozen = set()
+    for item in project.equipment:
+        if item.id in changed:
+            continue
+        rect = previous_placements[item.id]
+        if all(rect_gap(rect, other) > radius for other in changed_rects if other.get('room') == rect.get('room')):
+            frozen.add(item.id)
+    return frozen
@@ -0,0 +1,295 @@
+from collections import defaultdict
+from typing import Dict, List
+
+import numpy as np
+
+from src.core.geometry import oriented_footprint, oriented_maintenance, roof_clearance
+from src.core.models import Project, ValidationIssue, ValidationReport
+from src.core.rooms import placement_room, split_rooms
+from src.core.tracing import count, traced
+from src.placer.presolve import InfeasibleRulesError, presolve_rules
+from src.validator.service import find_collisions
+
+# Positions come from an integer (centimetre) model in which sizes are rounded to whole units
+# and the room walls truncated to them, so a box can be off by up to a unit on each side.
+# Equalities and bounds are checked with a tolerance of a couple of solver units.
+TOL = 0.02
+
+@traced("validate")
+def validate_layout(project: Project, placements: Dict[str, Dict[str, float]]) -> ValidationReport:
+    if project.architecture.rooms:
+        report = check_rooms_layout(project, placements)
+    else:
+        report = check_layout(project, placements)
+    count("validation.issues", len(report.issues))
+    return report
+
+def check_layout(project: Project, placements: Dict[str, Dict[str, float]]) -> ValidationReport:
+    issues: List[ValidationIssue] = []
+
+    items = [item for item in project.equipment if placements.get(item.id)]
+    for item in project.equipment:
+        if not placements.get(item.id):
+            issues.append(ValidationIssue(check="MISSING_PLACEMENT", items=[item.id], message=f"Item '{item.name}' has no placement."))
+
+    index = {item.id: i for i, item in enumerate(items)}
+    n = len(items)
+
+    # Footprints and virtual boxes (footprint plus maintenance zone) as [x1, y1, x2, y2] rows.
+    fp = np.zeros((n, 4))
+    mz = np.zeros((n, 4))
+    height = np.zeros(n)
+    for i, item in enumerate(items):
+        placement = placements[item.id]
+        rotation = placement.get('rotation_deg', 0)
+        width, depth = oriented_footprint(item, rotation)
+        fp[i] = (placement['x'], placement['y'], placement['x'] + width, placement['y'] + depth)
+        mz[i] = oriented_maintenance(item, rotation)
+        height[i] = item.height
+    vb = fp + mz * np.array([-1.0, -1.0, 1.0, 1.0])
+
+    for collision in find_collisions(project, placements):
+        issues.append(ValidationIssue(check="COLLISION", items=[collision.item_a, collision.item_b],
+                                      amount=collision.overlap_area, message=collision.message))
+
+    # Room walls.
+    arch = project.architecture
+    room = arch.room_dimensions
+    wall = arch.wall_thickness
+    min_x, max_x = wall, room.width - wall
+    min_y, max_y = wall, room.depth - wall
+    excess = np.max(np.stack([min_x - vb[:, 0], vb[:, 2] - max_x, min_y - vb[:, 1], vb[:, 3] - max_y]), axis=0) if n else np.zeros(0)
+    for i in np.nonzero(excess > TOL)[0]:
+        issues.append(ValidationIssue(check="ROOM_BOUNDS", items=[items[i].id], amount=float(excess[i]),
+                                      message=f"'{items[i].name}' (with maintenance zone) extends {excess[i]:.2f} m beyond the room walls."))
+
+    # 3D envelope: equipment height against the ceiling/roof above its footprint.
+    clearance = roof_clearance(project.architecture, fp[:, 0], fp[:, 2])
+    for i in np.nonzero(height > clearance + TOL)[0]:
+        issues.append(ValidationIssue(check="HEIGHT_CLEARANCE", items=[items[i].id], amount=float(height[i] - clearance[i]),
+                                      message=f"'{items[i].name}' is {height[i]:.2f} m tall but only {clearance[i]:.2f} m of clearance is available above it."))
+
+    # Rules, grouped by type so that each type is checked in one batched pass.
+    grouped = defaultdict(list)
+    for rule_index, rule in enumerate(project.rules):
+        unknown = [target for target in rule.targets if target not in index]
+        if unknown:
+            issues.append(ValidationIssue(check="UNKNOWN_TARGET", items=unknown, rule_index=rule_index,
+                                          message=f"Rule #{rule_index} ({rule.type}) refers to unknown or unplaced items: {', '.join(unknown)}."))
+            continue
+        grouped[rule.type].append((rule_index, rule.params))
+
+    for rule_index, params in grouped['AVOID_ZONE']:
+        x1, y1, x2, y2 = params.area
+        dx = np.minimum(vb[:, 2], x2) - np.maximum(vb[:, 0], x1)
+        dy = np.minimum(vb[:, 3], y2) - np.maximum(vb[:, 1], y1)
+        area = np.clip(dx, 0, None) * np.clip(dy, 0, None)
+        for i in np.nonzero((dx > TOL) & (dy > TOL))[0]:
+            issues.append(ValidationIssue(check="AVOID_ZONE", items=[items[i].id], rule_index=rule_index, amount=float(area[i]),
+                                          message=f"'{items[i].name}' overlaps the avoid zone [{x1}, {y1}, {x2}, {y2}] by {area[i]:.2f} m²."))
+
+    if grouped['PLACE_IN_ZONE']:
+        rule_indices = [rule_index for rule_index, _ in grouped['PLACE_IN_ZONE']]
+        targets = np.array([index[params.target] for _, params in grouped['PLACE_IN_ZONE']])
+        areas = np.array([params.area for _, params in grouped['PLACE_IN_ZONE']], dtype=float)
+        boxes = vb[targets]
+        outside = np.max(np.stack([areas[:, 0] - boxes[:, 0], areas[:, 1] - boxes[:, 1], boxes[:, 2] - areas[:, 2], boxes[:, 3] - areas[:, 3]]), axis=0)
+        for k in np.nonzero(outside > TOL)[0]:
+            item = items[targets[k]]
+            issues.append(ValidationIssue(check="PLACE_IN_ZONE", items=[item.id], rule_index=rule_indices[k], amount=float(outside[k]),
+                                          message=f"'{item.name}' extends {outside[k]:.2f} m outside its zone {list(areas[k])}."))
+
+    if grouped['ATTACH_TO_WALL']:
+        # Column of the virtual box that must touch the wall and the wall coordinate per side.
+        sides = {'Xmin': (0, min_x, 1.0), 'Xmax': (2, max_x, -1.0), 'Ymin': (1, min_y, 1.0), 'Ymax': (3, max_y, -1.0)}
+        rule_indices = [rule_index for rule_index, _ in grouped['ATTACH_TO_WALL']]
+        targets = np.array([index[params.target] for _, params in grouped['ATTACH_TO_WALL']])
+        columns = np.array([sides[params.side][0] for _, params in grouped['ATTACH_TO_WALL']])
+        expected = np.array([sides[params.side][1] + sides[params.side][2] * params.distance
+                             for _, params in grouped['ATTACH_TO_WALL']])
+        deviation = np.abs(vb[targets, columns] - expected)
+        for k in np.nonzero(deviation > TOL)[0]:
+            item = items[targets[k]]
+            side = grouped['ATTACH_TO_WALL'][k][1].side
+            issues.append(ValidationIssue(check="ATTACH_TO_WALL", items=[item.id], rule_index=rule_indices[k], amount=float(deviation[k]),
+                                          message=f"'{item.name}' is {deviation[k]:.2f} m off its required position at wall {side}."))
+
+    centers = np.stack([(fp[:, 0] + fp[:, 2]) / 2.0, (fp[:, 1] + fp[:, 3]) / 2.0], axis=1)
+
+    if grouped['ALIGN']:
+        rule_indices = [rule_index for rule_index, _ in grouped['ALIGN']]
+        first = np.array([index[params.target1] for _, params in grouped['ALIGN']])
+        second = np.array([index[params.target2] for _, params in grouped['ALIGN']])
+        axes = np.array([0 if params.axis == 'X' else 1 for _, params in grouped['ALIGN']])
+        deviation = np.abs(centers[first, axes] - centers[second, axes])
+        for k in np.nonzero(deviation > TOL)[0]:
+            item_a, item_b = items[first[k]], items[second[k]]
+            issues.append(ValidationIssue(check="ALIGN", items=[item_a.id, item_b.id], rule_index=rule_indices[k], amount=float(deviation[k]),
+                                          message=f"'{item_a.name}' and '{item_b.name}' are misaligned by {deviation[k]:.2f} m."))
+
+    if grouped['PLACE_AFTER']:
+        rules = grouped['PLACE_AFTER']
+        rule_indices = [rule_index for rule_index, _ in rules]
+        targets = np.array([index[params.target] for _, params in rules])
+        anchors = np.array([index[params.anchor] for _, params in rules])
+        along = np.array([1 if params.direction == 'Y' else 0 for _, params in rules])
+        distance = np.array([params.distance for _, params in rules], dtype=float)
+        # The target starts where the anchor's footprint ends, plus the requested distance.
+        expected = fp[anchors, along + 2] + distance
+        deviation = np.abs(fp[targets, along] - expected)
+        for k in np.nonzero(deviation > TOL)[0]:
+            target, anchor = items[targets[k]], items[anchors[k]]
+            issues.append(ValidationIssue(check="PLACE_AFTER", items=[target.id, anchor.id], rule_index=rule_indices[k], amount=float(deviation[k]),
+                                          message=f"'{target.name}' is {deviation[k]:.2f} m away from its required position after '{anchor.name}'."))
+
+        # Centre alignment across the flow direction is a soft rule in the solver.
+        centered = np.array([params.alignment == 'center' for _, params in rules])
+        offset = np.abs(centers[targets, 1 - along] - centers[anchors, 1 - along])
+        for k in np.nonzero(centered & (offset > TOL))[0]:
+            target, anchor = items[targets[k]], items[anchors[k]]
+            issues.append(ValidationIssue(check="PLACE_AFTER", severity="WARNING", items=[target.id, anchor.id], rule_index=rule_indices[k],
+                                          amount=float(offset[k]), message=f"'{target.name}' is not centred on '{anchor.name}' (off by {offset[k]:.2f} m)."))
+
+    return ValidationReport(
+        ok=not any(issue.severity == "ERROR" for issue in issues),
+        checked_items=n,
+        checked_rules=len(project.rules),
+        issues=issues,
+    )
+
+def check_rooms_layout(project: Project, placements: Dict[str, Dict[str, float]]) -> ValidationReport:
+    # Every room is checked on its own, in its own coordinates; rule indices are mapped back
+    # to the full project's rules.
+    issues: List[ValidationIssue] = []
+    room_ids = {room.id for room in project.architecture.rooms}
+    assignment = {}
+    for item in project.equipment:
+        placement = placements.get(item.id)
+        room_id = placement_room(item, placement)
+        if not placement and room_id is None:
+            issues.append(ValidationIssue(check="MISSING_PLACEMENT", items=[item.id], message=f"Item '{item.name}' has no placement."))
+        elif room_id not in room_ids:
+            issues.append(ValidationIssue(check="ROOM", items=[item.id], message=f"Item '{item.name}' is placed in an unknown room '{room_id}'."))
+        elif item.room is not None and room_id != item.room:
+            issues.append(ValidationIssue(check="ROOM", items=[item.id],
+                                          message=f"Item '{item.name}' must stand in room '{item.room}' but is placed in '{room_id}'."))
+        else:
+            assignment[item.id] = room_id
+
+    for rule_index, rule in enumerate(project.rules):
+        targets = rule.targets
+        unknown = [target for target in targets if target not in assignment]
+        if unknown:
+            issues.append(ValidationIssue(check="UNKNOWN_TARGET", items=unknown, rule_index=rule_index,
+                                          message=f"Rule #{rule_index} ({rule.type}) refers to unknown or unplaced items: {', '.join(unknown)}."))
+        elif len({assignment[target] for target in targets}) > 1:
+            issues.append(ValidationIssue(check="ROOM", items=targets, rule_index=rule_index,
+                                          message=f"Rule #{rule_index} ({rule.type}) links items placed in different rooms."))
+
+    checked_items = 0
+    for part in split_rooms(project, assignment):
+        report = check_layout(part.project, placements)
+        checked_items += report.checked_items
+        for issue in report.issues:
+            if issue.rule_index is not None:
+                issue.rule_index = part.rule_indices[issue.rule_index]
+            issue.message = f"[{part.room.name}] {issue.message}"
+            issues.append(issue)
+
+    return ValidationReport(
+        ok=not any(issue.severity == "ERROR" for issue in issues),
+        checked_items=checked_items,
+        checked_rules=len(project.rules),
+        issues=issues,
+    )
+
+def rule_issues(project: Project) -> List[ValidationIssue]:
+    """
+    Rules that contradict themselves (an empty area, an item tied to itself) or refer to
+    unknown items. Rule types and params are already checked when the project is parsed.
+    """
+    issues: List[ValidationIssue] = []
+    ids = {item.id for item in project.equipment}
+    for rule_index, rule in enumerate(project.rules):
+        area = getattr(rule.params, 'area', None)
+        if area is not None and (area[2] <= area[0] or area[3] <= area[1]):
+            issues.append(ValidationIssue(check="INVALID_RULE", rule_index=rule_index,
+                                          message=f"Rule #{rule_index} ({rule.type}) has an empty area {list(area)}."))
+            continue
+        targets = rule.targets
+        if len(set(targets)) < len(targets):
+            issues.append(ValidationIssue(check="INVALID_RULE", items=targets[:1], rule_index=rule_index,
+                                          message=f"Rule #{rule_index} ({rule.type}) ties '{targets[0]}' to itself."))
+            continue
+        unknown = [target for target in targets if target not in ids]
+        if unknown:
+            issues.append(ValidationIssue(check="UNKNOWN_TARGET", items=unknown, rule_index=rule_index,
+                                          message=f"Rule #{rule_index} ({rule.type}) refers to unknown items: {', '.join(unknown)}."))
+    return issues
+
+def room_issues(project: Project) -> List[ValidationIssue]:
+    """Missing room dimensions, and rooms, storeys or items that refer to unknown rooms or storeys."""
+    issues: List[ValidationIssue] = []
+    arch = project.architecture
+    if not arch.rooms:
+        if arch.room_dimensions is None:
+            issues.append(ValidationIssue(check="ROOM", message="The architecture needs either room_dimensions or a list of rooms."))
+        for item in project.equipment:
+            if item.room is not None:
+                issues.append(ValidationIssue(check="ROOM", severity="WARNING", items=[item.id],
+                                              message=f"Item '{item.name}' names room '{item.room}', but the project has a single room."))
+        return issues
+
+    room_ids = [room.id for room in arch.rooms]
+    storey_ids = {storey.id for storey in arch.storeys}
+    for room_id in sorted({room_id for room_id in room_ids if room_ids.count(room_id) > 1}):
+        issues.append(ValidationIssue(check="ROOM", message=f"Room ID '{room_id}' is used by several rooms."))
+    for room in arch.rooms:
+        if room.storey is not None and room.storey not in storey_ids:
+            issues.append(ValidationIssue(check="ROOM", message=f"Room '{room.name}' is on an unknown storey '{room.storey}'."))
+    fixed = {}
+    for item in project.equipment:
+        if item.room is None:
+            continue
+        if item.room not in room_ids:
+            issues.append(ValidationIssue(check="ROOM", items=[item.id], message=f"Item '{item.name}' is assigned to an unknown room '{item.room}'."))
+        fixed[item.id] = item.room
+    for rule_index, rule in enumerate(project.rules):
+        if rule.type == 'AVOID_ZONE' and rule.params.room is not None and rule.params.room not in room_ids:
+            issues.append(ValidationIssue(check="ROOM", rule_index=rule_index,
+                                          message=f"Rule #{rule_index} (AVOID_ZONE) refers to an unknown room '{rule.params.room}'."))
+        targets = rule.targets
+        if len({fixed[target] for target in targets if target in fixed}) > 1:
+            issues.append(ValidationIssue(check="ROOM", items=targets, rule_index=rule_index,
+                                          message=f"Rule #{rule_index} ({rule.type}) links items that are assigned to different rooms."))
+    return issues
+
+@traced("validate_project")
+def validate_project(project: Project) -> ValidationReport:
+    """
+    Checks a project before anything is solved: every rule must be complete and refer to known
+    items, rooms must be consistent, and the rules together must leave each item a position
+    (see presolve_rules). Needs neither the solver nor the IFC stack, so it answers quickly.
+    In a project with several rooms, each room is presolved with the items assigned to it.
+    """
+    issues = rule_issues(project) + room_issues(project)
+    # The presolve assumes well-formed rules, so it only runs on a project that passed the checks above.
+    if not any(issue.severity == "ERROR" for issue in issues):
+        try:
+            if project.architecture.rooms:
+                for part in split_rooms(project, {item.id: item.room for item in project.equipment if item.room}):
+                    try:
+                        presolve_rules(part.project)
+                    except InfeasibleRulesError as e:
+                        raise InfeasibleRulesError(f"Room '{part.room.name}': {e}") from e
+            else:
+                presolve_rules(project)
+        except InfeasibleRulesError as e:
+            issues.append(ValidationIssue(check="INFEASIBLE_RULES", message=str(e)))
+
+    return ValidationReport(
+        ok=not any(issue.severity == "ERROR" for issue in issues),
+        checked_items=len(project.equipment),
+        checked_rules=len(project.rules),
+        issues=issues,
+    )
@@ -1,7 +1,10 @@
 import itertools
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
-from src.core.models import Project
+import numpy as np
+
+from src.core.geometry import oriented_footprint, oriented_maintenance
+from src.core.models import Project, EquipmentItem, Collision
 
 def validate_collisions(project: Project, placements: Dict[str, Dict[str, float]]) -> List[str]:
     collision_errors: List[str] = []
@@ -14,13 +17,14 @@ def validate_collisions(project: Project, placements: Dict[str, Dict[str, float]
             
         x1 = placement['x']
         y1 = placement['y']
+        width, depth = oriented_footprint(eq_item, placement.get('rotation_deg', 0))
         
         equipment_boxes.append({
             'name': eq_item.name,
             'x1': x1,
             'y1': y1,
-            'x2': x1 + eq_item.footprint.width,
-            'y2': y1 + eq_item.footprint.depth,
+            'x2': x1 + width,
+            'y2': y1 + depth,
         })
         
     if len(equipment_boxes) < 2:
@@ -35,3 +39,105 @@ def validate_collisions(project: Project, placements: Dict[str, Dict[str, float]
             collision_errors.append(error_message)
             
     return collision_errors
+
+# Boxes closer than this (in metres) are treated as touching, not overlapping, so that
+# rounding of solver coordinates does not show up as collisions.
+EPS = 1e-6
+
+FOOTPRINT = 0
+MAINTENANCE_ZONE = 1
+
+def build_box_arrays(project: Project, placements: Dict[str, Dict[str, float]]) -> Tuple[List[EquipmentItem], np.ndarray, np.ndarray, np.ndarray]:
+    # Returns the placed items plus an (n, 4) array of [x1, y1, x2, y2] boxes, the kind of each
+    # box and the index of the item it belongs to. Every item contributes its footprint; items
+    # with a maintenance zone also contribute the enlarged box around it. Both turn with the
+    # placement's rotation_deg.
+    items = [item for item in project.equipment if placements.get(item.id)]
+    boxes, kinds, owners = [], [], []
+    for i, item in enumerate(items):
+        placement = placements[item.id]
+        rotation = placement.get('rotation_deg', 0)
+        width, depth = oriented_footprint(item, rotation)
+        x1, y1 = placement['x'], placement['y']
+        x2, y2 = x1 + width, y1 + depth
+        boxes.append((x1, y1, x2, y2))
+        kinds.append(FOOTPRINT)
+        owners.append(i)
+
+        left, back, right, front = oriented_maintenance(item, rotation)
+        if left or right or back or front:
+            boxes.append((x1 - left, y1 - back, x2 + right, y2 + front))
+            kinds.append(MAINTENANCE_ZONE)
+            owners.append(i)
+
+    return (items, np.array(boxes, dtype=float).reshape(-1, 4),
+            np.array(kinds, dtype=np.int8), np.array(owners, dtype=np.int64))
+
+def sweep_and_prune(boxes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Sort boxes by their left edge; each box can then only overlap the boxes that start
+    # before its right edge, which a binary search finds without looking at the rest.
+    order = np.argsort(boxes[:, 0], kind='stable')
+    sorted_boxes = boxes[order]
+    x1 = sorted_boxes[:, 0]
+    ends = np.searchsorted(x1, sorted_boxes[:, 2] - EPS, side='left')
+
+    pairs_a, pairs_b = [], []
+    for i in range(len(sorted_boxes)):
+        if ends[i] <= i + 1:
+            continue
+        candidates = np.arange(i + 1, ends[i])
+        y_overlap = (sorted_boxes[candidates, 1] < sorted_boxes[i, 3] - EPS) & (sorted_boxes[candidates, 3] > sorted_boxes[i, 1] + EPS)
+        hits = candidates[y_overlap]
+        if len(hits):
+            pairs_a.append(np.full(len(hits), i))
+            pairs_b.append(hits)
+
+    if not pairs_a:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return order[np.concatenate(pairs_a)], order[np.concatenate(pairs_b)]
+
+def overlap_areas(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    dx = np.minimum(boxes_a[:, 2], boxes_b[:, 2]) - np.maximum(boxes_a[:, 0], boxes_b[:, 0])
+    dy = np.minimum(boxes_a[:, 3], boxes_b[:, 3]) - np.maximum(boxes_a[:, 1], boxes_b[:, 1])
+    return np.clip(dx, 0, None) * np.clip(dy, 0, None)
+
+def find_collisions(project: Project, placements: Dict[str, Dict[str, float]]) -> List[Collision]:
+    items, boxes, kinds, owners = build_box_arrays(project, placements)
+    if len(items) < 2:
+        return []
+
+    a, b = sweep_and_prune(boxes)
+    distinct_items = owners[a] != owners[b]
+    a, b = a[distinct_items], b[distinct_items]
+
+    # Footprint vs footprint.
+    both_footprints = (kinds[a] == FOOTPRINT) & (kinds[b] == FOOTPRINT)
+    fp_a, fp_b = a[both_footprints], b[both_footprints]
+    colliding_items = set(zip(owners[fp_a].tolist(), owners[fp_b].tolist()))
+    colliding_items |= {(j, i) for i, j in colliding_items}
+
+    # Maintenance zone vs footprint, oriented so that `zone` is the maintenance zone box.
+    mixed = kinds[a] != kinds[b]
+    zone = np.where(kinds[a] == MAINTENANCE_ZONE, a, b)[mixed]
+    footprint = np.where(kinds[a] == MAINTENANCE_ZONE, b, a)[mixed]
+
+    collisions: List[Collision] = []
+    for box_a, box_b, area in zip(fp_a.tolist(), fp_b.tolist(), overlap_areas(boxes[fp_a], boxes[fp_b]).tolist()):
+        owner_a, owner_b = sorted((owners[box_a], owners[box_b]))
+        item_a, item_b = items[owner_a], items[owner_b]
+        collisions.append(Collision(
+            item_a=item_a.id, item_b=item_b.id, kind="FOOTPRINT", overlap_area=area,
+            message=f"Collision detected between: '{item_a.name}' and '{item_b.name}' ({area:.2f} m²)",
+        ))
+
+    for box_a, box_b, area in zip(zone.tolist(), footprint.tolist(), overlap_areas(boxes[zone], boxes[footprint]).tolist()):
+        owner_a, owner_b = owners[box_a], owners[box_b]
+        if (owner_a, owner_b) in colliding_items:
+            continue
+        item_a, item_b = items[owner_a], items[owner_b]
+        collisions.append(Collision(
+            item_a=item_a.id, item_b=item_b.id, kind="MAINTENANCE_ZONE", overlap_area=area,
+            message=f"Maintenance zone of '{item_a.name}' overlaps '{item_b.name}' ({area:.2f} m²)",
+        ))
+
+    return collisions
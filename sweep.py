@@ -0,0 +1,74 @@
+import logging
+
+logging.getLogger('ifcopenshell').setLevel(logging.ERROR)
+
+import argparse
+import json
+import os
+from typing import Any, Dict, List
+
+from pydantic import ValidationError
+
+from batch import write_summary
+from main import PipelineError, check_rules, load_project
+from src.core.logs import configure_logging
+from src.core.models import LayoutVariant, SolverOptions
+from src.placer.sweep import SWEEP_FIELDS, run_sweep
+
+logger = logging.getLogger("sweep")
+
+def load_variants(variants_file: str) -> List[LayoutVariant]:
+    try:
+        with open(variants_file, 'r', encoding='utf-8') as f:
+            return [LayoutVariant.parse_obj(variant) for variant in json.load(f)]
+    except FileNotFoundError as e:
+        raise PipelineError(f"Variants file '{variants_file}' not found.") from e
+    except json.JSONDecodeError as e:
+        raise PipelineError(f"Could not parse JSON file. Error: {e}") from e
+    except ValidationError as e:
+        raise PipelineError(f"The variants file '{variants_file}' has an invalid data structure.\nValidation Details:\n{e}") from e
+
+def print_table(rows: List[Dict[str, Any]]):
+    print(f"\n{'variant':<20} {'room':>13} {'limit s':>8} {'status':<16} {'objective':>14} {'layout cost':>14} {'solve s':>8}")
+    for row in rows:
+        room = f"{row['room_width']:g} x {row['room_depth']:g}"
+        objective = f"{row['objective']:.0f}" if row['objective'] is not None else "-"
+        cost = f"{row['layout_cost']:.1f}" if row['layout_cost'] is not None else "-"
+        solve_time = f"{row['solve_time_sec']:.2f}" if row['solve_time_sec'] is not None else "-"
+        print(f"{row['variant']:<20} {room:>13} {row['time_limit_sec'] or 0:>8g} {row['status']:<16} {objective:>14} {cost:>14} {solve_time:>8}")
+        if row['error']:
+            print(f"    {row['error']}")
+
+if __name__ == "__main__":
+    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(
+        description="Solve what-if variants of one project (room size, AVOID_ZONE areas, time limit) with a placement "
+                    "model compiled once per worker, and collect the results in one table.")
+    parser.add_argument("project_file", help="Path to the project JSON file.")
+    parser.add_argument("variants_file", help="JSON list of variants: name, room_width, room_depth, avoid_zones "
+                                              "({rule index: [x1, y1, x2, y2]}) and time_limit_sec, all but name optional.")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Number of variants solved in parallel.")
+    parser.add_argument("--solver-workers", type=int, default=None,
+                        help="CP-SAT workers per variant; keep jobs x solver workers close to the core count.")
+    parser.add_argument("--summary", default=os.path.join(SCRIPT_DIR, "output", "sweep_summary.json"),
+                        help="Results table (.json or .csv).")
+    args = parser.parse_args()
+    configure_logging(logging.WARNING)
+
+    try:
+        project = load_project(args.project_file)
+        check_rules(project)
+        variants = load_variants(args.variants_file)
+    except PipelineError as e:
+        parser.exit(1, f"CRITICAL ERROR: {e}\n")
+    if args.solver_workers is not None:
+        project.solver_options = (project.solver_options or SolverOptions()).copy(update={'num_workers': args.solver_workers})
+
+    print(f"--- Sweeping {len(variants)} variants of '{project.meta.project_name}' with {args.jobs} parallel jobs ---")
+    rows = run_sweep(project, variants, args.jobs)
+    print_table(rows)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.summary)), exist_ok=True)
+    write_summary(rows, args.summary, SWEEP_FIELDS)
+    print(f"\n--- Sweep finished. Results saved to: {args.summary} ---")
@@ -0,0 +1,98 @@
+import random
+from typing import Dict, List, Optional
+
+import pytest
+
+from src.core.models import Project
+from src.validator.service import find_collisions, validate_collisions
+
+def make_project(equipment: List[Dict]) -> Project:
+    return Project.parse_obj({
+        "meta": {"project_name": "Collision test", "schema_version": "1.3"},
+        "architecture": {"room_dimensions": {"width": 100.0, "depth": 100.0, "height": 10.0}, "wall_thickness": 0.3},
+        "equipment": equipment,
+        "rules": [],
+    })
+
+def make_item(item_id: str, width: float, depth: float, maintenance_zone: Optional[Dict] = None) -> Dict:
+    item = {"id": item_id, "name": item_id, "footprint": {"width": width, "depth": depth}, "height": 2.0}
+    if maintenance_zone:
+        item["maintenance_zone"] = maintenance_zone
+    return item
+
+def random_layout(seed: int, n_items: int = 40):
+    # Sizes and positions are multiples of 0.5 m on a small grid, so exactly touching edges are
+    # common and the coordinates are exact in binary floating point.
+    rng = random.Random(seed)
+    equipment, placements = [], {}
+    for i in range(n_items):
+        zone = None
+        if rng.random() < 0.5:
+            zone = {side: 0.5 * rng.randint(0, 2) for side in ("left", "right", "front", "back")}
+        equipment.append(make_item(f"eq_{i:02d}", 0.5 * rng.randint(1, 6), 0.5 * rng.randint(1, 6), zone))
+        placements[f"eq_{i:02d}"] = {"x": 0.5 * rng.randint(0, 30), "y": 0.5 * rng.randint(0, 30),
+                                     "rotation_deg": rng.choice([0, 90, 180, 270])}
+    return make_project(equipment), placements
+
+def footprint_pairs(project: Project, placements: Dict[str, Dict[str, float]]):
+    return {frozenset((collision.item_a, collision.item_b))
+            for collision in find_collisions(project, placements) if collision.kind == "FOOTPRINT"}
+
+def validated_pairs(project: Project, placements: Dict[str, Dict[str, float]]):
+    # validate_collisions reports names; the test items use their ID as the name.
+    pairs = set()
+    for message in validate_collisions(project, placements):
+        _, names = message.split(": ", 1)
+        first, second = names.split(" and ")
+        pairs.add(frozenset((first.strip("'"), second.strip("'"))))
+    return pairs
+
+@pytest.mark.parametrize("seed", range(20))
+def test_footprint_collisions_match_pairwise_check(seed):
+    project, placements = random_layout(seed)
+    assert footprint_pairs(project, placements) == validated_pairs(project, placements)
+
+def test_touching_edges_do_not_collide():
+    project = make_project([make_item("a", 2.0, 1.0), make_item("b", 1.0, 1.0), make_item("c", 2.0, 2.0)])
+    placements = {
+        "a": {"x": 0.0, "y": 0.0},
+        "b": {"x": 2.0, "y": 0.0},  # right edge of a
+        "c": {"x": 0.0, "y": 1.0},  # top edge of a, corner of b
+    }
+    assert find_collisions(project, placements) == []
+    assert validate_collisions(project, placements) == []
+
+def test_rounding_of_solver_coordinates_is_not_a_collision():
+    project = make_project([make_item("a", 0.3, 1.0), make_item("b", 1.0, 1.0)])
+    placements = {"a": {"x": 0.1, "y": 0.0}, "b": {"x": 0.1 + 0.3 - 1e-9, "y": 0.0}}
+    assert find_collisions(project, placements) == []
+
+def test_maintenance_zone_only_overlap():
+    project = make_project([
+        make_item("a", 2.0, 2.0, {"left": 0.0, "right": 1.0, "front": 0.0, "back": 0.0}),
+        make_item("b", 2.0, 2.0),
+    ])
+    placements = {"a": {"x": 0.0, "y": 0.0}, "b": {"x": 2.5, "y": 0.0}}
+    collisions = find_collisions(project, placements)
+    assert validate_collisions(project, placements) == []
+    assert [(collision.kind, collision.item_a, collision.item_b) for collision in collisions] == [("MAINTENANCE_ZONE", "a", "b")]
+    assert collisions[0].overlap_area == pytest.approx(1.0)
+
+def test_maintenance_zone_turns_with_the_item():
+    project = make_project([
+        make_item("a", 2.0, 2.0, {"left": 0.0, "right": 1.0, "front": 0.0, "back": 0.0}),
+        make_item("b", 2.0, 2.0),
+    ])
+    # Turned by 90°, the right-hand clearance faces +Y and no longer reaches b.
+    placements = {"a": {"x": 0.0, "y": 0.0, "rotation_deg": 90}, "b": {"x": 2.5, "y": 0.0}}
+    assert find_collisions(project, placements) == []
+
+def test_footprint_overlap_is_reported_once():
+    project = make_project([
+        make_item("a", 2.0, 2.0, {"left": 1.0, "right": 1.0, "front": 1.0, "back": 1.0}),
+        make_item("b", 2.0, 2.0, {"left": 1.0, "right": 1.0, "front": 1.0, "back": 1.0}),
+    ])
+    placements = {"a": {"x": 0.0, "y": 0.0}, "b": {"x": 1.0, "y": 1.0}}
+    collisions = find_collisions(project, placements)
+    assert [(collision.kind, collision.item_a, collision.item_b) for collision in collisions] == [("FOOTPRINT", "a", "b")]
+    assert collisions[0].overlap_area == pytest.approx(1.0)